@@ -0,0 +1 @@
+"""Reproducible benchmarks for the retrieval and generation stack."""
@@ -0,0 +1,130 @@
+"""Compare two benchmark result files and flag regressions.
+
+Each metric present in both files is compared in the direction its
+``better`` field gives. A metric regresses when it got worse by more than
+``--threshold`` (a fraction; 0.1 is 10%), or ``--tail-threshold`` for p95 and
+p99 latencies, which are set by a handful of slow requests and move further
+between identical runs. Latencies must also have grown by more than
+``--min-delta-ms``, so jitter on sub-millisecond cache hits is not reported.
+When both files keep a metric's individual ``runs``, every candidate run must
+also be worse than every baseline run: overlapping runs are noise.
+The exit status is 1 if any metric regressed, so the script can gate CI.
+Runs with different parameters, configuration or hardware are compared
+anyway, with a warning.
+
+Usage: python benchmarks/compare.py BASELINE.json CANDIDATE.json [--threshold 0.1]
+"""
+
+import argparse
+import json
+from pathlib import Path
+import sys
+from typing import Dict, List, NamedTuple
+
+DEFAULT_THRESHOLD = 0.10
+DEFAULT_TAIL_THRESHOLD = 0.25
+DEFAULT_MIN_DELTA_MS = 0.5
+_TAIL_SUFFIXES = ("p95_ms", "p99_ms")
+
+
+class Change(NamedTuple):
+    metric: str
+    baseline: float
+    candidate: float
+    # (candidate - baseline) / baseline.
+    change: float
+    # The same change signed so that positive means worse.
+    regression: float
+    unit: str
+    # False when the baseline's and candidate's runs overlap.
+    separated: bool = True
+
+    def regressed(
+        self,
+        threshold: float,
+        min_delta_ms: float = DEFAULT_MIN_DELTA_MS,
+        tail_threshold: float = DEFAULT_TAIL_THRESHOLD,
+    ) -> bool:
+        if self.metric.endswith(_TAIL_SUFFIXES):
+            threshold = max(threshold, tail_threshold)
+        if self.regression <= threshold or not self.separated:
+            return False
+        return self.unit != "ms" or abs(self.candidate - self.baseline) > min_delta_ms
+
+
+def _separated(before: Dict, after: Dict) -> bool:
+    old_runs, new_runs = before.get("runs"), after.get("runs")
+    if not old_runs or not new_runs:
+        return True
+    if before["better"] == "higher":
+        return max(new_runs) < min(old_runs)
+    return min(new_runs) > max(old_runs)
+
+
+def compare(baseline: Dict, candidate: Dict) -> List[Change]:
+    """Changes for the metrics both result files share, in baseline order."""
+    changes = []
+    for name, before in baseline["metrics"].items():
+        after = candidate["metrics"].get(name)
+        if after is None:
+            continue
+        old, new = float(before["value"]), float(after["value"])
+        if old == 0:
+            relative = 0.0 if new == 0 else float("inf")
+        else:
+            relative = (new - old) / old
+        regression = -relative if before["better"] == "higher" else relative
+        changes.append(
+            Change(
+                name,
+                old,
+                new,
+                relative,
+                regression,
+                before.get("unit", ""),
+                _separated(before, after),
+            )
+        )
+    return changes
+
+
+def warnings(baseline: Dict, candidate: Dict) -> List[str]:
+    notes = []
+    for section in ("params", "config", "environment"):
+        if baseline.get(section) != candidate.get(section):
+            notes.append(f"{section} differ; results may not be comparable")
+    return notes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("candidate", type=Path)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--tail-threshold", type=float, default=DEFAULT_TAIL_THRESHOLD)
+    parser.add_argument("--min-delta-ms", type=float, default=DEFAULT_MIN_DELTA_MS)
+    args = parser.parse_args()
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    candidate = json.loads(args.candidate.read_text(encoding="utf-8"))
+    for note in warnings(baseline, candidate):
+        print(f"warning: {note}", file=sys.stderr)
+
+    regressed = 0
+    print(f"{'metric':<28} {'baseline':>12} {'candidate':>12} {'change':>9}")
+    for change in compare(baseline, candidate):
+        flag = ""
+        if change.regressed(args.threshold, args.min_delta_ms, args.tail_threshold):
+            flag = "  REGRESSION"
+            regressed += 1
+        print(
+            f"{change.metric:<28} {change.baseline:>12.3f} {change.candidate:>12.3f} "
+            f"{change.change:>+9.1%}{flag}"
+        )
+    if regressed:
+        print(f"{regressed} metric(s) regressed by more than {args.threshold:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
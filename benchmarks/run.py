@@ -0,0 +1,331 @@
+"""Run the benchmark suite and write its results as JSON.
+
+A seeded Zipf corpus is bulk-ingested into a temporary database, then a
+seeded Zipf query workload is replayed against it. Suites:
+
+- ``ingest``: documents per second through ``bulk_ingest``.
+- ``search``: ``/search``-style snippet searches, latency percentiles.
+- ``generate``: passage search plus ``generate_response``, latency percentiles.
+- ``analyzer``: ``analyze_text`` throughput on one multi-megabyte document.
+- ``server``: requests per second and latency of an in-process HTTP server
+  replaying the workload (80% ``/search``, 20% ``/generate``) on kept-alive
+  connections.
+- ``startup``: import time of fresh interpreters running the targets in
+  ``benchmarks/startup.py``, which also checks them against a budget.
+
+The suites run in ``--runs`` rounds, each running every suite once with
+the caches emptied, and every metric is the median of its rounds. A single
+replay's percentiles move by 10-30% between identical runs, and on shared
+hosts CPU speed drifts over seconds; interleaving the rounds spreads each
+suite's runs over the whole invocation instead of one stretch of it. Each
+metric also lists its individual ``runs``, which ``compare.py`` uses to tell
+shifts from noise. Within a round, the analyzer and startup suites keep the
+best of ``--repeat`` runs.
+
+Configuration (caches, dense index, pool size, server mode) comes from
+``load_config`` as it does for the server, so ``RAG_*`` variables change what
+is measured; the database path and port are always temporary. Compare two
+result files with ``benchmarks/compare.py``.
+
+Usage: python benchmarks/run.py [--docs 20000] [--queries 2000] [--runs 5] [--output results.json]
+"""
+
+import argparse
+from dataclasses import asdict, replace
+from datetime import datetime, timezone
+from http.client import HTTPConnection
+import json
+import os
+from pathlib import Path
+import platform
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List, Sequence
+from urllib.parse import quote
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from benchmarks import startup, workloads  # noqa: E402
+from rag_system.analyzer import analyze_text  # noqa: E402
+from rag_system.backends import SQLiteBackend  # noqa: E402
+from rag_system.config import Config, load_config  # noqa: E402
+from rag_system.generator import configure_generation_cache, generate_response  # noqa: E402
+from rag_system.pipeline import bulk_ingest  # noqa: E402
+from rag_system.query import configure_stop_words  # noqa: E402
+from rag_system.server import create_server  # noqa: E402
+from rag_system.storage import (  # noqa: E402
+    close_pools,
+    configure_chunking,
+    configure_dense,
+    configure_pool,
+    configure_query_cache,
+)
+
+SUITES = ("ingest", "search", "generate", "analyzer", "server", "startup")
+RESULTS_VERSION = 2
+DEFAULT_RUNS = 5
+_PERCENTILES = (50, 95, 99)
+
+
+def _metric(
+    value: float, unit: str, better: str, runs: Sequence[float] = ()
+) -> Dict[str, object]:
+    metric: Dict[str, object] = {"value": round(value, 3), "unit": unit, "better": better}
+    if runs:
+        metric["runs"] = [round(run, 3) for run in runs]
+    return metric
+
+
+_Metrics = Dict[str, Dict[str, object]]
+
+
+def _median_metrics(runs: Sequence[_Metrics]) -> _Metrics:
+    """Each metric of ``runs`` as the median of its values, with the values."""
+    merged = {}
+    for name, first in runs[0].items():
+        values = [float(run[name]["value"]) for run in runs]  # type: ignore[arg-type]
+        merged[name] = _metric(
+            statistics.median(values), str(first["unit"]), str(first["better"]), values
+        )
+    return merged
+
+
+def _percentile(ordered: Sequence[float], pct: float) -> float:
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def _latency_metrics(prefix: str, seconds: List[float]) -> Dict[str, Dict[str, object]]:
+    ordered = sorted(seconds)
+    return {
+        f"{prefix}.p{pct}_ms": _metric(_percentile(ordered, pct) * 1000, "ms", "lower")
+        for pct in _PERCENTILES
+    }
+
+
+def _timed(call: Callable[[str], object], queries: Sequence[str]) -> List[float]:
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        call(query)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def _configure(config: Config) -> None:
+    configure_pool(config.pool_size)
+    configure_chunking(config.chunk_size, config.chunk_overlap)
+    configure_stop_words(config.stop_words)
+    configure_dense(config.dense_dim, config.dense_index, config.ivf_lists, config.ivf_nprobe)
+    _clear_caches(config)
+
+
+def _clear_caches(config: Config) -> None:
+    # Reconfiguring empties the caches, so every suite starts cold.
+    configure_query_cache(
+        config.cache_entries, ttl=config.cache_ttl, max_bytes=config.cache_max_bytes
+    )
+    configure_generation_cache(config.cache_entries, max_bytes=config.cache_max_bytes)
+
+
+def bench_ingest(db_path: Path, args: argparse.Namespace, words: List[str]):
+    stats = bulk_ingest(db_path, workloads.corpus(args.docs, args.words, args.seed, words))
+    return {
+        "ingest.docs_per_second": _metric(stats.processed / stats.seconds, "docs/s", "higher")
+    }
+
+
+def bench_search(config: Config, queries: Sequence[str]):
+    backend = SQLiteBackend(config.db_path)
+    samples = _timed(
+        lambda query: backend.search(
+            query, limit=config.top_k, snippet_tokens=config.snippet_tokens
+        ),
+        queries,
+    )
+    return _latency_metrics("search", samples)
+
+
+def bench_generate(config: Config, queries: Sequence[str]):
+    backend = SQLiteBackend(config.db_path)
+    samples = _timed(
+        lambda query: generate_response(
+            query, backend.search_passages(query, limit=config.top_k)
+        ),
+        queries,
+    )
+    return _latency_metrics("generate", samples)
+
+
+def bench_analyzer(args: argparse.Namespace, words: List[str]):
+    document = workloads.text(args.analyzer_mb, args.seed, words)
+    best = min(_timed(analyze_text, [document] * args.repeat))
+    return {
+        "analyzer.mb_per_second": _metric(len(document) / 1_000_000 / best, "MB/s", "higher")
+    }
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _client(port: int, requests: Sequence[str], samples: List[float], errors: List[int]):
+    connection = HTTPConnection("127.0.0.1", port, timeout=30)
+    try:
+        for idx, query in enumerate(requests):
+            start = time.perf_counter()
+            if idx % 5 == 4:
+                body = json.dumps({"query": query}).encode("utf-8")
+                connection.request(
+                    "POST", "/generate", body=body, headers={"Content-Type": "application/json"}
+                )
+            else:
+                connection.request("GET", f"/search?query={quote(query)}")
+            response = connection.getresponse()
+            response.read()
+            samples.append(time.perf_counter() - start)
+            if response.status >= 400:
+                errors.append(response.status)
+            if response.getheader("Connection") == "close":
+                connection.close()
+    finally:
+        connection.close()
+
+
+def bench_server(config: Config, queries: Sequence[str], concurrency: int):
+    server = create_server(replace(config, port=_free_port()))
+    port = server.server_address[1]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    samples: List[float] = []
+    errors: List[int] = []
+    clients = [
+        threading.Thread(
+            target=_client, args=(port, queries[idx::concurrency], samples, errors)
+        )
+        for idx in range(concurrency)
+    ]
+    try:
+        start = time.perf_counter()
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+        elapsed = time.perf_counter() - start
+    finally:
+        server.shutdown()
+        server.server_close()
+    if errors:
+        raise RuntimeError(f"{len(errors)} server requests failed, e.g. HTTP {errors[0]}")
+    metrics = {"server.requests_per_second": _metric(len(samples) / elapsed, "req/s", "higher")}
+    metrics.update(_latency_metrics("server", samples))
+    return metrics
+
+
+def bench_startup(repeat: int):
+    return {
+        f"startup.{target.name}_ms": _metric(
+            startup.measure(target, repeat).import_ms, "ms", "lower"
+        )
+        for target in startup.TARGETS
+    }
+
+
+def run(args: argparse.Namespace) -> Dict[str, object]:
+    suites = [suite for suite in args.suites.split(",") if suite]
+    unknown = sorted(set(suites) - set(SUITES))
+    if unknown:
+        raise SystemExit(f"unknown suites {unknown}; expected some of {SUITES}")
+
+    words = workloads.vocabulary(args.vocabulary, args.seed)
+    queries = workloads.queries(args.queries, args.distinct_queries, args.seed, words)
+    rounds: List[_Metrics] = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config = replace(load_config(), db_path=Path(temp_dir) / "rag.db")
+        _configure(config)
+        queried = set(suites) & {"search", "generate", "server"}
+        if queried and "ingest" not in suites:
+            bench_ingest(config.db_path, args, words)
+        benches = {
+            "search": lambda: bench_search(config, queries),
+            "generate": lambda: bench_generate(config, queries),
+            "server": lambda: bench_server(config, queries, args.concurrency),
+            "analyzer": lambda: bench_analyzer(args, words),
+            "startup": lambda: bench_startup(args.repeat),
+        }
+        for round_index in range(args.runs):
+            metrics: _Metrics = {}
+            for suite in SUITES:
+                if suite not in suites:
+                    continue
+                _clear_caches(config)
+                if suite == "ingest":
+                    # Each round loads a fresh database; the first is queried.
+                    db_path = config.db_path
+                    if round_index:
+                        db_path = db_path.with_name(f"ingest-{round_index}.db")
+                    metrics.update(bench_ingest(db_path, args, words))
+                else:
+                    metrics.update(benches[suite]())
+            rounds.append(metrics)
+        close_pools()
+
+    settings = asdict(config)
+    for name in ("data_dir", "db_path", "host", "port", "environment"):
+        settings.pop(name)
+    return {
+        "version": RESULTS_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "params": {
+            key: value for key, value in vars(args).items() if key not in ("output",)
+        },
+        "config": settings,
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "metrics": _median_metrics(rounds),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--suites", default=",".join(SUITES))
+    parser.add_argument("--docs", type=int, default=20000)
+    parser.add_argument("--words", type=int, default=120, help="Words per document")
+    parser.add_argument("--vocabulary", type=int, default=workloads.DEFAULT_VOCABULARY_SIZE)
+    parser.add_argument("--queries", type=int, default=2000, help="Queries replayed per suite")
+    parser.add_argument("--distinct-queries", type=int, default=1000)
+    parser.add_argument("--analyzer-mb", type=float, default=4)
+    parser.add_argument(
+        "--runs", type=int, default=DEFAULT_RUNS, help="Rounds of every suite; medians count"
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Analyzer and startup runs per round; the best counts",
+    )
+    parser.add_argument("--concurrency", type=int, default=8, help="Server client threads")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Write results here instead of stdout")
+    args = parser.parse_args()
+    if args.runs < 1:
+        parser.error("--runs must be at least 1")
+
+    results = json.dumps(run(args), indent=2, default=str)
+    if args.output:
+        Path(args.output).write_text(results + "\n", encoding="utf-8")
+    else:
+        print(results)
+
+
+if __name__ == "__main__":
+    main()
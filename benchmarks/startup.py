@@ -0,0 +1,157 @@
+"""Measure import time at startup and check it against a budget.
+
+Each target is run in a fresh interpreter under ``python -X importtime``, in
+an empty temporary directory with ``RAG_DATA_DIR`` pointing into it. Its
+import time is the sum of the cumulative times of the top-level imports, and
+the best of ``--runs`` runs counts. A target fails the check when that time
+exceeds its budget or when it loads a module it should not need, such as
+NumPy for a bm25 search.
+
+Budgets are about three times the times measured on the single-core test
+host, so only a change in what is imported, not runner noise, trips them.
+
+Usage: python benchmarks/startup.py [--runs 5] [--check]
+"""
+
+import argparse
+import os
+from pathlib import Path
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List, NamedTuple, Set, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_RUNS = 5
+
+# Modules only writes, dense retrieval or process pools need.
+_STORAGE = ("sqlite3", "rag_system.storage")
+_DENSE = ("numpy", "rag_system.vectors")
+_POOLS = ("multiprocessing",)
+
+
+class Target(NamedTuple):
+    name: str
+    # Arguments to the interpreter after ``-X importtime``.
+    argv: Tuple[str, ...]
+    budget_ms: float
+    forbidden: Tuple[str, ...]
+
+
+TARGETS = (
+    Target("import", ("-c", "import rag_system"), 90, _STORAGE + _DENSE + _POOLS),
+    Target(
+        "cli_analyze",
+        ("-m", "rag_system.cli", "analyze", "Glacier archives data"),
+        110,
+        _STORAGE + _DENSE + _POOLS,
+    ),
+    Target("cli_search", ("-m", "rag_system.cli", "search", "glacier"), 340, _DENSE),
+    Target(
+        "lambda_search",
+        ("-c", "import search_document; search_document.lambda_handler({'query': 'x'}, None)"),
+        310,
+        _DENSE,
+    ),
+)
+
+
+class Measurement(NamedTuple):
+    target: Target
+    import_ms: float
+    loaded: Tuple[str, ...]
+
+    def failures(self) -> List[str]:
+        name = self.target.name
+        problems = [
+            f"{name} loads {module}" for module in self.target.forbidden if module in self.loaded
+        ]
+        if self.import_ms > self.target.budget_ms:
+            problems.append(
+                f"{name} imports take {self.import_ms:.1f} ms, over its "
+                f"{self.target.budget_ms:g} ms budget"
+            )
+        return problems
+
+
+def parse_importtime(stderr: str) -> Tuple[float, Set[str]]:
+    """Total import time in ms, and the modules imported, from ``-X importtime``."""
+    total_us = 0
+    modules = set()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue  # the header line
+        modules.add(name.strip())
+        # Nested imports are indented by two more spaces per level.
+        if not name[1:].startswith(" "):
+            total_us += int(cumulative)
+    return total_us / 1000, modules
+
+
+def _environment(work_dir: Path) -> Dict[str, str]:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        [str(ROOT), str(ROOT / "lambda_functions"), env.get("PYTHONPATH", "")]
+    ).rstrip(os.pathsep)
+    env["RAG_DATA_DIR"] = str(work_dir / "data")
+    for name in list(env):
+        # Only the defaults are measured.
+        if name.startswith("RAG_") and name != "RAG_DATA_DIR":
+            del env[name]
+    return env
+
+
+def measure(target: Target, runs: int = DEFAULT_RUNS) -> Measurement:
+    with tempfile.TemporaryDirectory() as temp_dir:
+        work_dir = Path(temp_dir)
+        env = _environment(work_dir)
+        # Searches need a database; creating it is not timed.
+        subprocess.run(
+            [sys.executable, "-m", "rag_system.cli", "init"],
+            cwd=work_dir,
+            env=env,
+            check=True,
+            capture_output=True,
+        )
+        best = float("inf")
+        modules: Set[str] = set()
+        for _ in range(runs):
+            completed = subprocess.run(
+                [sys.executable, "-X", "importtime", *target.argv],
+                cwd=work_dir,
+                env=env,
+                capture_output=True,
+                text=True,
+            )
+            if completed.returncode != 0:
+                raise RuntimeError(f"{target.name} failed:\n{completed.stderr[-2000:]}")
+            import_ms, modules = parse_importtime(completed.stderr)
+            best = min(best, import_ms)
+    return Measurement(target, best, tuple(sorted(modules)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS)
+    parser.add_argument(
+        "--check", action="store_true", help="Exit 1 if a target breaks its budget"
+    )
+    args = parser.parse_args()
+
+    problems = []
+    print(f"{'target':<16} {'import ms':>10} {'budget ms':>10}")
+    for target in TARGETS:
+        result = measure(target, args.runs)
+        print(f"{target.name:<16} {result.import_ms:>10.1f} {target.budget_ms:>10g}")
+        problems.extend(result.failures())
+    for problem in problems:
+        print(f"FAIL: {problem}")
+    if args.check and problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Seeded synthetic corpora and Zipf-distributed query workloads.
+
+Word frequencies in documents, and query popularity, both follow a Zipf
+distribution (the ``k``-th most common item has weight ``1 / k ** s``), so
+a few terms and queries dominate as they do in real traffic. Every generator
+takes a seed and produces the same output for the same arguments.
+"""
+
+from __future__ import annotations
+
+import itertools
+import random
+from typing import Iterator, List, Sequence
+
+from rag_system.storage import DocumentRecord
+
+DEFAULT_VOCABULARY_SIZE = 20000
+DEFAULT_ZIPF_EXPONENT = 1.1
+_LETTERS = "abcdefghijklmnopqrstuvwxyz"
+
+
+def zipf_weights(count: int, exponent: float = DEFAULT_ZIPF_EXPONENT) -> List[float]:
+    """Cumulative Zipf weights for ranks ``1..count``, for ``random.choices``."""
+    return list(itertools.accumulate(1 / rank**exponent for rank in range(1, count + 1)))
+
+
+def vocabulary(size: int = DEFAULT_VOCABULARY_SIZE, seed: int = 1) -> List[str]:
+    """``size`` distinct pronounceable-ish words; about 10% are capitalized."""
+    rng = random.Random(seed)
+    words: List[str] = []
+    seen = set()
+    while len(words) < size:
+        word = "".join(rng.choice(_LETTERS) for _ in range(rng.randint(3, 10)))
+        if word in seen:
+            continue
+        seen.add(word)
+        words.append(word.capitalize() if rng.random() < 0.1 else word)
+    return words
+
+
+def corpus(
+    docs: int,
+    words: int = 120,
+    seed: int = 7,
+    words_list: Sequence[str] = (),
+    exponent: float = DEFAULT_ZIPF_EXPONENT,
+) -> Iterator[DocumentRecord]:
+    """``docs`` records of ``words`` Zipf-sampled words each, generated lazily."""
+    words_list = list(words_list) or vocabulary()
+    weights = zipf_weights(len(words_list), exponent)
+    rng = random.Random(seed)
+    for idx in range(docs):
+        yield DocumentRecord(
+            doc_id=f"doc-{idx:08d}",
+            content=" ".join(rng.choices(words_list, cum_weights=weights, k=words)),
+            source="benchmark",
+            metadata={"idx": idx, "shard": idx % 16},
+        )
+
+
+def queries(
+    count: int,
+    distinct: int = 1000,
+    seed: int = 11,
+    words_list: Sequence[str] = (),
+    exponent: float = DEFAULT_ZIPF_EXPONENT,
+) -> List[str]:
+    """``count`` queries drawn with Zipf popularity from ``distinct`` queries.
+
+    Each distinct query is one to three words of Zipf rank 10 to 2000: common
+    enough to match documents, without the handful of words in nearly every
+    one.
+    """
+    words_list = list(words_list) or vocabulary()
+    rng = random.Random(seed)
+    candidates = words_list[10:2000]
+    term_weights = zipf_weights(len(candidates), exponent)
+    pool = [
+        " ".join(rng.choices(candidates, cum_weights=term_weights, k=rng.randint(1, 3)))
+        for _ in range(distinct)
+    ]
+    return rng.choices(pool, cum_weights=zipf_weights(len(pool), exponent), k=count)
+
+
+def text(megabytes: float, seed: int = 5, words_list: Sequence[str] = ()) -> str:
+    """About ``megabytes`` MB of Zipf-sampled words, with sentence punctuation."""
+    words_list = list(words_list) or vocabulary()
+    weights = zipf_weights(len(words_list))
+    rng = random.Random(seed)
+    sentences: List[str] = []
+    size = 0
+    while size < megabytes * 1_000_000:
+        sentence = " ".join(rng.choices(words_list, cum_weights=weights, k=rng.randint(5, 25)))
+        sentences.append(sentence)
+        size += len(sentence) + 2
+    return ". ".join(sentences) + "."
@@ -1,20 +1,30 @@
 import json
 
-from rag_system.config import load_config
 from rag_system.generator import generate_response
-from rag_system.storage import search_documents
+from rag_system.runtime import setup_handler
+from rag_system.serialization import dumps
+from rag_system.tracing import request_trace, server_timing, span
+
+# Configured, and the backend opened, once per execution environment; warm
+# invocations reuse both.
+_config, _backend = setup_handler()
 
 
 def lambda_handler(event, context):
     query = event.get("query")
     if not query:
         return {"statusCode": 400, "body": json.dumps("query is required")}
+    if not isinstance(query, str):
+        return {"statusCode": 400, "body": json.dumps("query must be a string")}
 
-    config = load_config()
-    results = search_documents(config.db_path, query, limit=config.top_k)
-    augmented_response = generate_response(query, results)
+    with request_trace():
+        results = _backend.search_passages(query, limit=_config.top_k)
+        augmented_response = generate_response(query, results)
+        with span("json_encode"):
+            body = dumps(augmented_response).decode("utf-8")
+        timing = server_timing()
 
-    return {
-        "statusCode": 200,
-        "body": json.dumps(augmented_response),
-    }
+    response = {"statusCode": 200, "body": body}
+    if timing is not None:
+        response["headers"] = {"Server-Timing": timing}
+    return response
@@ -1,18 +1,35 @@
 import json
 
-from rag_system.config import load_config
-from rag_system.storage import search_documents
+from rag_system.runtime import setup_handler
+from rag_system.serialization import dumps
+from rag_system.tracing import request_trace, server_timing, span
+
+# Configured, and the backend opened, once per execution environment; warm
+# invocations reuse both.
+_config, _backend = setup_handler()
 
 
 def lambda_handler(event, context):
     query = event.get("query")
     if not query:
         return {"statusCode": 400, "body": json.dumps("query is required")}
+    if not isinstance(query, str):
+        return {"statusCode": 400, "body": json.dumps("query must be a string")}
+
+    mode = event.get("mode", "bm25")
+    if mode not in _backend.search_modes:
+        return {
+            "statusCode": 400,
+            "body": json.dumps(f"mode must be one of {_backend.search_modes}"),
+        }
 
-    config = load_config()
-    results = search_documents(config.db_path, query, limit=config.top_k)
+    with request_trace():
+        results = _backend.search(query, limit=_config.top_k, mode=mode)
+        with span("json_encode"):
+            body = dumps(results).decode("utf-8")
+        timing = server_timing()
 
-    return {
-        "statusCode": 200,
-        "body": json.dumps([result.__dict__ for result in results]),
-    }
+    response = {"statusCode": 200, "body": body}
+    if timing is not None:
+        response["headers"] = {"Server-Timing": timing}
+    return response
@@ -1,13 +1,14 @@
 import json
 
-from rag_system.config import load_config
-from rag_system.storage import add_document, initialize_database
+from rag_system.runtime import setup_handler
+from rag_system.serialization import dumps
 
+# Configured, and the backend opened, once per execution environment; warm
+# invocations reuse both.
+_config, _backend = setup_handler()
 
-def lambda_handler(event, context):
-    config = load_config()
-    initialize_database(config.db_path)
 
+def lambda_handler(event, context):
     doc_id = event.get("id")
     content = event.get("content")
     source = event.get("source", "lambda")
@@ -19,9 +20,9 @@ def lambda_handler(event, context):
             "body": json.dumps("id and content are required"),
         }
 
-    record = add_document(config.db_path, doc_id, content, source, metadata)
+    record = _backend.add(doc_id, content, source, metadata)
 
     return {
         "statusCode": 200,
-        "body": json.dumps(record.__dict__),
+        "body": dumps(record).decode("utf-8"),
     }
@@ -1,15 +1,48 @@
-"""Local, deterministic RAG system utilities."""
-
-from .config import Config, load_config
-from .storage import DocumentRecord, SearchResult
-from .generator import generate_response
-from .analyzer import analyze_text
-
-__all__ = [
-    "Config",
-    "load_config",
-    "DocumentRecord",
-    "SearchResult",
-    "generate_response",
-    "analyze_text",
-]
+"""Local, deterministic RAG system utilities.
+
+Public names are imported from their modules on first access (PEP 562), so
+``import rag_system`` stays cheap and, for example, code that only analyzes
+text never loads SQLite or NumPy.
+"""
+
+from __future__ import annotations
+
+from importlib import import_module
+from typing import TYPE_CHECKING, Any, List
+
+if TYPE_CHECKING:
+    from .analyzer import analyze_many, analyze_text
+    from .batch import generate_many, search_many
+    from .config import Config, get_config, load_config
+    from .generator import generate_response
+    from .storage import DocumentRecord, SearchResult
+
+# Public name -> module that defines it.
+_EXPORTS = {
+    "Config": ".config",
+    "get_config": ".config",
+    "load_config": ".config",
+    "DocumentRecord": ".storage",
+    "SearchResult": ".storage",
+    "generate_response": ".generator",
+    "search_many": ".batch",
+    "generate_many": ".batch",
+    "analyze_text": ".analyzer",
+    "analyze_many": ".analyzer",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str) -> Any:
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module, __name__), name)
+    # Later lookups find the name directly and skip this function.
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(_EXPORTS))
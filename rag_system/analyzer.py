@@ -1,48 +1,120 @@
-"""Simple text analysis mimicking Comprehend-style outputs."""
+"""Simple text analysis mimicking Comprehend-style outputs.
+
+Text is analyzed in segments of about ``_SEGMENT_CHARS`` characters, cut at
+a character no token can contain, so a multi-megabyte document never holds
+more than one segment's tokens at a time. Lowercased words are interned to
+integer ids, and each bigram is counted under one integer key built from the
+ids of its two words rather than as a new string. Only the top phrases are
+turned back into text.
+"""
 
 from __future__ import annotations
 
+from collections import Counter, defaultdict
+import heapq
+from itertools import islice
+from operator import add, itemgetter
 import re
-from collections import Counter
-from typing import Dict, List
-
+from typing import Dict, List, Sequence
 
 _WORD_RE = re.compile(r"[A-Za-z][A-Za-z\-']+")
+_BOUNDARY_RE = re.compile(r"[^A-Za-z\-']")
+_SEGMENT_CHARS = 1 << 18
+_PAIR_SHIFT = 32
+_TOP = 10
+
+# Batches smaller than this are analyzed in-process: starting workers and
+# pickling the texts would cost more than the analysis.
+POOL_MIN_CHARS = 1 << 20
 
 
-def _tokenize(text: str) -> List[str]:
-    return [match.group(0) for match in _WORD_RE.finditer(text)]
+def _segments(text: str):
+    start = 0
+    while start < len(text):
+        end = start + _SEGMENT_CHARS
+        if end < len(text):
+            boundary = _BOUNDARY_RE.search(text, end)
+            end = boundary.start() if boundary else len(text)
+        yield _WORD_RE.findall(text, start, end)
+        start = end
+
+
+def _top(counts: Dict, total: int) -> List:
+    # nlargest breaks ties by insertion order, like Counter.most_common.
+    return [
+        (key, round(count / total, 3))
+        for key, count in heapq.nlargest(_TOP, counts.items(), key=itemgetter(1))
+    ]
 
 
 def analyze_text(text: str) -> Dict[str, List[Dict[str, object]]]:
     if not text:
         raise ValueError("text must be provided")
 
-    tokens = _tokenize(text)
-    lower_tokens = [token.lower() for token in tokens]
+    # A missing word is given the next id as it is looked up.
+    word_ids: defaultdict = defaultdict()
+    word_ids.default_factory = word_ids.__len__
+    pair_bases: List[int] = []
+    entity_counts: Counter = Counter()
+    phrase_counts: Counter = Counter()
+    total = 0
+    previous = None
+    for tokens in _segments(text):
+        if not tokens:
+            continue
+        total += len(tokens)
+        entity_counts.update(
+            token for token in tokens if len(token) > 2 and token[0].isupper()
+        )
+        ids = list(map(word_ids.__getitem__, map(str.lower, tokens)))
+        pair_bases.extend(
+            word_id << _PAIR_SHIFT for word_id in range(len(pair_bases), len(word_ids))
+        )
+        if previous is not None:
+            phrase_counts[pair_bases[previous] + ids[0]] += 1
+        phrase_counts.update(map(add, map(pair_bases.__getitem__, ids), islice(ids, 1, None)))
+        previous = ids[-1]
 
-    entity_candidates = []
-    for token in tokens:
-        if token[0].isupper() and len(token) > 2:
-            entity_candidates.append(token)
+    words = list(word_ids)
+    mask = (1 << _PAIR_SHIFT) - 1
+    return {
+        "entities": [
+            {"Text": token, "Score": score} for token, score in _top(entity_counts, total)
+        ],
+        "key_phrases": [
+            {"Text": f"{words[pair >> _PAIR_SHIFT]} {words[pair & mask]}", "Score": score}
+            for pair, score in _top(phrase_counts, total)
+        ],
+    }
 
-    entity_counts = Counter(entity_candidates)
-    entities = [
-        {"Text": token, "Score": round(count / len(tokens), 3)}
-        for token, count in entity_counts.most_common(10)
-    ]
 
-    phrase_counts = Counter()
-    for idx in range(len(lower_tokens) - 1):
-        phrase = f"{lower_tokens[idx]} {lower_tokens[idx + 1]}"
-        phrase_counts[phrase] += 1
+def analyze_many(
+    texts: Sequence[str], workers: int = 1
+) -> List[Dict[str, List[Dict[str, object]]]]:
+    """``analyze_text`` for each of ``texts``, in the same order.
 
-    key_phrases = [
-        {"Text": phrase, "Score": round(count / len(lower_tokens), 3)}
-        for phrase, count in phrase_counts.most_common(10)
-    ]
+    Every text is validated before any is analyzed, and identical texts are
+    analyzed once and share one result, which callers must treat as
+    read-only. With ``workers > 1`` and at least ``POOL_MIN_CHARS`` of text,
+    the unique texts are spread over a process pool of that size.
+    """
+    if workers <= 0:
+        raise ValueError("workers must be positive")
+    unique: Dict[str, None] = {}
+    for idx, text in enumerate(texts):
+        if not isinstance(text, str) or not text:
+            raise ValueError(f"texts[{idx}]: text must be provided")
+        unique[text] = None
+    pending = list(unique)
+    workers = min(workers, len(pending))
+    if workers > 1 and sum(map(len, pending)) >= POOL_MIN_CHARS:
+        # Imported here: it loads multiprocessing, which single-text callers
+        # such as ``cli analyze`` never need.
+        from concurrent.futures import ProcessPoolExecutor
 
-    return {
-        "entities": entities,
-        "key_phrases": key_phrases,
-    }
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            analyses = list(executor.map(analyze_text, pending))
+    else:
+        analyses = [analyze_text(text) for text in pending]
+    answers = dict(zip(pending, analyses))
+    return [answers[text] for text in texts]
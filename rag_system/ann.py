@@ -0,0 +1,245 @@
+"""Inverted-file (IVF) approximate nearest neighbour search over the dense index.
+
+``IVFIndex`` keeps the flat float32 matrix of ``VectorIndex`` and adds a
+coarse quantizer: ``lists`` centroids found by spherical k-means, and the list
+each row belongs to. A query is compared with the centroids first and only
+rows in the ``nprobe`` closest lists are scored, so search cost is roughly
+``nprobe / lists`` of an exhaustive scan.
+
+Centroids and row assignments live in ``<db>.vectors.ivf.centroids`` (float32)
+and ``<db>.vectors.ivf.assign`` (int32 per row) and are opened with
+``np.memmap``, so processes sharing a database share those pages. New and
+rewritten rows are assigned to their nearest centroid as they are written, and
+removed rows are excluded, so the index never needs a full rebuild for
+incremental changes. It is retrained once the corpus has grown by
+``RETRAIN_GROWTH`` times since the last training.
+
+IVF needs NumPy; without it searches fall back to the exact scan.
+"""
+
+from __future__ import annotations
+
+from array import array
+import json
+import math
+from pathlib import Path
+from typing import Iterable, Sequence, Tuple
+
+from .vectors import DEFAULT_DIM, VectorIndex, _file_signature, _write_atomic, np
+
+DEFAULT_NPROBE = 16
+# Below this many rows an exhaustive scan is cheap enough; no quantizer is trained.
+MIN_TRAIN_ROWS = 4096
+RETRAIN_GROWTH = 4
+MAX_LISTS = 4096
+
+_KMEANS_ITERATIONS = 15
+_TRAIN_POINTS_PER_LIST = 64
+_ASSIGN_CHUNK = 16384
+# Assignment values other than a list number.
+_UNASSIGNED = -1
+_REMOVED = -2
+
+
+def _nearest(vectors, centroids):
+    """Index of the most similar centroid for each row of ``vectors``."""
+    labels = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), _ASSIGN_CHUNK):
+        chunk = vectors[start : start + _ASSIGN_CHUNK]
+        labels[start : start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+    return labels
+
+
+def spherical_kmeans(vectors, lists: int, iterations: int = _KMEANS_ITERATIONS, seed: int = 0):
+    """Return ``lists`` unit-length centroids clustering ``vectors`` by cosine."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=lists, replace=False)].copy()
+    for _ in range(iterations):
+        labels = _nearest(vectors, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, vectors)
+        counts = np.bincount(labels, minlength=lists)
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            sums[empty] = vectors[rng.choice(len(vectors), size=len(empty), replace=False)]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        centroids = (sums / norms).astype(np.float32)
+    return centroids
+
+
+class IVFIndex(VectorIndex):
+    """``VectorIndex`` whose searches only scan the ``nprobe`` nearest lists.
+
+    ``lists=0`` picks ``sqrt(rows)`` lists (capped at ``MAX_LISTS``) when the
+    quantizer is trained. The quantizer is trained lazily by the first search
+    that finds at least ``MIN_TRAIN_ROWS`` rows, or explicitly with ``train``.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        dim: int = DEFAULT_DIM,
+        lists: int = 0,
+        nprobe: int = DEFAULT_NPROBE,
+    ) -> None:
+        if lists < 0:
+            raise ValueError("lists must not be negative")
+        if nprobe <= 0:
+            raise ValueError("nprobe must be positive")
+        self.lists = lists
+        self.nprobe = nprobe
+        self._centroids = None
+        self._assign = None
+        self._trained_rows = 0
+        base = Path(db_path)
+        self.meta_path = base.with_name(base.name + ".vectors.ivf")
+        self.centroids_path = base.with_name(base.name + ".vectors.ivf.centroids")
+        self.assign_path = base.with_name(base.name + ".vectors.ivf.assign")
+        super().__init__(db_path, dim=dim)
+
+    @property
+    def trained(self) -> bool:
+        with self._lock:
+            self._ensure_loaded()
+            return self._centroids is not None
+
+    def _signatures(self) -> tuple:
+        return super()._signatures() + tuple(
+            _file_signature(path)
+            for path in (self.meta_path, self.centroids_path, self.assign_path)
+        )
+
+    def _load(self) -> None:
+        super()._load()
+        self._centroids = None
+        self._assign = None
+        self._trained_rows = 0
+        if np is None or not self.meta_path.exists():
+            return
+        meta = json.loads(self.meta_path.read_text(encoding="utf-8"))
+        if meta.get("dim") != self.dim:
+            return
+        self._trained_rows = meta["trained_rows"]
+        self._centroids = np.memmap(self.centroids_path, dtype="<f4", mode="r").reshape(
+            -1, self.dim
+        )
+        self._map_assignments()
+
+    def _map_assignments(self) -> None:
+        if self.assign_path.stat().st_size:
+            self._assign = np.memmap(self.assign_path, dtype="<i4", mode="r")
+        else:
+            self._assign = np.zeros(0, dtype=np.int32)
+
+    def _clear_quantizer(self) -> None:
+        for path in (self.meta_path, self.centroids_path, self.assign_path):
+            if path.exists():
+                path.unlink()
+        self._centroids = None
+        self._assign = None
+        self._trained_rows = 0
+
+    def train(self) -> None:
+        """Cluster the current rows and assign every row to its nearest list."""
+        if np is None:
+            return
+        with self._lock:
+            self._ensure_loaded()
+            removed = np.asarray(self._offsets) < 0
+            live = np.flatnonzero(~removed)
+            if not len(live):
+                return
+            lists = self.lists or int(math.sqrt(len(live)))
+            lists = max(1, min(lists, MAX_LISTS, len(live)))
+            rng = np.random.default_rng(0)
+            sample_size = min(len(live), lists * _TRAIN_POINTS_PER_LIST)
+            sample = self._matrix[np.sort(rng.choice(live, size=sample_size, replace=False))]
+            centroids = spherical_kmeans(sample, lists)
+
+            labels = _nearest(self._matrix, centroids)
+            labels[removed] = _REMOVED
+            self._clear_quantizer()
+            _write_atomic(self.centroids_path, centroids.astype("<f4").tobytes())
+            _write_atomic(self.assign_path, labels.astype("<i4").tobytes())
+            _write_atomic(
+                self.meta_path,
+                json.dumps({"dim": self.dim, "lists": lists, "trained_rows": len(live)}).encode(),
+            )
+            self._signature = self._signatures()
+            self._trained_rows = len(live)
+            self._centroids = np.memmap(self.centroids_path, dtype="<f4", mode="r").reshape(
+                -1, self.dim
+            )
+            self._map_assignments()
+
+    def _write_labels(self, rows: Sequence[int], labels: Sequence[int]) -> None:
+        # ``rows`` is sorted; runs of consecutive rows (appends, mostly) are
+        # written with one call each.
+        packed = np.asarray(labels, dtype="<i4")
+        with self.assign_path.open("r+b") as handle:
+            start = 0
+            for end in range(1, len(rows) + 1):
+                if end == len(rows) or rows[end] != rows[end - 1] + 1:
+                    handle.seek(4 * rows[start])
+                    handle.write(packed[start:end].tobytes())
+                    start = end
+        self._map_assignments()
+        self._signature = self._signatures()
+
+    def _store(self, embedded: Sequence[Tuple[str, array]]) -> None:
+        with self._lock:
+            super()._store(embedded)
+            if self._centroids is None:
+                return
+            # Rewritten rows plus any rows appended without assignments (for
+            # example by a process using the flat index).
+            rows = sorted(
+                {self._rows[doc_id] for doc_id, _ in embedded}
+                | set(range(len(self._assign), self._count))
+            )
+            labels = _nearest(self._matrix[rows], self._centroids)
+            self._write_labels(rows, labels)
+
+    def remove(self, doc_ids: Iterable[str]) -> None:
+        with self._lock:
+            self._ensure_loaded()
+            doc_ids = list(doc_ids)
+            row_map = self._row_map()
+            rows = [row_map[doc_id] for doc_id in doc_ids if doc_id in row_map]
+            super().remove(doc_ids)
+            if self._centroids is not None:
+                rows = sorted(row for row in rows if row < len(self._assign))
+                self._write_labels(rows, [_REMOVED] * len(rows))
+
+    def rebuild(self, documents: Iterable[Tuple[str, str]]) -> None:
+        with self._lock:
+            self._clear_quantizer()
+            super().rebuild(documents)
+
+    def _candidates(self, query: array):
+        if np is None:
+            return None
+        live = self._live_count()
+        if live >= MIN_TRAIN_ROWS and (
+            self._centroids is None or live > RETRAIN_GROWTH * self._trained_rows
+        ):
+            self.train()
+        if self._centroids is None:
+            return None
+
+        centroids = self._centroids
+        nprobe = min(self.nprobe, len(centroids))
+        scores = centroids @ np.frombuffer(query, dtype=np.float32)
+        probe = np.argpartition(-scores, nprobe - 1)[:nprobe]
+        # Indexed by assignment: the last slot (-1) marks unassigned rows,
+        # which are always scanned; the one before it (-2) marks removed rows.
+        selected = np.zeros(len(centroids) + 2, dtype=bool)
+        selected[probe] = True
+        selected[_UNASSIGNED] = True
+        assign = self._assign[: self._count]
+        rows = np.flatnonzero(selected[assign])
+        if len(assign) < self._count:
+            rows = np.concatenate([rows, np.arange(len(assign), self._count)])
+        return rows
+
@@ -0,0 +1,817 @@
+"""Storage backends: one interface over the SQLite store and an in-memory index.
+
+``StorageBackend`` is what the CLI, the HTTP server and the Lambda handlers
+talk to. ``SQLiteBackend`` delegates to the functions in
+``rag_system.storage`` (FTS5, passages, the dense index and the query cache).
+``MemoryBackend`` keeps an inverted index in process memory for hot,
+read-mostly data: each term's postings are two ``array`` columns (entry
+numbers and term frequencies) and matches are ranked with the bm25 formula
+FTS5 uses. It is loaded from the SQLite database, and writes go to that
+database first, so both stay in step.
+
+``ShardedBackend`` spreads documents over several backends by a hash of
+their doc_id and answers searches by querying every shard in parallel.
+
+``get_backend`` returns the engine named by ``Config.storage_backend``
+(``RAG_STORAGE_BACKEND``), split over ``Config.shards`` (``RAG_SHARDS``)
+databases, one instance per process.
+"""
+
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from dataclasses import replace
+import heapq
+from itertools import islice
+import json
+import math
+from pathlib import Path
+import re
+import threading
+from typing import Callable, ContextManager, Dict, Iterable, Iterator, List, Optional, Protocol, Sequence, Tuple, TypeVar
+
+from .chunking import DEFAULT_CHUNK_OVERLAP, DEFAULT_CHUNK_SIZE, Passage, chunk_text
+from .config import Config
+from .query import ParsedQuery
+from .storage import (
+    HYBRID_CANDIDATES,
+    MAX_SNIPPET_TOKENS,
+    SEARCH_MODES,
+    DocumentRecord,
+    SearchResult,
+    _parsed_query,
+    add_document,
+    add_documents,
+    check_listing,
+    delete_documents,
+    get_document,
+    get_pool,
+    initialize_database,
+    iter_documents,
+    list_documents,
+    project_record,
+    search_documents,
+    search_passages,
+    shard_index,
+    shard_paths,
+    term_statistics,
+)
+from .tokens import stem, tokenize
+
+
+BACKENDS = ("sqlite", "memory")
+
+
+class StorageBackend(Protocol):
+    """Document storage and retrieval used by every entry point."""
+
+    #: Values accepted by ``search(mode=...)``.
+    search_modes: Tuple[str, ...]
+
+    def initialize(self) -> None:
+        ...
+
+    def session(self) -> ContextManager[None]:
+        """Context for many calls in a row from one thread (e.g. a batch)."""
+        ...
+
+    def add(
+        self,
+        doc_id: str,
+        content: str,
+        source: str = "manual",
+        metadata: Optional[dict] = None,
+    ) -> DocumentRecord:
+        ...
+
+    def add_many(self, records: Iterable[DocumentRecord]) -> List[DocumentRecord]:
+        ...
+
+    def get(self, doc_id: str) -> Optional[DocumentRecord]:
+        ...
+
+    def iter_documents(
+        self, after: Optional[str] = None, limit: Optional[int] = None, fields: str = "full"
+    ) -> Iterator[DocumentRecord]:
+        """Documents in doc_id order after ``after``, projected to ``fields``."""
+        ...
+
+    def list(
+        self, after: Optional[str] = None, limit: Optional[int] = None, fields: str = "full"
+    ) -> List[DocumentRecord]:
+        ...
+
+    def search(
+        self,
+        query: str,
+        limit: int = 5,
+        snippet_tokens: Optional[int] = None,
+        markers: Tuple[str, str] = ("", ""),
+        mode: str = "bm25",
+    ) -> List[SearchResult]:
+        ...
+
+    def search_passages(self, query: str, limit: int = 5) -> List[SearchResult]:
+        ...
+
+    def delete(self, doc_ids: Iterable[str]) -> int:
+        ...
+
+    def term_statistics(
+        self, terms: Sequence[str], passages: bool = False
+    ) -> Tuple[int, Tuple[int, ...]]:
+        """Documents (or passages) stored, and how many match each term."""
+        ...
+
+
+class SQLiteBackend:
+    """The SQLite FTS5 store in ``rag_system.storage``."""
+
+    search_modes = SEARCH_MODES
+
+    def __init__(self, db_path: Path) -> None:
+        self.db_path = Path(db_path)
+
+    def initialize(self) -> None:
+        initialize_database(self.db_path)
+
+    @contextmanager
+    def session(self) -> Iterator[None]:
+        # One reader connection serves every query of the session.
+        with get_pool(self.db_path).pinned_reader():
+            yield
+
+    def add(
+        self,
+        doc_id: str,
+        content: str,
+        source: str = "manual",
+        metadata: Optional[dict] = None,
+    ) -> DocumentRecord:
+        return add_document(self.db_path, doc_id, content, source, metadata)
+
+    def add_many(self, records: Iterable[DocumentRecord]) -> List[DocumentRecord]:
+        return add_documents(self.db_path, records)
+
+    def get(self, doc_id: str) -> Optional[DocumentRecord]:
+        return get_document(self.db_path, doc_id)
+
+    def iter_documents(
+        self, after: Optional[str] = None, limit: Optional[int] = None, fields: str = "full"
+    ) -> Iterator[DocumentRecord]:
+        return iter_documents(self.db_path, after, limit, fields)
+
+    def list(
+        self, after: Optional[str] = None, limit: Optional[int] = None, fields: str = "full"
+    ) -> List[DocumentRecord]:
+        return list_documents(self.db_path, after, limit, fields)
+
+    def search(
+        self,
+        query: str,
+        limit: int = 5,
+        snippet_tokens: Optional[int] = None,
+        markers: Tuple[str, str] = ("", ""),
+        mode: str = "bm25",
+    ) -> List[SearchResult]:
+        return search_documents(
+            self.db_path, query, limit, snippet_tokens=snippet_tokens, markers=markers, mode=mode
+        )
+
+    def search_passages(self, query: str, limit: int = 5) -> List[SearchResult]:
+        return search_passages(self.db_path, query, limit)
+
+    def delete(self, doc_ids: Iterable[str]) -> int:
+        return delete_documents(self.db_path, doc_ids)
+
+    def term_statistics(
+        self, terms: Sequence[str], passages: bool = False
+    ) -> Tuple[int, Tuple[int, ...]]:
+        return term_statistics(self.db_path, terms, "passages" if passages else "documents")
+
+
+# FTS5's bm25 defaults.
+_BM25_K1 = 1.2
+_BM25_B = 0.75
+# FTS5 clamps non-positive idf (terms in over half the rows) to this.
+_MIN_IDF = 1e-6
+
+
+def _bm25_idf(rows: int, matches: int) -> float:
+    return max(math.log((rows - matches + 0.5) / (matches + 0.5)), _MIN_IDF)
+
+
+class _Postings:
+    __slots__ = ("entries", "freqs", "live")
+
+    def __init__(self) -> None:
+        self.entries = array("I")
+        self.freqs = array("I")
+        # Entries still present; removed entries stay in the arrays until the
+        # owner compacts the index.
+        self.live = 0
+
+
+def _terms(text: str) -> Counter:
+    return Counter(map(stem, tokenize(text)))
+
+
+def _row_text(record: DocumentRecord) -> str:
+    # FTS5 matches and length-normalizes over every column of the documents
+    # table, so the memory index does the same.
+    return " ".join((record.doc_id, record.content, record.source, json.dumps(record.metadata)))
+
+
+class _InvertedIndex:
+    """bm25 over numbered text entries, with append-only array postings.
+
+    Entries are numbered in insertion order, so every postings list is sorted
+    and later lists are probed with a binary search.
+    """
+
+    def __init__(self) -> None:
+        self._postings: Dict[str, _Postings] = {}
+        self._lengths = array("I")
+        self._alive = bytearray()
+        self._count = 0
+        self._total_length = 0
+
+    def add(self, text: str) -> int:
+        entry = len(self._lengths)
+        terms = _terms(text)
+        for term, count in terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = _Postings()
+            postings.entries.append(entry)
+            postings.freqs.append(count)
+            postings.live += 1
+        length = sum(terms.values())
+        self._lengths.append(length)
+        self._alive.append(1)
+        self._count += 1
+        self._total_length += length
+        return entry
+
+    def remove(self, entry: int, text: str) -> None:
+        if not self._alive[entry]:
+            return
+        self._alive[entry] = 0
+        self._count -= 1
+        self._total_length -= self._lengths[entry]
+        for term in _terms(text):
+            self._postings[term].live -= 1
+
+    def statistics(self, terms: Sequence[str]) -> Tuple[int, Tuple[int, ...]]:
+        # A term that tokenizes to several words is counted by its rarest word.
+        matches = []
+        for term in terms:
+            lists = [self._postings.get(stem(token)) for token in tokenize(term)]
+            matches.append(
+                min((postings.live if postings else 0) for postings in lists) if lists else 0
+            )
+        return self._count, tuple(matches)
+
+    def search(self, terms: Sequence[str]) -> List[Tuple[float, int]]:
+        """``(score, entry)`` for every live entry containing all ``terms``.
+
+        Scores follow FTS5's ``rank``: negated bm25, so lower is better.
+        """
+        lists = [self._postings.get(term) for term in terms]
+        if not lists or any(postings is None or not postings.live for postings in lists):
+            return []
+        lists.sort(key=lambda postings: len(postings.entries))
+        idfs = [_bm25_idf(self._count, postings.live) for postings in lists]
+        average = self._total_length / self._count
+        lengths = self._lengths
+        alive = self._alive
+        first, rest = lists[0], lists[1:]
+        matches = []
+        for position, entry in enumerate(first.entries):
+            if not alive[entry]:
+                continue
+            freqs = [first.freqs[position]]
+            for postings in rest:
+                found = bisect_left(postings.entries, entry)
+                if found == len(postings.entries) or postings.entries[found] != entry:
+                    break
+                freqs.append(postings.freqs[found])
+            else:
+                norm = _BM25_K1 * (1 - _BM25_B + _BM25_B * lengths[entry] / average)
+                score = sum(
+                    idf * freq * (_BM25_K1 + 1) / (freq + norm) for idf, freq in zip(idfs, freqs)
+                )
+                matches.append((-score, entry))
+        return matches
+
+
+_WORD_RE = re.compile(r"\S+")
+
+
+def _snippet(content: str, terms: Sequence[str], tokens: int, markers: Tuple[str, str]) -> str:
+    # An approximation of FTS5's snippet(): a window of ``tokens`` words
+    # starting just before the first match, with matched words wrapped.
+    words = _WORD_RE.findall(content)
+    wanted = set(terms)
+
+    def matches(word: str) -> bool:
+        return any(stem(token) in wanted for token in tokenize(word))
+
+    first = next((idx for idx, word in enumerate(words) if matches(word)), 0)
+    start = max(0, min(first - tokens // 4, len(words) - tokens))
+    end = min(start + tokens, len(words))
+    opening, closing = markers
+    window = [
+        f"{opening}{word}{closing}" if (opening or closing) and matches(word) else word
+        for word in words[start:end]
+    ]
+    return ("..." if start else "") + " ".join(window) + ("..." if end < len(words) else "")
+
+
+def _memory_terms(parsed: ParsedQuery) -> List[str]:
+    # No positions are indexed: phrases and NEAR groups match as all of their
+    # words, and prefix terms as whole words.
+    return list(dict.fromkeys(stem(token) for token in tokenize(parsed.text)))
+
+
+class MemoryBackend:
+    """In-process inverted index with the ``StorageBackend`` interface.
+
+    Only ``mode="bm25"`` is supported. Replaced and deleted documents leave
+    dead postings behind; both indexes are rebuilt once dead entries outnumber
+    live ones.
+
+    With a ``db_path``, writes go to that SQLite database before the index is
+    updated, so other processes and backends see them; without one the index
+    is all there is.
+    """
+
+    search_modes: Tuple[str, ...] = ("bm25",)
+
+    def __init__(
+        self,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        chunk_overlap: int = DEFAULT_CHUNK_OVERLAP,
+        db_path: Optional[Path] = None,
+    ) -> None:
+        chunk_text("probe", size=chunk_size, overlap=chunk_overlap)
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.db_path = None if db_path is None else Path(db_path)
+        self._lock = threading.RLock()
+        # Serializes writes, so the database and the index apply them in the
+        # same order; searches only wait for ``_lock``.
+        self._write_lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._documents = _InvertedIndex()
+        self._passages = _InvertedIndex()
+        # doc_id -> (document entry, passage entries)
+        self._entries: Dict[str, Tuple[int, List[int]]] = {}
+        self._records: List[Optional[DocumentRecord]] = []
+        self._passage_owners: List[Tuple[str, Passage]] = []
+        self._dead = 0
+        # Live doc_ids in order, for listing; rebuilt after inserts and deletes.
+        self._sorted_ids: Optional[List[str]] = None
+
+    def initialize(self) -> None:
+        if self.db_path is not None:
+            initialize_database(self.db_path)
+
+    def session(self) -> ContextManager[None]:
+        return nullcontext()
+
+    def add(
+        self,
+        doc_id: str,
+        content: str,
+        source: str = "manual",
+        metadata: Optional[dict] = None,
+    ) -> DocumentRecord:
+        if not doc_id:
+            raise ValueError("doc_id must be provided")
+        if not content:
+            raise ValueError("content must be provided")
+        record = DocumentRecord(
+            doc_id=doc_id, content=content, source=source, metadata=metadata or {}
+        )
+        return self.add_many([record])[0]
+
+    def add_many(self, records: Iterable[DocumentRecord]) -> List[DocumentRecord]:
+        records = list(records)
+        with self._write_lock:
+            if self.db_path is not None:
+                add_documents(self.db_path, records)
+            with self._lock:
+                for record in records:
+                    self._store(record)
+        return records
+
+    def _load(self, records: Iterable[DocumentRecord]) -> None:
+        # Index records already in the database, without writing them back.
+        with self._lock:
+            for record in records:
+                self._store(record)
+
+    def _store(self, record: DocumentRecord) -> None:
+        if not self._discard(record.doc_id):
+            self._sorted_ids = None
+        entry = self._documents.add(_row_text(record))
+        self._records.append(record)
+        passage_entries = []
+        for passage in chunk_text(record.content, size=self.chunk_size, overlap=self.chunk_overlap):
+            passage_entries.append(self._passages.add(passage.text))
+            self._passage_owners.append((record.doc_id, passage))
+        self._entries[record.doc_id] = (entry, passage_entries)
+
+    def _discard(self, doc_id: str) -> bool:
+        found = self._entries.pop(doc_id, None)
+        if found is None:
+            return False
+        entry, passage_entries = found
+        self._documents.remove(entry, _row_text(self._records[entry]))
+        self._records[entry] = None
+        for passage_entry in passage_entries:
+            self._passages.remove(passage_entry, self._passage_owners[passage_entry][1].text)
+        self._dead += 1
+        if self._dead > max(len(self._entries), 1024):
+            self._compact()
+        return True
+
+    def _compact(self) -> None:
+        records = [record for record in self._records if record is not None]
+        self._reset()
+        for record in records:
+            self._store(record)
+
+    def get(self, doc_id: str) -> Optional[DocumentRecord]:
+        with self._lock:
+            found = self._entries.get(doc_id)
+            return None if found is None else self._records[found[0]]
+
+    def _ordered_ids(self) -> List[str]:
+        if self._sorted_ids is None:
+            self._sorted_ids = sorted(self._entries)
+        return self._sorted_ids
+
+    def iter_documents(
+        self, after: Optional[str] = None, limit: Optional[int] = None, fields: str = "full"
+    ) -> Iterator[DocumentRecord]:
+        check_listing(limit, fields)
+        with self._lock:
+            ordered = self._ordered_ids()
+            start = bisect_right(ordered, after) if after else 0
+            end = len(ordered) if limit is None else start + limit
+            doc_ids = ordered[start:end]
+        records = map(self.get, doc_ids)
+        return (project_record(record, fields) for record in records if record is not None)
+
+    def list(
+        self, after: Optional[str] = None, limit: Optional[int] = None, fields: str = "full"
+    ) -> List[DocumentRecord]:
+        return list(self.iter_documents(after, limit, fields))
+
+    def delete(self, doc_ids: Iterable[str]) -> int:
+        doc_ids = set(doc_ids)
+        with self._write_lock:
+            if self.db_path is not None:
+                delete_documents(self.db_path, doc_ids)
+            with self._lock:
+                deleted = sum(self._discard(doc_id) for doc_id in doc_ids)
+                if deleted:
+                    self._sorted_ids = None
+                return deleted
+
+    def term_statistics(
+        self, terms: Sequence[str], passages: bool = False
+    ) -> Tuple[int, Tuple[int, ...]]:
+        with self._lock:
+            return (self._passages if passages else self._documents).statistics(terms)
+
+    def search(
+        self,
+        query: str,
+        limit: int = 5,
+        snippet_tokens: Optional[int] = None,
+        markers: Tuple[str, str] = ("", ""),
+        mode: str = "bm25",
+    ) -> List[SearchResult]:
+        parsed = _parsed_query(query, limit)
+        if snippet_tokens is not None and not 0 < snippet_tokens <= MAX_SNIPPET_TOKENS:
+            raise ValueError(f"snippet_tokens must be between 1 and {MAX_SNIPPET_TOKENS}")
+        if mode not in self.search_modes:
+            raise ValueError(f"mode must be one of {self.search_modes} with the memory backend")
+
+        terms = _memory_terms(parsed)
+        with self._lock:
+            ranked = heapq.nsmallest(limit, self._documents.search(terms))
+            hits = [(score, self._records[entry]) for score, entry in ranked]
+        return [
+            SearchResult(
+                doc_id=record.doc_id,
+                content=record.content
+                if snippet_tokens is None
+                else _snippet(record.content, terms, snippet_tokens, markers),
+                source=record.source,
+                score=score,
+                metadata=dict(record.metadata),
+                lexical_score=score,
+            )
+            for score, record in hits
+        ]
+
+    def search_passages(self, query: str, limit: int = 5) -> List[SearchResult]:
+        terms = _memory_terms(_parsed_query(query, limit))
+        with self._lock:
+            best: Dict[str, Tuple[float, int]] = {}
+            for score, entry in self._passages.search(terms):
+                doc_id = self._passage_owners[entry][0]
+                if doc_id not in best or (score, entry) < best[doc_id]:
+                    best[doc_id] = (score, entry)
+            hits = []
+            for score, entry in heapq.nsmallest(limit, best.values()):
+                doc_id, passage = self._passage_owners[entry]
+                hits.append((score, passage, self._records[self._entries[doc_id][0]]))
+        results = []
+        for score, passage, record in hits:
+            metadata = dict(record.metadata)
+            metadata["passage"] = {"index": passage.index, "start": passage.start, "end": passage.end}
+            results.append(
+                SearchResult(
+                    doc_id=record.doc_id,
+                    content=passage.text,
+                    source=record.source,
+                    score=score,
+                    metadata=metadata,
+                )
+            )
+        return results
+
+
+_T = TypeVar("_T")
+
+
+class ShardedBackend:
+    """``StorageBackend`` over several shards, routed by a hash of doc_id.
+
+    Writes go to the owning shard; batches are split by shard and written
+    concurrently. Searches run on every shard at once on a thread pool (SQLite
+    and NumPy release the GIL) and each shard's best ``limit`` results are
+    merged with a heap. bm25 idf depends on the rows a shard holds, so bm25
+    scores are first rescaled to corpus-wide idf, computed from each shard's
+    row and match counts: every score is multiplied by the ratio of the
+    query's summed corpus idf to its summed shard idf. Length normalisation
+    keeps each shard's average row length, which converges on the corpus
+    average as shards grow, since routing is uniform. Dense scores are cosine
+    similarities and need no correction. Hybrid search fuses the merged bm25
+    and dense rankings once, so fusion sees corpus-wide ranks.
+    """
+
+    def __init__(self, shards: Sequence[StorageBackend], workers: int = 0) -> None:
+        if not shards:
+            raise ValueError("at least one shard is required")
+        self.shards = list(shards)
+        self.search_modes = tuple(
+            mode for mode in SEARCH_MODES if all(mode in shard.search_modes for shard in shards)
+        )
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers or 2 * len(self.shards), thread_name_prefix="rag-shard"
+        )
+
+    def _shard(self, doc_id: str) -> StorageBackend:
+        return self.shards[shard_index(doc_id, len(self.shards))]
+
+    def _scatter(self, call: Callable[[StorageBackend], _T]) -> List[_T]:
+        return list(self._executor.map(call, self.shards))
+
+    def _split(self, doc_ids: Iterable[str]) -> List[List[str]]:
+        groups: List[List[str]] = [[] for _ in self.shards]
+        for doc_id in doc_ids:
+            groups[shard_index(doc_id, len(self.shards))].append(doc_id)
+        return groups
+
+    def initialize(self) -> None:
+        self._scatter(lambda shard: shard.initialize())
+
+    def session(self) -> ContextManager[None]:
+        # Shard calls run on pool threads, which check out their own readers.
+        return nullcontext()
+
+    def add(
+        self,
+        doc_id: str,
+        content: str,
+        source: str = "manual",
+        metadata: Optional[dict] = None,
+    ) -> DocumentRecord:
+        if not doc_id:
+            raise ValueError("doc_id must be provided")
+        return self._shard(doc_id).add(doc_id, content, source, metadata)
+
+    def add_many(self, records: Iterable[DocumentRecord]) -> List[DocumentRecord]:
+        records = list(records)
+        groups: List[List[DocumentRecord]] = [[] for _ in self.shards]
+        for record in records:
+            groups[shard_index(record.doc_id, len(self.shards))].append(record)
+        list(
+            self._executor.map(
+                lambda pair: pair[0].add_many(pair[1]) if pair[1] else None,
+                zip(self.shards, groups),
+            )
+        )
+        return records
+
+    def get(self, doc_id: str) -> Optional[DocumentRecord]:
+        return self._shard(doc_id).get(doc_id)
+
+    def iter_documents(
+        self, after: Optional[str] = None, limit: Optional[int] = None, fields: str = "full"
+    ) -> Iterator[DocumentRecord]:
+        check_listing(limit, fields)
+        merged = heapq.merge(
+            *(shard.iter_documents(after, limit, fields) for shard in self.shards), key=_doc_id
+        )
+        return islice(merged, limit)
+
+    def list(
+        self, after: Optional[str] = None, limit: Optional[int] = None, fields: str = "full"
+    ) -> List[DocumentRecord]:
+        return list(self.iter_documents(after, limit, fields))
+
+    def delete(self, doc_ids: Iterable[str]) -> int:
+        return sum(
+            self._executor.map(
+                lambda pair: pair[0].delete(pair[1]) if pair[1] else 0,
+                zip(self.shards, self._split(set(doc_ids))),
+            )
+        )
+
+    def term_statistics(
+        self, terms: Sequence[str], passages: bool = False
+    ) -> Tuple[int, Tuple[int, ...]]:
+        return _sum_statistics(self._scatter(lambda shard: shard.term_statistics(terms, passages)))
+
+    def _lexical(
+        self, terms: Sequence[str], search: Callable[[StorageBackend], List[SearchResult]],
+        limit: int, passages: bool = False,
+    ) -> List[SearchResult]:
+        gathered = self._scatter(
+            lambda shard: (search(shard), shard.term_statistics(terms, passages))
+        )
+        rows, matches = _sum_statistics([statistics for _, statistics in gathered])
+        corpus_idf = sum(_bm25_idf(rows, count) for count in matches)
+        rescaled = []
+        for results, (shard_rows, shard_matches) in gathered:
+            shard_idf = sum(_bm25_idf(shard_rows, count) for count in shard_matches)
+            factor = corpus_idf / shard_idf if results and shard_idf else 1.0
+            rescaled.append([_rescaled(result, factor) for result in results])
+        return list(islice(heapq.merge(*rescaled, key=_score), limit))
+
+    def _dense(self, query: str, limit: int, snippet_tokens: Optional[int]) -> List[SearchResult]:
+        gathered = self._scatter(
+            lambda shard: shard.search(query, limit, snippet_tokens=snippet_tokens, mode="dense")
+        )
+        return _merged_dense(gathered, limit)
+
+    def search(
+        self,
+        query: str,
+        limit: int = 5,
+        snippet_tokens: Optional[int] = None,
+        markers: Tuple[str, str] = ("", ""),
+        mode: str = "bm25",
+    ) -> List[SearchResult]:
+        terms = _parsed_query(query, limit).phrases
+        if mode not in self.search_modes:
+            raise ValueError(f"mode must be one of {self.search_modes}")
+        if mode == "dense":
+            return self._dense(query, limit, snippet_tokens)
+        depth = limit if mode == "bm25" else limit * HYBRID_CANDIDATES
+
+        def lexical() -> List[SearchResult]:
+            return self._lexical(
+                terms,
+                lambda shard: shard.search(query, depth, snippet_tokens, markers),
+                depth,
+            )
+
+        if mode == "bm25":
+            return lexical()
+        # Each shard's dense search is its own pool task, queued before the
+        # bm25 fan-out; a pool task that itself waited on pool tasks could
+        # deadlock once concurrent requests occupy every worker.
+        dense_futures = [
+            self._executor.submit(
+                shard.search, query, depth, snippet_tokens=snippet_tokens, mode="dense"
+            )
+            for shard in self.shards
+        ]
+        lexical_results = lexical()
+        dense = _merged_dense([future.result() for future in dense_futures], depth)
+        return _fuse(lexical_results, dense, limit)
+
+    def search_passages(self, query: str, limit: int = 5) -> List[SearchResult]:
+        terms = _parsed_query(query, limit).phrases
+        return self._lexical(
+            terms, lambda shard: shard.search_passages(query, limit), limit, passages=True
+        )
+
+
+def _doc_id(record: DocumentRecord) -> str:
+    return record.doc_id
+
+
+def _score(result: SearchResult) -> float:
+    return result.score
+
+
+def _negative_score(result: SearchResult) -> float:
+    return -result.score
+
+
+def _merged_dense(gathered: Sequence[List[SearchResult]], limit: int) -> List[SearchResult]:
+    return list(islice(heapq.merge(*gathered, key=_negative_score), limit))
+
+
+def _rescaled(result: SearchResult, factor: float) -> SearchResult:
+    if factor == 1.0:
+        return result
+    lexical = result.lexical_score
+    return replace(
+        result,
+        score=result.score * factor,
+        lexical_score=None if lexical is None else lexical * factor,
+    )
+
+
+def _sum_statistics(
+    statistics: Sequence[Tuple[int, Tuple[int, ...]]]
+) -> Tuple[int, Tuple[int, ...]]:
+    rows = sum(shard_rows for shard_rows, _ in statistics)
+    matches = tuple(sum(counts) for counts in zip(*(shard for _, shard in statistics)))
+    return rows, matches
+
+
+def _fuse(
+    lexical: List[SearchResult], dense: List[SearchResult], limit: int
+) -> List[SearchResult]:
+    # The same fusion as a single database's hybrid mode, over merged rankings.
+    from .fusion import reciprocal_rank_fusion
+
+    fused = reciprocal_rank_fusion(
+        [[result.doc_id for result in lexical], [result.doc_id for result in dense]]
+    )[:limit]
+    by_id = {result.doc_id: result for result in dense}
+    by_id.update((result.doc_id, result) for result in lexical)
+    dense_scores = {result.doc_id: result.score for result in dense}
+    return [
+        replace(by_id[doc_id], score=score, dense_score=dense_scores.get(doc_id))
+        for doc_id, score in fused
+    ]
+
+
+_BACKENDS: Dict[tuple, StorageBackend] = {}
+_BACKENDS_LOCK = threading.Lock()
+
+
+def get_backend(config: Config) -> StorageBackend:
+    """Return this process's backend for ``config``.
+
+    The memory backend starts with the documents of each shard database that
+    exists.
+    """
+    name = config.storage_backend
+    if name not in BACKENDS:
+        raise ValueError(f"unknown storage backend {name!r}; expected one of {BACKENDS}")
+    key = (name, config.db_path, config.shards, config.chunk_size, config.chunk_overlap)
+    backend = _BACKENDS.get(key)
+    if backend is not None:
+        return backend
+    with _BACKENDS_LOCK:
+        backend = _BACKENDS.get(key)
+        if backend is None:
+            shards = [_open(name, path, config) for path in shard_paths(config.db_path, config.shards)]
+            backend = shards[0] if len(shards) == 1 else ShardedBackend(shards)
+            _BACKENDS[key] = backend
+    return backend
+
+
+def _open(name: str, db_path: Path, config: Config) -> StorageBackend:
+    if name == "sqlite":
+        return SQLiteBackend(db_path)
+    backend = MemoryBackend(config.chunk_size, config.chunk_overlap, db_path)
+    if db_path.exists():
+        initialize_database(db_path)
+        backend._load(list_documents(db_path))
+    return backend
+
+
+def close_backends() -> None:
+    """Forget every backend created by ``get_backend``."""
+    with _BACKENDS_LOCK:
+        _BACKENDS.clear()
@@ -0,0 +1,128 @@
+"""Answer many search or generate queries in one call.
+
+Offline evaluation and upstream services send hundreds of queries at a time.
+``search_many`` and ``generate_many`` answer them on one backend without the
+per-request HTTP and configuration work:
+
+- Identical queries are answered once and share their results.
+- Every query is validated before any is run, so a bad query fails the
+  batch without half of it having been searched.
+- The unique queries are split into ``workers`` contiguous slices. Each slice
+  runs on its own thread inside one ``StorageBackend.session``, so with
+  SQLite every query in a slice reuses one pooled reader connection.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+from .backends import StorageBackend
+from .generator import generate_response
+from .storage import SearchResult, _parsed_query
+
+# Largest batch accepted by the HTTP endpoints.
+MAX_BATCH_QUERIES = 1000
+UNITS = ("document", "passage")
+
+_T = TypeVar("_T")
+
+
+def _unique(queries: Sequence[str], limit: int) -> List[str]:
+    seen: Dict[str, None] = {}
+    for idx, query in enumerate(queries):
+        if not isinstance(query, str):
+            raise ValueError(f"queries[{idx}]: query must be a string")
+        if query in seen:
+            continue
+        try:
+            _parsed_query(query, limit)
+        except ValueError as exc:
+            raise ValueError(f"queries[{idx}]: {exc}") from None
+        seen[query] = None
+    return list(seen)
+
+
+def _run(
+    backend: StorageBackend,
+    queries: List[str],
+    answer: Callable[[str], _T],
+    workers: int,
+) -> Dict[str, _T]:
+    if workers <= 0:
+        raise ValueError("workers must be positive")
+
+    def run_slice(part: List[str]) -> List[Tuple[str, _T]]:
+        with backend.session():
+            return [(query, answer(query)) for query in part]
+
+    workers = min(workers, len(queries))
+    if workers <= 1:
+        return dict(run_slice(queries))
+    size = -(-len(queries) // workers)
+    parts = [queries[start : start + size] for start in range(0, len(queries), size)]
+    answers: Dict[str, _T] = {}
+    with ThreadPoolExecutor(max_workers=len(parts), thread_name_prefix="rag-batch") as executor:
+        for pairs in executor.map(run_slice, parts):
+            answers.update(pairs)
+    return answers
+
+
+def search_many(
+    backend: StorageBackend,
+    queries: Sequence[str],
+    limit: int = 5,
+    mode: str = "bm25",
+    unit: str = "document",
+    snippet_tokens: Optional[int] = None,
+    markers: Tuple[str, str] = ("", ""),
+    workers: int = 1,
+) -> List[List[SearchResult]]:
+    """Search results for each of ``queries``, in the same order.
+
+    ``unit="passage"`` returns the best passage per document, like
+    ``search_passages``, and only supports ``mode="bm25"``. The other
+    arguments mean what they do for ``StorageBackend.search``.
+    """
+    if unit not in UNITS:
+        raise ValueError(f"unit must be one of {UNITS}")
+    if mode not in backend.search_modes or (unit == "passage" and mode != "bm25"):
+        raise ValueError(f"mode must be one of {backend.search_modes} for documents")
+    unique = _unique(queries, limit)
+    if not unique:
+        return []
+    if unit == "passage":
+        answers = _run(
+            backend, unique, lambda query: backend.search_passages(query, limit), workers
+        )
+    else:
+        answers = _run(
+            backend,
+            unique,
+            lambda query: backend.search(query, limit, snippet_tokens, markers, mode),
+            workers,
+        )
+    return [answers[query] for query in queries]
+
+
+def generate_many(
+    backend: StorageBackend,
+    queries: Sequence[str],
+    limit: int = 5,
+    workers: int = 1,
+) -> List[Dict[str, object]]:
+    """``generate_response`` over the top ``limit`` passages of each query.
+
+    Responses come back in the order of ``queries``; repeated queries share
+    one response object, which callers must treat as read-only.
+    """
+    unique = _unique(queries, limit)
+    if not unique:
+        return []
+    answers = _run(
+        backend,
+        unique,
+        lambda query: generate_response(query, backend.search_passages(query, limit)),
+        workers,
+    )
+    return [answers[query] for query in queries]
@@ -0,0 +1,51 @@
+"""Split documents into overlapping passages for passage-level retrieval."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+import re
+from typing import List
+
+
+DEFAULT_CHUNK_SIZE = 48
+DEFAULT_CHUNK_OVERLAP = 12
+
+_WORD_RE = re.compile(r"\S+")
+
+
+@dataclass(frozen=True)
+class Passage:
+    index: int
+    start: int
+    end: int
+    text: str
+
+
+def chunk_text(
+    text: str,
+    size: int = DEFAULT_CHUNK_SIZE,
+    overlap: int = DEFAULT_CHUNK_OVERLAP,
+) -> List[Passage]:
+    """Split ``text`` into windows of ``size`` words sharing ``overlap`` words.
+
+    ``start``/``end`` are character offsets into ``text``; each passage's text
+    is the original slice, so whitespace inside a passage is preserved.
+    """
+    if size <= 0:
+        raise ValueError("chunk size must be positive")
+    if overlap < 0 or overlap >= size:
+        raise ValueError("chunk overlap must be between 0 and size - 1")
+
+    spans = [match.span() for match in _WORD_RE.finditer(text)]
+    if not spans:
+        return []
+
+    passages = []
+    step = size - overlap
+    for first in range(0, len(spans), step):
+        last = min(first + size, len(spans)) - 1
+        start, end = spans[first][0], spans[last][1]
+        passages.append(Passage(index=len(passages), start=start, end=end, text=text[start:end]))
+        if last == len(spans) - 1:
+            break
+    return passages
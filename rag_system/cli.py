@@ -1,105 +1,242 @@
-"""Command-line interface for the local RAG system."""
+"""Command-line interface for the local RAG system.
+
+Each command imports the modules it uses when it runs, so a command such as
+``analyze`` does not load SQLite, NumPy or the storage layer. Choices that
+those modules define (search modes, listing fields) are validated by the
+command rather than by argparse for the same reason.
+"""
 
 from __future__ import annotations
 
 import argparse
+from contextlib import nullcontext
 import json
 from pathlib import Path
 import sys
+from typing import TYPE_CHECKING
 
-from .config import load_config
-from .storage import (
-    DocumentRecord,
-    add_document,
-    add_documents,
-    ensure_sample_data,
-    initialize_database,
-    list_documents,
-    search_documents,
-)
-from .generator import generate_response
-from .analyzer import analyze_text
+if TYPE_CHECKING:
+    from .config import Config
+    from .pipeline import IngestStats
+    from .profiling import ProfileAggregate
 
+DEFAULT_PROFILE_PREFIX = "rag-profile"
+# Functions listed by --profile, by cumulative time.
+_PROFILE_SUMMARY_LINES = 25
 
-def _load_text(path: Path) -> str:
-    return path.read_text(encoding="utf-8")
 
+def _load_config() -> Config:
+    from .config import load_config
+    from .query import configure_stop_words
+    from .storage import configure_chunking, configure_dense
 
-def cmd_init(_: argparse.Namespace) -> int:
     config = load_config()
-    initialize_database(config.db_path)
-    print(f"Initialized database at {config.db_path}")
+    configure_chunking(config.chunk_size, config.chunk_overlap)
+    configure_stop_words(config.stop_words)
+    configure_dense(
+        config.dense_dim, config.dense_index, config.ivf_lists, config.ivf_nprobe
+    )
+    return config
+
+
+def cmd_init(_: argparse.Namespace) -> int:
+    from .storage import initialize_database, shard_paths
+
+    config = _load_config()
+    for db_path in shard_paths(config.db_path, config.shards):
+        initialize_database(db_path)
+        print(f"Initialized database at {db_path}")
     return 0
 
 
-def cmd_ingest(args: argparse.Namespace) -> int:
-    config = load_config()
-    initialize_database(config.db_path)
-
-    records = []
-    for file_path in args.paths:
-        path = Path(file_path)
-        content = _load_text(path)
-        records.append(
-            DocumentRecord(
-                doc_id=path.stem,
-                content=content,
-                source=str(path),
-                metadata={"filename": path.name},
-            )
-        )
+def cmd_index_vectors(args: argparse.Namespace) -> int:
+    from .storage import build_vector_index, initialize_database, shard_paths
+
+    config = _load_config()
+    indexes = []
+    for db_path in shard_paths(config.db_path, config.shards):
+        initialize_database(db_path)
+        index = build_vector_index(db_path, rebuild=args.rebuild)
+        if index is None:
+            print("Dense index is disabled (RAG_DENSE_DIM=0)", file=sys.stderr)
+            return 1
+        indexes.append(index)
+    summary = {
+        "index": config.dense_index,
+        "dim": indexes[0].dim,
+        "vectors": sum(len(index) for index in indexes),
+    }
+    if config.shards > 1:
+        summary["shards"] = config.shards
+    print(json.dumps(summary, indent=2))
+    return 0
+
 
-    inserted = add_documents(config.db_path, records)
-    print(json.dumps({"inserted": len(inserted)}, indent=2))
+def _ingest_summary(stats: IngestStats) -> dict:
+    return {
+        "inserted": stats.inserted,
+        "updated": stats.updated,
+        "skipped": stats.skipped,
+        "batches": stats.batches,
+    }
+
+
+def cmd_ingest(args: argparse.Namespace) -> int:
+    from .pipeline import DEFAULT_BATCH_SIZE, ingest_files_sharded
+    from .storage import shard_paths
+
+    config = _load_config()
+    stats = ingest_files_sharded(
+        shard_paths(config.db_path, config.shards),
+        [Path(file_path) for file_path in args.paths],
+        workers=args.workers,
+        batch_size=args.batch_size or DEFAULT_BATCH_SIZE,
+        optimize=args.optimize,
+        force=args.force,
+    )
+    print(json.dumps(_ingest_summary(stats), indent=2))
     return 0
 
 
 def cmd_seed(args: argparse.Namespace) -> int:
-    config = load_config()
-    inserted = ensure_sample_data(config.db_path, Path(args.sample_dir))
-    print(json.dumps({"seeded": len(inserted)}, indent=2))
+    from .pipeline import ingest_files_sharded
+    from .storage import shard_paths
+
+    config = _load_config()
+    sample_dir = Path(args.sample_dir)
+    paths = sorted(sample_dir.glob("*.txt")) if sample_dir.exists() else []
+    stats = ingest_files_sharded(
+        shard_paths(config.db_path, config.shards),
+        paths,
+        strip=True,
+        workers=args.workers,
+        force=args.force,
+    )
+    summary = _ingest_summary(stats)
+    summary["seeded"] = stats.processed
+    print(json.dumps(summary, indent=2))
     return 0
 
 
-def cmd_list(_: argparse.Namespace) -> int:
-    config = load_config()
-    docs = list_documents(config.db_path)
-    print(json.dumps([doc.__dict__ for doc in docs], indent=2))
+def cmd_list(args: argparse.Namespace) -> int:
+    from .backends import get_backend
+    from .serialization import dumps
+    from .storage import check_listing, document_payload
+
+    check_listing(args.limit, args.fields)
+    config = _load_config()
+    records = get_backend(config).iter_documents(
+        after=args.after, limit=args.limit, fields=args.fields
+    )
+    # One JSON document per line, written as it is read.
+    write = sys.stdout.write
+    full = args.fields == "full"
+    for record in records:
+        payload = record if full else document_payload(record, args.fields)
+        write(dumps(payload).decode("utf-8") + "\n")
     return 0
 
 
 def cmd_search(args: argparse.Namespace) -> int:
-    config = load_config()
-    results = search_documents(config.db_path, args.query, limit=config.top_k)
-    print(json.dumps([result.__dict__ for result in results], indent=2))
+    from .backends import get_backend
+    from .serialization import to_json
+
+    config = _load_config()
+    backend = get_backend(config)
+    if args.mode not in backend.search_modes:
+        raise ValueError(f"mode must be one of {backend.search_modes}")
+    if args.passages:
+        results = backend.search_passages(args.query, limit=config.top_k)
+    else:
+        results = backend.search(
+            args.query,
+            limit=config.top_k,
+            snippet_tokens=args.snippet,
+            mode=args.mode,
+        )
+    print(json.dumps(results, indent=2, default=to_json))
     return 0
 
 
 def cmd_generate(args: argparse.Namespace) -> int:
-    config = load_config()
-    results = search_documents(config.db_path, args.query, limit=config.top_k)
+    from .backends import get_backend
+    from .generator import generate_response
+    from .serialization import to_json
+
+    config = _load_config()
+    results = get_backend(config).search_passages(args.query, limit=config.top_k)
     response = generate_response(args.query, results)
-    print(json.dumps(response, indent=2))
+    print(json.dumps(response, indent=2, default=to_json))
+    return 0
+
+
+def _read_queries(path: str) -> list:
+    handle = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        return [line.strip() for line in handle if line.strip()]
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+
+
+def cmd_batch(args: argparse.Namespace) -> int:
+    from .backends import get_backend
+    from .batch import generate_many, search_many
+    from .serialization import dumps
+
+    config = _load_config()
+    backend = get_backend(config)
+    queries = _read_queries(args.file)
+    workers = args.workers or config.batch_workers
+    if args.generate:
+        answers = generate_many(backend, queries, limit=config.top_k, workers=workers)
+    else:
+        answers = search_many(
+            backend,
+            queries,
+            limit=config.top_k,
+            mode=args.mode,
+            unit="passage" if args.passages else "document",
+            snippet_tokens=args.snippet,
+            workers=workers,
+        )
+    key = "response" if args.generate else "results"
+    write = sys.stdout.write
+    for query, answer in zip(queries, answers):
+        write(dumps({"query": query, key: answer}).decode("utf-8") + "\n")
     return 0
 
 
 def cmd_analyze(args: argparse.Namespace) -> int:
+    from .analyzer import analyze_text
+
     analysis = analyze_text(args.text)
     print(json.dumps(analysis, indent=2))
     return 0
 
 
 def cmd_add(args: argparse.Namespace) -> int:
-    config = load_config()
-    initialize_database(config.db_path)
-    record = add_document(
-        config.db_path,
+    from .backends import get_backend
+    from .serialization import to_json
+
+    backend = get_backend(_load_config())
+    backend.initialize()
+    record = backend.add(
         doc_id=args.doc_id,
         content=args.content,
         source=args.source,
         metadata=json.loads(args.metadata) if args.metadata else {},
     )
-    print(json.dumps(record.__dict__, indent=2))
+    print(json.dumps(record, indent=2, default=to_json))
+    return 0
+
+
+def cmd_delete(args: argparse.Namespace) -> int:
+    from .backends import get_backend
+
+    backend = get_backend(_load_config())
+    backend.initialize()
+    print(json.dumps({"deleted": backend.delete(args.doc_ids)}, indent=2))
     return 0
 
 
@@ -113,24 +250,103 @@ def build_parser() -> argparse.ArgumentParser:
 
     ingest_parser = subparsers.add_parser("ingest", help="Ingest text files")
     ingest_parser.add_argument("paths", nargs="+", help="Paths to .txt files")
+    ingest_parser.add_argument(
+        "--batch-size",
+        type=int,
+        help="Documents written per transaction (default 1000)",
+    )
+    ingest_parser.add_argument(
+        "--optimize",
+        action="store_true",
+        help="Merge the FTS5 index into one segment after loading",
+    )
+    ingest_parser.add_argument(
+        "--workers", type=int, default=1, help="Threads used to read files"
+    )
+    ingest_parser.add_argument(
+        "--force", action="store_true", help="Rewrite files even if unchanged"
+    )
     ingest_parser.set_defaults(func=cmd_ingest)
 
     seed_parser = subparsers.add_parser("seed", help="Seed from sample documents")
     seed_parser.add_argument("sample_dir", help="Directory with sample .txt files")
+    seed_parser.add_argument(
+        "--workers", type=int, default=1, help="Threads used to read files"
+    )
+    seed_parser.add_argument(
+        "--force", action="store_true", help="Rewrite files even if unchanged"
+    )
     seed_parser.set_defaults(func=cmd_seed)
 
-    subparsers.add_parser("list", help="List indexed documents").set_defaults(
-        func=cmd_list
+    index_parser = subparsers.add_parser(
+        "index-vectors", help="Build the dense index (and train IVF) ahead of searches"
+    )
+    index_parser.add_argument(
+        "--rebuild", action="store_true", help="Re-embed every document from scratch"
+    )
+    index_parser.set_defaults(func=cmd_index_vectors)
+
+    list_parser = subparsers.add_parser(
+        "list", help="Stream indexed documents as NDJSON, in doc_id order"
     )
+    list_parser.add_argument("--after", metavar="DOC_ID", help="Start after this doc_id")
+    list_parser.add_argument("--limit", type=int, help="Stop after this many documents")
+    list_parser.add_argument(
+        "--fields",
+        default="full",
+        help="Fields per document: full (default), metadata (no content), or ids",
+    )
+    list_parser.set_defaults(func=cmd_list)
 
     search_parser = subparsers.add_parser("search", help="Search documents")
     search_parser.add_argument("query", help="Search query")
+    search_parser.add_argument(
+        "--passages",
+        action="store_true",
+        help="Return the best-matching passage per document",
+    )
+    search_parser.add_argument(
+        "--snippet",
+        type=int,
+        metavar="TOKENS",
+        help="Return an FTS5 snippet of up to TOKENS tokens instead of full content",
+    )
+    search_parser.add_argument(
+        "--mode",
+        default="bm25",
+        help="Rank with FTS5 bm25 (default), the dense vector index (dense), "
+        "or both fused (hybrid)",
+    )
     search_parser.set_defaults(func=cmd_search)
 
     generate_parser = subparsers.add_parser("generate", help="Generate response")
     generate_parser.add_argument("query", help="User query")
     generate_parser.set_defaults(func=cmd_generate)
 
+    batch_parser = subparsers.add_parser(
+        "batch", help="Answer one query per line of a file, printing NDJSON"
+    )
+    batch_parser.add_argument("file", help="File with one query per line, or - for stdin")
+    batch_parser.add_argument(
+        "--generate", action="store_true", help="Generate responses instead of searching"
+    )
+    batch_parser.add_argument(
+        "--passages",
+        action="store_true",
+        help="Return the best-matching passage per document",
+    )
+    batch_parser.add_argument(
+        "--snippet",
+        type=int,
+        metavar="TOKENS",
+        help="Return an FTS5 snippet of up to TOKENS tokens instead of full content",
+    )
+    batch_parser.add_argument("--mode", default="bm25", help="bm25 (default), dense or hybrid")
+    batch_parser.add_argument(
+        "--workers", type=int, default=0, help="Threads (default RAG_BATCH_WORKERS)"
+    )
+    batch_parser.set_defaults(func=cmd_batch)
+
     analyze_parser = subparsers.add_parser("analyze", help="Analyze text")
     analyze_parser.add_argument("text", help="Text to analyze")
     analyze_parser.set_defaults(func=cmd_analyze)
@@ -146,17 +362,51 @@ def build_parser() -> argparse.ArgumentParser:
     )
     add_parser.set_defaults(func=cmd_add)
 
+    delete_parser = subparsers.add_parser("delete", help="Delete documents")
+    delete_parser.add_argument("doc_ids", nargs="+", help="Document ids")
+    delete_parser.set_defaults(func=cmd_delete)
+
+    for subparser in subparsers.choices.values():
+        subparser.add_argument(
+            "--profile",
+            action="store_true",
+            help="Run under cProfile and write PREFIX.pstats and PREFIX.collapsed",
+        )
+        subparser.add_argument(
+            "--profile-output",
+            metavar="PREFIX",
+            default=DEFAULT_PROFILE_PREFIX,
+            help=f"Profile file prefix (default {DEFAULT_PROFILE_PREFIX})",
+        )
+
     return parser
 
 
+def _write_profile(aggregate: ProfileAggregate, prefix: Path) -> None:
+    # stderr, so the command's JSON output stays machine-readable.
+    print(aggregate.summary(_PROFILE_SUMMARY_LINES).rstrip(), file=sys.stderr)
+    written = aggregate.write(prefix)
+    if written is not None:
+        print(f"Wrote profile to {written[0]} and {written[1]}", file=sys.stderr)
+
+
 def main(argv: list[str] | None = None) -> int:
     parser = build_parser()
     args = parser.parse_args(argv)
+    aggregate = None
+    if args.profile:
+        from .profiling import ProfileAggregate, profiled
+
+        aggregate = ProfileAggregate()
     try:
-        return args.func(args)
+        with profiled(aggregate) if aggregate is not None else nullcontext():
+            return args.func(args)
     except Exception as exc:  # noqa: BLE001
         print(f"Error: {exc}", file=sys.stderr)
         return 1
+    finally:
+        if aggregate is not None:
+            _write_profile(aggregate, Path(args.profile_output))
 
 
 if __name__ == "__main__":
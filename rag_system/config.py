@@ -5,7 +5,8 @@ from __future__ import annotations
 from dataclasses import dataclass
 from pathlib import Path
 import os
-from typing import Dict, Optional
+import threading
+from typing import Dict, Optional, Tuple
 
 
 @dataclass(frozen=True)
@@ -16,6 +17,28 @@ class Config:
     port: int
     top_k: int
     environment: str
+    pool_size: int = 4
+    server_mode: str = "threaded"
+    workers: int = 8
+    queue_size: int = 64
+    config_reload_interval: float = 0.0
+    cache_entries: int = 1024
+    cache_ttl: float = 300.0
+    cache_max_bytes: int = 64 * 1024 * 1024
+    chunk_size: int = 48
+    chunk_overlap: int = 12
+    snippet_tokens: int = 24
+    dense_dim: int = 256
+    dense_index: str = "flat"
+    ivf_lists: int = 0
+    ivf_nprobe: int = 16
+    storage_backend: str = "sqlite"
+    shards: int = 1
+    batch_workers: int = 4
+    # None keeps the built-in list; an empty tuple disables stop words.
+    stop_words: Optional[Tuple[str, ...]] = None
+    tracing: bool = False
+    profile_sample_rate: float = 0.0
 
 
 _ENV_PREFIX = "RAG_"
@@ -39,6 +62,15 @@ def _env(name: str, env_values: Dict[str, str], default: Optional[str] = None) -
     return os.getenv(name) or env_values.get(name) or default
 
 
+def _stop_words(raw: Optional[str]) -> Optional[Tuple[str, ...]]:
+    # A comma-separated list, or "none" for no stop words at all.
+    if raw is None:
+        return None
+    if raw.strip().lower() == "none":
+        return ()
+    return tuple(word.strip().lower() for word in raw.split(",") if word.strip())
+
+
 def load_config(env_path: Optional[Path] = None) -> Config:
     root = Path.cwd()
     env_file = env_path or root / ".env"
@@ -53,6 +85,27 @@ def load_config(env_path: Optional[Path] = None) -> Config:
     port_raw = _env(f"{_ENV_PREFIX}PORT", env_values, "8000")
     top_k_raw = _env(f"{_ENV_PREFIX}TOP_K", env_values, "5")
     environment = _env(f"{_ENV_PREFIX}ENV", env_values, "development")
+    pool_size_raw = _env(f"{_ENV_PREFIX}POOL_SIZE", env_values, "4")
+    server_mode = _env(f"{_ENV_PREFIX}SERVER_MODE", env_values, "threaded")
+    workers_raw = _env(f"{_ENV_PREFIX}WORKERS", env_values, "8")
+    queue_size_raw = _env(f"{_ENV_PREFIX}QUEUE_SIZE", env_values, "64")
+    reload_interval_raw = _env(f"{_ENV_PREFIX}CONFIG_RELOAD_INTERVAL", env_values, "0")
+    cache_entries_raw = _env(f"{_ENV_PREFIX}CACHE_ENTRIES", env_values, "1024")
+    cache_ttl_raw = _env(f"{_ENV_PREFIX}CACHE_TTL", env_values, "300")
+    cache_max_bytes_raw = _env(f"{_ENV_PREFIX}CACHE_MAX_BYTES", env_values, "67108864")
+    chunk_size_raw = _env(f"{_ENV_PREFIX}CHUNK_SIZE", env_values, "48")
+    chunk_overlap_raw = _env(f"{_ENV_PREFIX}CHUNK_OVERLAP", env_values, "12")
+    snippet_tokens_raw = _env(f"{_ENV_PREFIX}SNIPPET_TOKENS", env_values, "24")
+    dense_dim_raw = _env(f"{_ENV_PREFIX}DENSE_DIM", env_values, "256")
+    dense_index = _env(f"{_ENV_PREFIX}DENSE_INDEX", env_values, "flat")
+    ivf_lists_raw = _env(f"{_ENV_PREFIX}IVF_LISTS", env_values, "0")
+    ivf_nprobe_raw = _env(f"{_ENV_PREFIX}IVF_NPROBE", env_values, "16")
+    storage_backend = _env(f"{_ENV_PREFIX}STORAGE_BACKEND", env_values, "sqlite")
+    shards_raw = _env(f"{_ENV_PREFIX}SHARDS", env_values, "1")
+    batch_workers_raw = _env(f"{_ENV_PREFIX}BATCH_WORKERS", env_values, "4")
+    stop_words_raw = _env(f"{_ENV_PREFIX}STOP_WORDS", env_values)
+    tracing_raw = _env(f"{_ENV_PREFIX}TRACING", env_values, "0")
+    profile_sample_rate_raw = _env(f"{_ENV_PREFIX}PROFILE_SAMPLE_RATE", env_values, "0")
 
     return Config(
         data_dir=data_dir,
@@ -61,4 +114,79 @@ def load_config(env_path: Optional[Path] = None) -> Config:
         port=int(port_raw or 8000),
         top_k=int(top_k_raw or 5),
         environment=environment or "development",
+        pool_size=int(pool_size_raw or 4),
+        server_mode=(server_mode or "threaded").lower(),
+        workers=int(workers_raw or 8),
+        queue_size=int(queue_size_raw or 64),
+        config_reload_interval=float(reload_interval_raw or 0),
+        cache_entries=int(cache_entries_raw or 0),
+        cache_ttl=float(cache_ttl_raw or 0),
+        cache_max_bytes=int(cache_max_bytes_raw or 0),
+        chunk_size=int(chunk_size_raw or 48),
+        chunk_overlap=int(chunk_overlap_raw or 0),
+        snippet_tokens=int(snippet_tokens_raw or 24),
+        dense_dim=int(dense_dim_raw or 0),
+        dense_index=(dense_index or "flat").lower(),
+        ivf_lists=int(ivf_lists_raw or 0),
+        ivf_nprobe=int(ivf_nprobe_raw or 16),
+        storage_backend=(storage_backend or "sqlite").lower(),
+        shards=int(shards_raw or 1),
+        batch_workers=int(batch_workers_raw or 1),
+        stop_words=_stop_words(stop_words_raw),
+        tracing=(tracing_raw or "0").lower() in ("1", "true", "yes"),
+        profile_sample_rate=float(profile_sample_rate_raw or 0),
     )
+
+
+def _mtime(path: Path) -> Optional[float]:
+    try:
+        return path.stat().st_mtime
+    except OSError:
+        return None
+
+
+_cache: Dict[Optional[Path], Tuple[Config, Optional[float]]] = {}
+_cache_lock = threading.Lock()
+
+
+def _resolve_env_file(env_path: Optional[Path]) -> Path:
+    return env_path or Path.cwd() / ".env"
+
+
+def get_config(env_path: Optional[Path] = None) -> Config:
+    """Return the process-wide configuration, loading it on first use only.
+
+    Later calls do no filesystem I/O. Use ``reload_config`` or
+    ``reload_config_if_changed`` to pick up edits to the ``.env`` file.
+    """
+    cached = _cache.get(env_path)
+    if cached is not None:
+        return cached[0]
+    return reload_config(env_path)
+
+
+def reload_config(env_path: Optional[Path] = None) -> Config:
+    env_file = _resolve_env_file(env_path)
+    with _cache_lock:
+        mtime = _mtime(env_file)
+        config = load_config(env_path)
+        _cache[env_path] = (config, mtime)
+    return config
+
+
+def reload_config_if_changed(env_path: Optional[Path] = None) -> Optional[Config]:
+    """Reload the cached configuration if the ``.env`` file's mtime changed.
+
+    Returns the new configuration, or ``None`` when nothing changed.
+    """
+    cached = _cache.get(env_path)
+    if cached is None:
+        return reload_config(env_path)
+    if _mtime(_resolve_env_file(env_path)) == cached[1]:
+        return None
+    return reload_config(env_path)
+
+
+def clear_config_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,59 @@
+"""Rank fusion for combining lexical and dense result lists."""
+
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+
+# The constant from Cormack et al.'s RRF paper; damps the weight of top ranks.
+DEFAULT_RRF_K = 60
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[str]],
+    k: int = DEFAULT_RRF_K,
+    weights: Optional[Sequence[float]] = None,
+) -> List[Tuple[str, float]]:
+    """Fuse best-first id lists into ``(id, score)`` pairs, best first.
+
+    Each list contributes ``weight / (k + rank)`` (rank starting at 1) to every
+    id it contains. Only ranks are used, so lists whose scores live on
+    different scales (bm25 ranks, cosine similarities) combine without any
+    normalization. Ties keep the order in which ids were first seen.
+    """
+    if k <= 0:
+        raise ValueError("k must be positive")
+    weights = list(weights) if weights is not None else [1.0] * len(rankings)
+    if len(weights) != len(rankings):
+        raise ValueError("weights must match rankings")
+
+    positions: Dict[str, int] = {}
+    for ranking in rankings:
+        for item in ranking:
+            positions.setdefault(item, len(positions))
+    if not positions:
+        return []
+    ids = list(positions)
+
+    if np is not None:
+        # One (lists x candidates) matrix of reciprocal ranks, zero where a
+        # list does not contain the candidate, reduced with a weighted sum.
+        contributions = np.zeros((len(rankings), len(ids)))
+        for row, ranking in enumerate(rankings):
+            columns = np.fromiter((positions[item] for item in ranking), dtype=np.intp)
+            contributions[row, columns] = 1.0 / (k + np.arange(1, len(ranking) + 1))
+        scores = np.asarray(weights, dtype=float) @ contributions
+        order = np.argsort(-scores, kind="stable")
+        return [(ids[column], float(scores[column])) for column in order]
+
+    totals = [0.0] * len(ids)
+    for weight, ranking in zip(weights, rankings):
+        for rank, item in enumerate(ranking, start=1):
+            totals[positions[item]] += weight / (k + rank)
+    order = sorted(range(len(ids)), key=lambda column: -totals[column])
+    return [(ids[column], totals[column]) for column in order]
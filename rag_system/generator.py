@@ -2,11 +2,40 @@
 
 from __future__ import annotations
 
-from dataclasses import asdict
-from typing import Dict, List
+from dataclasses import replace
+from typing import Dict, List, Optional, Tuple
 
 from .analyzer import analyze_text
+from .cache import LRUCache
 from .storage import SearchResult
+from .tracing import span
+
+
+# Both caches hold shared objects; callers must treat cached analysis
+# payloads as read-only.
+analysis_cache = LRUCache(max_entries=1024)
+response_cache = LRUCache(max_entries=1024, max_bytes=16 * 1024 * 1024)
+
+
+def configure_generation_cache(max_entries: int, max_bytes: Optional[int] = None) -> None:
+    """Resize the analysis and rendered-response caches; ``0`` disables them."""
+    analysis_cache.configure(max_entries)
+    response_cache.configure(max_entries, max_bytes=max_bytes)
+
+
+def _content_version(result: SearchResult) -> Tuple[str, int, int]:
+    # str caches its hash, so results served from the query cache are keyed
+    # without rescanning their content.
+    return (result.doc_id, len(result.content), hash(result.content))
+
+
+def _analyze_query(query: str) -> Dict[str, List[Dict[str, object]]]:
+    analysis = analysis_cache.get(query)
+    if analysis is None:
+        with span("analyze"):
+            analysis = analyze_text(query)
+        analysis_cache.put(query, analysis)
+    return analysis
 
 
 def _build_context(results: List[SearchResult]) -> str:
@@ -19,12 +48,9 @@ def _build_context(results: List[SearchResult]) -> str:
     return "\n".join(snippets)
 
 
-def generate_response(query: str, results: List[SearchResult]) -> Dict[str, object]:
-    if not query:
-        raise ValueError("query must be provided")
-
+def _render(query: str, results: List[SearchResult]) -> Tuple[str, str, Dict[str, object]]:
     context = _build_context(results)
-    analysis = analyze_text(query)
+    analysis = _analyze_query(query)
 
     answer_lines = [
         "Answer (deterministic demo response)",
@@ -43,9 +69,35 @@ def generate_response(query: str, results: List[SearchResult]) -> Dict[str, obje
     for phrase in analysis["key_phrases"]:
         answer_lines.append(f"- {phrase['Text']} (score {phrase['Score']})")
 
+    return "\n".join(answer_lines), context, analysis
+
+
+def generate_response(query: str, results: List[SearchResult]) -> Dict[str, object]:
+    """An answer to ``query`` built from ``results``.
+
+    ``context`` holds a snippet of each result, so the returned ``results``
+    are ``SearchResult`` references (ids, scores, metadata) with their
+    ``content`` emptied rather than a second copy of the text. Encode the
+    payload with ``rag_system.serialization.dumps``.
+    """
+    if not query:
+        raise ValueError("query must be provided")
+
+    cache_key = (query, tuple(_content_version(result) for result in results))
+    rendered = response_cache.get(cache_key)
+    if rendered is None:
+        # Includes the "analyze" stage when the analysis is not cached.
+        with span("render"):
+            rendered = _render(query, results)
+        answer, context, _ = rendered
+        response_cache.put(cache_key, rendered, size=len(answer) + len(context) + 256)
+
+    answer, context, analysis = rendered
+    with span("results"):
+        payload_results = [replace(result, content="") for result in results]
     return {
-        "answer": "\n".join(answer_lines),
+        "answer": answer,
         "context": context,
-        "results": [asdict(result) for result in results],
+        "results": payload_results,
         "analysis": analysis,
     }
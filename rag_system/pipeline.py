@@ -0,0 +1,401 @@
+"""Streaming bulk ingestion into the SQLite index.
+
+The ``*_sharded`` variants spread records over several shard databases by a
+hash of doc_id and load every shard on its own writer thread.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from itertools import islice
+from pathlib import Path
+import queue
+import time
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .storage import (
+    ConnectionPool,
+    DocumentRecord,
+    WriteCounts,
+    get_pool,
+    get_vector_index,
+    initialize_database,
+    load_file_state,
+    shard_index,
+    write_batch,
+)
+
+
+DEFAULT_BATCH_SIZE = 1000
+# Negative cache_size values are KiB; 64 MiB keeps FTS5 segment merges in memory.
+DEFAULT_CACHE_SIZE_KIB = 64 * 1024
+_SYNCHRONOUS_LEVELS = ("OFF", "NORMAL", "FULL", "EXTRA")
+# Sharded bulk loads hand records to shard writers in chunks of this many,
+# with at most _SHARD_QUEUE_DEPTH chunks waiting per shard.
+_SHARD_CHUNK = 256
+_SHARD_QUEUE_DEPTH = 8
+
+
+@dataclass(frozen=True)
+class IngestStats:
+    inserted: int
+    updated: int
+    skipped: int
+    batches: int
+    seconds: float
+
+    @property
+    def processed(self) -> int:
+        return self.inserted + self.updated + self.skipped
+
+    @property
+    def docs_per_minute(self) -> float:
+        return self.processed * 60 / self.seconds if self.seconds else 0.0
+
+
+def read_file_record(path: Path, strip: bool = False) -> Optional[DocumentRecord]:
+    content = path.read_text(encoding="utf-8")
+    if strip:
+        content = content.strip()
+    if not content:
+        return None
+    return DocumentRecord(
+        doc_id=path.stem,
+        content=content,
+        source=str(path),
+        metadata={"filename": path.name},
+    )
+
+
+def iter_file_records(
+    paths: Iterable[Path],
+    strip: bool = False,
+    workers: int = 1,
+) -> Iterator[DocumentRecord]:
+    """Yield one record per file, in the order of ``paths``.
+
+    With ``workers > 1`` files are read and decoded on a thread pool, but at
+    most ``workers * 4`` reads are in flight at once and records are still
+    yielded in input order. The consumer (normally ``bulk_ingest``) remains the
+    only thread that writes to SQLite, and its output is deterministic.
+    """
+    if workers <= 0:
+        raise ValueError("workers must be positive")
+    if workers == 1:
+        for path in paths:
+            record = read_file_record(Path(path), strip=strip)
+            if record is not None:
+                yield record
+        return
+
+    window = workers * 4
+    pending: Deque[Future] = deque()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rag-read") as executor:
+        try:
+            for path in paths:
+                pending.append(executor.submit(read_file_record, Path(path), strip))
+                if len(pending) >= window:
+                    record = pending.popleft().result()
+                    if record is not None:
+                        yield record
+            while pending:
+                record = pending.popleft().result()
+                if record is not None:
+                    yield record
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def _batches(records: Iterable[DocumentRecord], size: int) -> Iterator[list]:
+    iterator = iter(records)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class _Tally:
+    def __init__(self) -> None:
+        self.inserted = 0
+        self.updated = 0
+        self.skipped = 0
+        self.batches = 0
+        self.start = time.perf_counter()
+
+    def add(self, counts: WriteCounts) -> None:
+        self.inserted += counts.inserted
+        self.updated += counts.updated
+        self.skipped += counts.skipped
+        self.batches += 1
+
+    def stats(self) -> IngestStats:
+        return IngestStats(
+            inserted=self.inserted,
+            updated=self.updated,
+            skipped=self.skipped,
+            batches=self.batches,
+            seconds=time.perf_counter() - self.start,
+        )
+
+
+@contextmanager
+def _bulk_load(
+    db_path: Path,
+    batch_size: int,
+    synchronous: str,
+    cache_size_kib: int,
+    optimize: bool,
+) -> Iterator[Tuple[ConnectionPool, _Tally]]:
+    """Relax durability pragmas for a load and restore them afterwards.
+
+    The WAL keeps the database consistent even with ``synchronous=OFF``, at the
+    cost of losing the last batches if the machine crashes. ``optimize`` merges
+    each FTS5 index, ``documents`` and (when it has rows) ``passages``, into a
+    single segment once loading is finished.
+    """
+    if batch_size <= 0:
+        raise ValueError("batch_size must be positive")
+    synchronous = synchronous.upper()
+    if synchronous not in _SYNCHRONOUS_LEVELS:
+        raise ValueError(f"synchronous must be one of {_SYNCHRONOUS_LEVELS}")
+
+    initialize_database(db_path)
+    pool = get_pool(db_path)
+    with pool.writer() as connection:
+        previous_synchronous = connection.execute("PRAGMA synchronous;").fetchone()[0]
+        previous_cache_size = connection.execute("PRAGMA cache_size;").fetchone()[0]
+        connection.execute(f"PRAGMA synchronous={synchronous};")
+        connection.execute(f"PRAGMA cache_size=-{int(cache_size_kib)};")
+
+    tally = _Tally()
+    try:
+        yield pool, tally
+        if optimize and (tally.inserted or tally.updated):
+            with pool.writer() as connection:
+                connection.execute("INSERT INTO documents(documents) VALUES('optimize');")
+                if connection.execute("SELECT 1 FROM passages LIMIT 1;").fetchone():
+                    connection.execute("INSERT INTO passages(passages) VALUES('optimize');")
+    finally:
+        with pool.writer() as connection:
+            connection.execute(f"PRAGMA synchronous={int(previous_synchronous)};")
+            connection.execute(f"PRAGMA cache_size={int(previous_cache_size)};")
+
+
+def bulk_ingest(
+    db_path: Path,
+    records: Iterable[DocumentRecord],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    synchronous: str = "OFF",
+    cache_size_kib: int = DEFAULT_CACHE_SIZE_KIB,
+    optimize: bool = False,
+    skip_unchanged: bool = False,
+) -> IngestStats:
+    """Load ``records`` in batches of ``batch_size``, one transaction per batch.
+
+    ``records`` is consumed lazily, so at most one batch is held in memory.
+    ``synchronous`` and ``cache_size_kib`` apply to the writer connection for
+    the duration of the load. With ``skip_unchanged``, records whose content
+    hash matches the stored document are not rewritten.
+    """
+    with _bulk_load(db_path, batch_size, synchronous, cache_size_kib, optimize) as (
+        pool,
+        tally,
+    ):
+        vectors = get_vector_index(db_path)
+        for batch in _batches(records, batch_size):
+            with pool.writer() as connection:
+                tally.add(
+                    write_batch(
+                        connection, batch, skip_unchanged=skip_unchanged, vectors=vectors
+                    )
+                )
+    return tally.stats()
+
+
+def _claim_stem(seen: Dict[str, Path], path: Path) -> None:
+    # Files are stored under their stem, so two paths with one stem would
+    # overwrite each other and never match their recorded stat.
+    other = seen.setdefault(path.stem, path)
+    if other != path:
+        raise ValueError(f"{other} and {path} would both be stored as doc_id {path.stem!r}")
+
+
+def ingest_files(
+    db_path: Path,
+    paths: Iterable[Path],
+    strip: bool = False,
+    workers: int = 1,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    synchronous: str = "OFF",
+    cache_size_kib: int = DEFAULT_CACHE_SIZE_KIB,
+    optimize: bool = False,
+    force: bool = False,
+) -> IngestStats:
+    """Incrementally sync files into the index, skipping unchanged ones.
+
+    Each batch of paths is stat'ed first: files whose ``mtime_ns`` and size
+    match ``document_meta`` are skipped without being read. The rest are read
+    (on ``workers`` threads) and hashed, and only files whose content hash
+    changed are rewritten. ``force`` rewrites every file. A path whose stem an
+    earlier path already used raises ``ValueError`` before its batch is
+    written; ``ingest_files_sharded`` checks every path before writing any.
+    """
+    with _bulk_load(db_path, batch_size, synchronous, cache_size_kib, optimize) as (
+        pool,
+        tally,
+    ):
+        vectors = get_vector_index(db_path)
+        seen: Dict[str, Path] = {}
+        for batch in _batches((Path(path) for path in paths), batch_size):
+            file_stats: Dict[str, Tuple[int, int]] = {}
+            for path in batch:
+                _claim_stem(seen, path)
+                stat = path.stat()
+                file_stats[path.stem] = (stat.st_mtime_ns, stat.st_size)
+
+            stale = batch
+            if not force:
+                with pool.reader() as connection:
+                    known = load_file_state(connection, list(file_stats))
+                stale = [path for path in batch if known.get(path.stem) != file_stats[path.stem]]
+
+            records = list(iter_file_records(stale, strip=strip, workers=workers))
+            with pool.writer() as connection:
+                counts = write_batch(
+                    connection,
+                    records,
+                    file_stats=file_stats,
+                    skip_unchanged=not force,
+                    vectors=vectors,
+                )
+            tally.add(
+                WriteCounts(
+                    inserted=counts.inserted,
+                    updated=counts.updated,
+                    skipped=counts.skipped + len(batch) - len(stale),
+                )
+            )
+    return tally.stats()
+
+
+def _combined(stats: Sequence[IngestStats], start: float) -> IngestStats:
+    return IngestStats(
+        inserted=sum(item.inserted for item in stats),
+        updated=sum(item.updated for item in stats),
+        skipped=sum(item.skipped for item in stats),
+        batches=sum(item.batches for item in stats),
+        seconds=time.perf_counter() - start,
+    )
+
+
+def _queued(chunks: "queue.Queue[Optional[list]]") -> Iterator[DocumentRecord]:
+    while True:
+        chunk = chunks.get()
+        if chunk is None:
+            return
+        yield from chunk
+
+
+def _hand_off(chunks: "queue.Queue[Optional[list]]", writer: Future, chunk: Optional[list]) -> None:
+    # A writer that failed stops draining its queue; surface its error instead
+    # of blocking on a full queue forever.
+    while True:
+        if writer.done():
+            writer.result()
+            return
+        try:
+            chunks.put(chunk, timeout=0.1)
+            return
+        except queue.Full:
+            continue
+
+
+def _close(chunks: "queue.Queue[Optional[list]]", writer: Future) -> None:
+    # Like ``_hand_off`` with the end-of-input sentinel, but never raises, so
+    # every shard is closed even when some writers failed.
+    while not writer.done():
+        try:
+            chunks.put(None, timeout=0.1)
+            return
+        except queue.Full:
+            continue
+
+
+def bulk_ingest_sharded(
+    db_paths: Sequence[Path],
+    records: Iterable[DocumentRecord],
+    **options,
+) -> IngestStats:
+    """``bulk_ingest`` into shard databases, one writer thread per shard.
+
+    Each record goes to ``db_paths[shard_index(doc_id, len(db_paths))]``.
+    ``records`` is still consumed lazily: it is routed in chunks through a
+    bounded queue per shard, so a slow shard holds back the producer rather
+    than buffering the input. ``options`` are passed to every ``bulk_ingest``.
+    """
+    if len(db_paths) == 1:
+        return bulk_ingest(db_paths[0], records, **options)
+    start = time.perf_counter()
+    shards = len(db_paths)
+    queues: List["queue.Queue[Optional[list]]"] = [
+        queue.Queue(maxsize=_SHARD_QUEUE_DEPTH) for _ in db_paths
+    ]
+    with ThreadPoolExecutor(max_workers=shards, thread_name_prefix="rag-shard-ingest") as executor:
+        writers = [
+            executor.submit(bulk_ingest, db_path, _queued(chunks), **options)
+            for db_path, chunks in zip(db_paths, queues)
+        ]
+        pending: List[list] = [[] for _ in db_paths]
+        try:
+            for record in records:
+                shard = shard_index(record.doc_id, shards)
+                pending[shard].append(record)
+                if len(pending[shard]) >= _SHARD_CHUNK:
+                    _hand_off(queues[shard], writers[shard], pending[shard])
+                    pending[shard] = []
+            for chunks, writer, chunk in zip(queues, writers, pending):
+                if chunk:
+                    _hand_off(chunks, writer, chunk)
+        finally:
+            for chunks, writer in zip(queues, writers):
+                _close(chunks, writer)
+    # Raised once the executor has shut down: the first failed shard's error.
+    stats = [writer.result() for writer in writers]
+    return _combined(stats, start)
+
+
+def ingest_files_sharded(
+    db_paths: Sequence[Path],
+    paths: Iterable[Path],
+    **options,
+) -> IngestStats:
+    """``ingest_files`` into shard databases, loading the shards concurrently.
+
+    Files are routed by doc_id (the file stem), like ``bulk_ingest_sharded``.
+    Paths that share a stem raise ``ValueError`` before anything is written.
+    ``options`` are passed to every ``ingest_files``.
+    """
+    start = time.perf_counter()
+    seen: Dict[str, Path] = {}
+    groups: List[List[Path]] = [[] for _ in db_paths]
+    for path in paths:
+        path = Path(path)
+        _claim_stem(seen, path)
+        groups[shard_index(path.stem, len(db_paths))].append(path)
+    if len(db_paths) == 1:
+        return ingest_files(db_paths[0], groups[0], **options)
+    with ThreadPoolExecutor(
+        max_workers=len(db_paths), thread_name_prefix="rag-shard-ingest"
+    ) as executor:
+        stats = list(
+            executor.map(
+                lambda shard: ingest_files(shard[0], shard[1], **options),
+                zip(db_paths, groups),
+            )
+        )
+    return _combined(stats, start)
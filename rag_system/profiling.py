@@ -0,0 +1,239 @@
+"""Profile CLI commands and sampled server requests with cProfile.
+
+Profiles are accumulated in a ``ProfileAggregate`` and written as two files:
+``<prefix>.pstats`` for ``pstats``/snakeviz, and ``<prefix>.collapsed``, one
+``frame;frame;frame microseconds`` line per call path, for flamegraph tools
+(``flamegraph.pl``, speedscope).
+
+cProfile records caller/callee pairs rather than whole stacks, so collapsed
+paths are rebuilt by walking the call graph from its roots and splitting each
+function's time between its callers in proportion to the time each caller
+spent in it. Recursive calls are folded into the first occurrence.
+
+In the server, ``request_profile()`` wraps every request. It profiles a
+``configure_profiling`` sample of them into the process-wide aggregate, which
+``flush_profile`` writes to disk at most every ``FLUSH_INTERVAL`` seconds, and
+every request that starts during a ``capture`` window into that window's
+profile.
+With a sample rate of 0 and no open window it does nothing.
+"""
+
+from __future__ import annotations
+
+import cProfile
+from contextlib import contextmanager
+import io
+import marshal
+from pathlib import Path
+import pstats
+import random
+import sys
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+FLUSH_INTERVAL = 10.0
+MAX_CAPTURE_SECONDS = 60.0
+# Call paths whose time rounds below this many microseconds are dropped.
+_MIN_PATH_MICROSECONDS = 1
+_MAX_DEPTH = 128
+
+_Function = Tuple[str, int, str]
+
+
+class ProfileAggregate:
+    """Thread-safe sum of cProfile runs."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stats: Optional[pstats.Stats] = None
+        self.runs = 0
+
+    def add(self, profiler: cProfile.Profile) -> None:
+        with self._lock:
+            if self._stats is None:
+                self._stats = pstats.Stats(profiler, stream=io.StringIO())
+            else:
+                self._stats.add(profiler)
+            self.runs += 1
+
+    def write(self, prefix: Path) -> Optional[Tuple[Path, Path]]:
+        """Write ``<prefix>.pstats`` and ``<prefix>.collapsed``; ``None`` if empty."""
+        with self._lock:
+            if self._stats is None:
+                return None
+            prefix.parent.mkdir(parents=True, exist_ok=True)
+            stats_path = prefix.with_name(prefix.name + ".pstats")
+            collapsed_path = prefix.with_name(prefix.name + ".collapsed")
+            self._stats.dump_stats(stats_path)
+            collapsed_path.write_text(collapsed_stacks(self._stats), encoding="utf-8")
+        return stats_path, collapsed_path
+
+    def dumps(self) -> bytes:
+        """The profile in the ``.pstats`` format, as ``dump_stats`` writes it."""
+        with self._lock:
+            return marshal.dumps({} if self._stats is None else self._stats.stats)
+
+    def collapsed(self) -> str:
+        with self._lock:
+            return "" if self._stats is None else collapsed_stacks(self._stats)
+
+    def summary(self, limit: int = 20) -> str:
+        """The ``limit`` functions with the most cumulative time, as pstats prints them."""
+        with self._lock:
+            if self._stats is None:
+                return ""
+            stream = io.StringIO()
+            self._stats.stream = stream
+            self._stats.sort_stats("cumulative").print_stats(limit)
+            return stream.getvalue()
+
+
+def _frame(function: _Function) -> str:
+    filename, line, name = function
+    if filename == "~":
+        # Built-ins, e.g. "<method 'execute' of 'sqlite3.Cursor' objects>".
+        label = name
+    else:
+        label = f"{Path(filename).name}:{line}({name})"
+    return label.replace(";", ",")
+
+
+def collapsed_stacks(stats: pstats.Stats) -> str:
+    """``stats`` as collapsed call paths weighted by self time in microseconds."""
+    table = stats.stats  # type: ignore[attr-defined]
+    callees: Dict[_Function, List[Tuple[_Function, float]]] = {}
+    # Functions entered from outside the profile, e.g. the command a CLI run
+    # profiles, with the fraction of their time spent in those calls.
+    roots: Dict[_Function, float] = {}
+    for function, (_, calls, _, total, callers) in table.items():
+        for caller, edge in callers.items():
+            # edge[3] is the cumulative time of ``function`` under ``caller``.
+            callees.setdefault(caller, []).append((function, edge[3]))
+        if sum(edge[1] for edge in callers.values()) < calls:
+            called = sum(edge[3] for caller, edge in callers.items() if caller != function)
+            roots[function] = max(0.0, total - called) / total if total else 1.0
+
+    paths: Dict[str, float] = {}
+
+    def walk(function: _Function, stack: List[str], seen: frozenset, share: float) -> None:
+        _, _, own, total, _ = table[function]
+        path = stack + [_frame(function)]
+        key = ";".join(path)
+        paths[key] = paths.get(key, 0.0) + own * share
+        if len(path) >= _MAX_DEPTH:
+            return
+        for callee, edge_total in callees.get(function, ()):
+            callee_total = table[callee][3]
+            if callee in seen or not callee_total:
+                continue
+            callee_share = share * edge_total / callee_total
+            if callee_share * callee_total * 1e6 < _MIN_PATH_MICROSECONDS:
+                continue
+            walk(callee, path, seen | {callee}, callee_share)
+
+    for root, share in sorted(roots.items()):
+        walk(root, [], frozenset((root,)), share)
+    lines = [
+        f"{path} {round(seconds * 1e6)}"
+        for path, seconds in sorted(paths.items())
+        if round(seconds * 1e6) >= _MIN_PATH_MICROSECONDS
+    ]
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+@contextmanager
+def profiled(*aggregates: ProfileAggregate) -> Iterator[None]:
+    """Profile the block on this thread and add the run to each of ``aggregates``."""
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # From Python 3.12 only one profiler may run in the process at a time;
+        # the block then runs unprofiled.
+        yield
+        return
+    try:
+        yield
+    finally:
+        profiler.disable()
+        for aggregate in aggregates:
+            aggregate.add(profiler)
+
+
+_sample_rate = 0.0
+_output_prefix: Optional[Path] = None
+_aggregate = ProfileAggregate()
+_flushed_runs = 0
+_next_flush = 0.0
+_windows: List[ProfileAggregate] = []
+_windows_lock = threading.Lock()
+
+
+def configure_profiling(sample_rate: float, output_prefix: Optional[Path] = None) -> None:
+    """Profile ``sample_rate`` (0 to 1) of requests, written to ``output_prefix``.
+
+    The sampled profile collected so far is discarded.
+    """
+    global _sample_rate, _output_prefix, _aggregate, _flushed_runs
+    if not 0 <= sample_rate <= 1:
+        raise ValueError("profile sample rate must be between 0 and 1")
+    _sample_rate = sample_rate
+    _output_prefix = output_prefix
+    _aggregate = ProfileAggregate()
+    _flushed_runs = 0
+
+
+def request_profile():
+    """Context manager profiling the current request if it is sampled."""
+    windows = list(_windows)
+    sampled = _sample_rate > 0 and random.random() < _sample_rate
+    if not (sampled or windows) or sys.getprofile() is not None:
+        # Nothing to record, or a profiler (e.g. ``cli --profile``) already
+        # owns this thread.
+        return _NOT_PROFILED
+    return profiled(*windows, _aggregate) if sampled else profiled(*windows)
+
+
+class _NotProfiled:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc_info: object) -> None:
+        return None
+
+
+_NOT_PROFILED = _NotProfiled()
+
+
+def flush_profile(force: bool = False) -> Optional[Tuple[Path, Path]]:
+    """Write the sampled profile if it changed, at most every ``FLUSH_INTERVAL`` s."""
+    global _flushed_runs, _next_flush
+    if _output_prefix is None or _aggregate.runs == _flushed_runs:
+        return None
+    now = time.monotonic()
+    if not force and now < _next_flush:
+        return None
+    _next_flush = now + FLUSH_INTERVAL
+    _flushed_runs = _aggregate.runs
+    return _aggregate.write(_output_prefix)
+
+
+def capture(seconds: float) -> ProfileAggregate:
+    """Profile requests for the next ``seconds``; blocks meanwhile.
+
+    The result holds every request that started and finished in the window.
+    """
+    if not 0 < seconds <= MAX_CAPTURE_SECONDS:
+        raise ValueError(f"seconds must be between 0 and {MAX_CAPTURE_SECONDS:g}")
+    window = ProfileAggregate()
+    with _windows_lock:
+        _windows.append(window)
+    try:
+        time.sleep(seconds)
+    finally:
+        with _windows_lock:
+            _windows.remove(window)
+    return window
@@ -0,0 +1,158 @@
+"""Parse user queries into safe FTS5 match expressions.
+
+Queries are free text with three optional operators:
+
+- ``"exact phrase"``: the words in this order (stop words are kept).
+- ``prefix*``: any token starting with ``prefix``.
+- ``a NEAR b`` or ``a NEAR/5 b``: both within ``N`` tokens of each other
+  (default ``DEFAULT_NEAR_DISTANCE``). Chains like ``a NEAR b NEAR c`` form one
+  group.
+
+Everything else is split into words, and words in the stop-word list are
+dropped. Each word or phrase is emitted as a double-quoted FTS5 string with
+embedded quotes doubled, so no input can produce an FTS5 syntax error:
+``AND``/``OR``/``NOT``, column filters, brackets and stray punctuation are
+plain text. Terms are implicitly ANDed, as FTS5 does.
+
+``parse_query`` results are cached in an LRU keyed on the query and the stop
+words in force, so repeated queries skip parsing entirely.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from functools import lru_cache
+import re
+from typing import FrozenSet, Iterable, List, Optional, Tuple, Union
+
+DEFAULT_STOP_WORDS: FrozenSet[str] = frozenset(
+    (
+        "a an and are as at be but by do does for from in is it of on or that the to "
+        "what when where which who why"
+    ).split()
+)
+DEFAULT_NEAR_DISTANCE = 10
+PARSED_QUERY_CACHE_SIZE = 4096
+
+# A quoted phrase (the closing quote may be missing), a NEAR operator, or a
+# word with an optional trailing "*". Anything else is a separator.
+_TOKEN_RE = re.compile(
+    r'"(?P<phrase>[^"]*)"?'
+    r"|(?P<near>\bNEAR(?:/(?P<distance>\d+))?)(?![\w'-])"
+    r"|(?P<word>[\w'-]+)(?P<prefix>\*)?"
+)
+_WORD_RE = re.compile(r"[\w'-]+")
+_WORD_EDGES = "'-_"
+
+_stop_words: FrozenSet[str] = DEFAULT_STOP_WORDS
+
+
+def configure_stop_words(words: Optional[Iterable[str]]) -> None:
+    """Set the stop words dropped from queries; ``None`` restores the defaults."""
+    global _stop_words
+    _stop_words = (
+        DEFAULT_STOP_WORDS if words is None else frozenset(word.lower() for word in words)
+    )
+
+
+@dataclass(frozen=True)
+class ParsedQuery:
+    """A query ready for every retrieval path.
+
+    ``match`` is the FTS5 expression. ``phrases`` are its phrase expressions
+    (a quoted string, with `` *`` for prefixes) in order, as counted for bm25
+    idf. ``words`` are the plain words the phrases contain, and ``text`` is
+    them joined by spaces, for dense embeddings and backends without
+    positional indexes.
+    """
+
+    match: str
+    phrases: Tuple[str, ...]
+    words: Tuple[str, ...]
+    text: str
+
+
+@dataclass(frozen=True)
+class _Phrase:
+    words: Tuple[str, ...]
+    prefix: bool = False
+    quoted: bool = False
+
+    @property
+    def expression(self) -> str:
+        quoted = '"' + " ".join(self.words).replace('"', '""') + '"'
+        return quoted + " *" if self.prefix else quoted
+
+
+def _clean(word: str) -> str:
+    return word.strip(_WORD_EDGES)
+
+
+def _scan(query: str) -> List[Union[_Phrase, int]]:
+    """Phrases in query order, with a NEAR operator stored as its distance."""
+    items: List[Union[_Phrase, int]] = []
+    for match in _TOKEN_RE.finditer(query):
+        if match.group("near") is not None:
+            distance = match.group("distance")
+            items.append(int(distance) if distance else DEFAULT_NEAR_DISTANCE)
+        elif match.group("word") is not None:
+            word = _clean(match.group("word"))
+            if word:
+                items.append(_Phrase((word,), prefix=bool(match.group("prefix"))))
+        else:
+            words = tuple(
+                word for word in map(_clean, _WORD_RE.findall(match.group("phrase"))) if word
+            )
+            if words:
+                items.append(_Phrase(words, quoted=True))
+    return items
+
+
+@lru_cache(maxsize=PARSED_QUERY_CACHE_SIZE)
+def _parse(query: str, stop_words: FrozenSet[str]) -> Optional[ParsedQuery]:
+    items = _scan(query)
+    clauses: List[str] = []
+    phrases: List[_Phrase] = []
+    idx = 0
+    while idx < len(items):
+        item = items[idx]
+        idx += 1
+        if not isinstance(item, _Phrase):
+            # NEAR without a left operand is dropped.
+            continue
+        group = [item]
+        distances = []
+        while (
+            idx + 1 < len(items)
+            and not isinstance(items[idx], _Phrase)
+            and isinstance(items[idx + 1], _Phrase)
+        ):
+            distances.append(items[idx])
+            group.append(items[idx + 1])
+            idx += 2
+        if distances:
+            operands = " ".join(phrase.expression for phrase in group)
+            clauses.append(f"NEAR({operands}, {max(distances)})")
+            phrases.extend(group)
+        elif item.quoted or item.prefix or item.words[0].lower() not in stop_words:
+            clauses.append(item.expression)
+            phrases.append(item)
+    if not clauses:
+        return None
+    words = tuple(word for phrase in phrases for word in phrase.words)
+    return ParsedQuery(
+        match=" ".join(clauses),
+        phrases=tuple(phrase.expression for phrase in phrases),
+        words=words,
+        text=" ".join(words),
+    )
+
+
+def parse_query(query: str) -> ParsedQuery:
+    """Parse ``query``; raises ``ValueError`` if nothing searchable is left."""
+    if not query:
+        raise ValueError("query must be provided")
+    parsed = _parse(query, _stop_words)
+    if parsed is None:
+        raise ValueError("query must contain searchable terms")
+    return parsed
@@ -0,0 +1,42 @@
+"""Apply a ``Config`` to the process-wide settings of the modules it tunes."""
+
+from __future__ import annotations
+
+from typing import Tuple
+
+from .backends import StorageBackend, get_backend
+from .config import Config, get_config
+from .generator import configure_generation_cache
+from .query import configure_stop_words
+from .storage import configure_chunking, configure_dense, configure_pool, configure_query_cache
+from .tracing import configure_tracing
+
+
+def configure_process(config: Config) -> None:
+    """Set the pool size, chunking, stop words, dense index, caches and tracing.
+
+    Safe to call again with a reloaded config. The pool size applies to pools
+    opened afterwards, and the caches are emptied.
+    """
+    configure_pool(config.pool_size)
+    configure_chunking(config.chunk_size, config.chunk_overlap)
+    configure_stop_words(config.stop_words)
+    configure_dense(config.dense_dim, config.dense_index, config.ivf_lists, config.ivf_nprobe)
+    configure_query_cache(
+        config.cache_entries, ttl=config.cache_ttl, max_bytes=config.cache_max_bytes
+    )
+    configure_generation_cache(config.cache_entries, max_bytes=config.cache_max_bytes)
+    configure_tracing(config.tracing)
+
+
+def setup_handler() -> Tuple[Config, StorageBackend]:
+    """Configure a Lambda process and open its backend, with its schema created.
+
+    Every handler module calls this at import time, so all of them run with
+    the same settings and the work is done once per execution environment.
+    """
+    config = get_config()
+    configure_process(config)
+    backend = get_backend(config)
+    backend.initialize()
+    return config, backend
@@ -0,0 +1,45 @@
+"""JSON encoding of API responses.
+
+``dumps`` encodes payloads that contain ``SearchResult`` and
+``DocumentRecord`` objects as they are: a dataclass instance is written from
+its own ``__dict__`` rather than from a copy made by ``asdict`` or a
+comprehension. Output is compact UTF-8 bytes, ready to send.
+
+When orjson is installed it does the encoding, serializing dataclasses
+natively; otherwise the standard library's C encoder is used with ``to_json``
+as its ``default`` hook. Both produce equivalent JSON; orjson writes
+non-ASCII characters as UTF-8 instead of ``\\u`` escapes.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Dict
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+
+def to_json(obj: Any) -> Dict[str, Any]:
+    """``default`` hook for ``json.dumps``: dataclass instances as their fields."""
+    if hasattr(type(obj), "__dataclass_fields__"):
+        # The instance's own attribute dict; nothing is copied.
+        return obj.__dict__
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+_ENCODER = json.JSONEncoder(separators=(",", ":"), default=to_json)
+
+
+def dumps(obj: Any) -> bytes:
+    """``obj`` as compact UTF-8 JSON."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            # Values orjson rejects (e.g. integers beyond 64 bits) are encoded
+            # by the standard library instead.
+            pass
+    return _ENCODER.encode(obj).encode("utf-8")
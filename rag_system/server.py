@@ -2,37 +2,200 @@
 
 from __future__ import annotations
 
+import functools
 from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
 import json
-from urllib.parse import parse_qs, urlparse
-
-from .config import load_config
-from .storage import (
-    add_document,
-    initialize_database,
-    list_documents,
-    search_documents,
-)
-from .generator import generate_response
+import queue
+import signal
+import threading
+import time
+from contextlib import nullcontext
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlparse
+
+from .backends import StorageBackend, get_backend
+from .batch import MAX_BATCH_QUERIES, generate_many, search_many
+from .config import Config, load_config, reload_config, reload_config_if_changed
+from .storage import DocumentRecord, check_listing, document_payload, query_cache
+from .generator import analysis_cache, generate_response, response_cache
 from .analyzer import analyze_text
+from .runtime import configure_process
+from .serialization import dumps
+from .profiling import capture, configure_profiling, flush_profile, request_profile
+from .tracing import (
+    render_prometheus,
+    request_trace,
+    server_timing,
+    span,
+    stage_stats,
+)
+
+
+SERVER_MODES = ("single", "threaded")
+
+_OVERLOADED_BODY = b'{"error": "server overloaded"}'
+_OVERLOADED_RESPONSE = (
+    b"HTTP/1.1 503 Service Unavailable\r\n"
+    b"Content-Type: application/json\r\n"
+    b"Content-Length: " + str(len(_OVERLOADED_BODY)).encode("ascii") + b"\r\n"
+    b"Retry-After: 1\r\n"
+    b"Connection: close\r\n"
+    b"\r\n" + _OVERLOADED_BODY
+)
+
+
+_HIGHLIGHT_MARKERS = ("<mark>", "</mark>")
+# Streamed bodies are written in chunks of about this many bytes.
+_STREAM_CHUNK_BYTES = 64 * 1024
+
+
+def _traced(method: Callable[["RagRequestHandler"], None]) -> Callable[..., None]:
+    """Run a ``do_*`` handler inside a request trace and, if sampled, a profile."""
+
+    @functools.wraps(method)
+    def handle(self: "RagRequestHandler") -> None:
+        # A /debug/profile capture mostly sleeps; profiling it would bury the
+        # requests it captures.
+        if self.path.startswith("/debug/"):
+            profile = nullcontext()
+        else:
+            profile = request_profile()
+        with profile, request_trace():
+            method(self)
+
+    return handle
+
+
+def _flag(params: dict, name: str) -> bool:
+    return params.get(name, ["0"])[0].lower() in ("1", "true", "yes")
+
+
+def _document_stream(
+    records: Iterable[DocumentRecord], fields: str, limit: Optional[int]
+) -> Iterator[bytes]:
+    """The ``/documents`` body, one document at a time.
+
+    ``next_after`` is the cursor for the next page: the last doc_id when a
+    full page of ``limit`` documents was sent, otherwise null.
+    """
+    records = iter(records)
+    # Read the first page before anything is sent, so a failing query is
+    # still answered with an error status.
+    record = next(records, None)
+    yield b'{"documents":['
+    count = 0
+    last = None
+    while record is not None:
+        if count:
+            yield b","
+        yield dumps(record if fields == "full" else document_payload(record, fields))
+        count += 1
+        last = record.doc_id
+        record = next(records, None)
+    next_after = last if limit is not None and count == limit else None
+    yield b'],"next_after":' + dumps(next_after) + b"}"
 
 
 class RagRequestHandler(BaseHTTPRequestHandler):
     server_version = "RAGServer/1.0"
+    protocol_version = "HTTP/1.1"
+    # Idle keep-alive connections are dropped after this many seconds so they
+    # cannot pin a worker thread indefinitely.
+    timeout = 5
+    # Headers and body are written separately; without TCP_NODELAY a kept-alive
+    # connection stalls on delayed ACKs between the two writes.
+    disable_nagle_algorithm = True
 
     def _send_json(self, payload: dict, status: int = 200) -> None:
-        body = json.dumps(payload).encode("utf-8")
+        with span("json_encode"):
+            body = dumps(payload)
+        self._send_body(body, "application/json", status)
+
+    def _send_timing(self) -> None:
+        timing = server_timing()
+        if timing is not None:
+            self.send_header("Server-Timing", timing)
+
+    def _send_body(self, body: bytes, content_type: str, status: int = 200) -> None:
         self.send_response(status)
-        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Type", content_type)
         self.send_header("Content-Length", str(len(body)))
+        self._send_timing()
+        if not getattr(self.server, "keep_alive", False):
+            self.send_header("Connection", "close")
+            self.close_connection = True
         self.end_headers()
         self.wfile.write(body)
 
+    def _send_stream(self, pieces: Iterator[bytes], status: int = 200) -> None:
+        """Send a JSON body produced piece by piece, with chunked encoding.
+
+        The first piece is produced before the status line is written, so
+        errors raised while starting the body still get a normal error
+        response. After that, a failure can only truncate the body and close
+        the connection. HTTP/1.0 clients get a body that ends when the
+        connection closes.
+        """
+        first = next(pieces, b"")
+        chunked = self.request_version != "HTTP/1.0"
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        if chunked:
+            self.send_header("Transfer-Encoding", "chunked")
+        self._send_timing()
+        if not chunked or not getattr(self.server, "keep_alive", False):
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        self.end_headers()
+
+        def write(data: bytes) -> None:
+            if chunked:
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            else:
+                self.wfile.write(data)
+
+        buffer = [first]
+        size = len(first)
+        try:
+            for piece in pieces:
+                buffer.append(piece)
+                size += len(piece)
+                if size >= _STREAM_CHUNK_BYTES:
+                    write(b"".join(buffer))
+                    buffer = []
+                    size = 0
+        except Exception as exc:  # noqa: BLE001
+            print(f"Server error while streaming: {exc}", flush=True)
+            self.close_connection = True
+            return
+        if size:
+            write(b"".join(buffer))
+        if chunked:
+            self.wfile.write(b"0\r\n\r\n")
+
+    def _config(self) -> Config:
+        config = getattr(self.server, "config", None)
+        if config is None:
+            # Plain HTTPServer instances (e.g. in tests) carry no configuration;
+            # load it once and keep it on the server for later requests.
+            with span("config"):
+                config = load_config()
+            self.server.config = config
+        return config
+
+    def _serves_concurrently(self) -> bool:
+        return isinstance(self.server, ThreadingMixIn) or getattr(self.server, "workers", 1) > 1
+
+    def _backend(self) -> StorageBackend:
+        return get_backend(self._config())
+
     def _read_json(self) -> dict:
         length = int(self.headers.get("Content-Length", "0"))
         raw = self.rfile.read(length).decode("utf-8") if length else "{}"
         try:
-            return json.loads(raw or "{}")
+            with span("json_decode"):
+                return json.loads(raw or "{}")
         except json.JSONDecodeError as exc:  # noqa: BLE001
             raise ValueError("Invalid JSON payload") from exc
 
@@ -40,6 +203,7 @@ class RagRequestHandler(BaseHTTPRequestHandler):
         print(f"Server error: {exc}", flush=True)
         self._send_json({"error": str(exc)}, status=500)
 
+    @_traced
     def do_GET(self) -> None:  # noqa: N802
         try:
             parsed = urlparse(self.path)
@@ -47,10 +211,58 @@ class RagRequestHandler(BaseHTTPRequestHandler):
                 self._send_json({"status": "ok"})
                 return
 
+            if parsed.path == "/metrics":
+                caches = {
+                    "query": query_cache.stats(),
+                    "analysis": analysis_cache.stats(),
+                    "response": response_cache.stats(),
+                }
+                if parse_qs(parsed.query).get("format", ["json"])[0] == "prometheus":
+                    self._send_body(
+                        render_prometheus(caches).encode("utf-8"),
+                        "text/plain; version=0.0.4; charset=utf-8",
+                    )
+                    return
+                payload = {f"{name}_cache": stats for name, stats in caches.items()}
+                payload["stages"] = stage_stats()
+                self._send_json(payload)
+                return
+
+            if parsed.path == "/debug/profile":
+                if not self._serves_concurrently():
+                    # The capture sleeps on this thread, so nothing else
+                    # would run, or be profiled, until it ends.
+                    self._send_json(
+                        {"error": "profiling needs a server with more than one worker"},
+                        status=409,
+                    )
+                    return
+                params = parse_qs(parsed.query)
+                try:
+                    window = capture(float(params.get("seconds", ["10"])[0]))
+                except ValueError as exc:
+                    self._send_json({"error": f"invalid profile window: {exc}"}, status=400)
+                    return
+                if params.get("format", ["collapsed"])[0] == "pstats":
+                    self._send_body(window.dumps(), "application/octet-stream")
+                else:
+                    self._send_body(
+                        window.collapsed().encode("utf-8"), "text/plain; charset=utf-8"
+                    )
+                return
+
             if parsed.path == "/documents":
-                config = load_config()
-                docs = list_documents(config.db_path)
-                self._send_json({"documents": [doc.__dict__ for doc in docs]})
+                params = parse_qs(parsed.query)
+                after = params.get("after", [None])[0]
+                fields = params.get("fields", ["full"])[0]
+                try:
+                    limit = int(params["limit"][0]) if "limit" in params else None
+                    check_listing(limit, fields)
+                except ValueError as exc:
+                    self._send_json({"error": f"invalid listing parameters: {exc}"}, status=400)
+                    return
+                records = self._backend().iter_documents(after=after, limit=limit, fields=fields)
+                self._send_stream(_document_stream(records, fields, limit))
                 return
 
             if parsed.path == "/search":
@@ -59,15 +271,42 @@ class RagRequestHandler(BaseHTTPRequestHandler):
                 if not query:
                     self._send_json({"error": "query parameter is required"}, status=400)
                     return
-                config = load_config()
-                results = search_documents(config.db_path, query, limit=config.top_k)
-                self._send_json({"results": [result.__dict__ for result in results]})
+                config = self._config()
+                unit = params.get("unit", ["document"])[0]
+                if unit not in ("document", "passage"):
+                    self._send_json({"error": "unit must be document or passage"}, status=400)
+                    return
+                backend = self._backend()
+                modes = backend.search_modes
+                mode = params.get("mode", ["bm25"])[0]
+                if mode not in modes or (unit == "passage" and mode != "bm25"):
+                    self._send_json(
+                        {"error": f"mode must be one of {', '.join(modes)} for documents"},
+                        status=400,
+                    )
+                    return
+                if unit == "passage":
+                    results = backend.search_passages(query, limit=config.top_k)
+                elif _flag(params, "full"):
+                    results = backend.search(query, limit=config.top_k, mode=mode)
+                else:
+                    results = backend.search(
+                        query,
+                        limit=config.top_k,
+                        snippet_tokens=config.snippet_tokens,
+                        markers=_HIGHLIGHT_MARKERS if _flag(params, "highlight") else ("", ""),
+                        mode=mode,
+                    )
+                self._send_json({"results": results})
                 return
 
             self._send_json({"error": "not found"}, status=404)
+        except ValueError as exc:
+            self._send_json({"error": str(exc)}, status=400)
         except Exception as exc:  # noqa: BLE001
             self._handle_exception(exc)
 
+    @_traced
     def do_POST(self) -> None:  # noqa: N802
         try:
             parsed = urlparse(self.path)
@@ -81,10 +320,42 @@ class RagRequestHandler(BaseHTTPRequestHandler):
                 if not doc_id or not content:
                     self._send_json({"error": "id and content are required"}, status=400)
                     return
-                config = load_config()
-                initialize_database(config.db_path)
-                record = add_document(config.db_path, doc_id, content, source, metadata)
-                self._send_json({"document": record.__dict__}, status=201)
+                backend = self._backend()
+                backend.initialize()
+                record = backend.add(doc_id, content, source, metadata)
+                self._send_json({"document": record}, status=201)
+                return
+
+            if parsed.path in ("/search/batch", "/generate/batch"):
+                queries = payload.get("queries")
+                if not isinstance(queries, list) or not queries:
+                    self._send_json({"error": "queries must be a non-empty list"}, status=400)
+                    return
+                if len(queries) > MAX_BATCH_QUERIES:
+                    self._send_json(
+                        {"error": f"at most {MAX_BATCH_QUERIES} queries per batch"}, status=413
+                    )
+                    return
+                config = self._config()
+                if parsed.path == "/generate/batch":
+                    responses = generate_many(
+                        self._backend(), queries, limit=config.top_k, workers=config.batch_workers
+                    )
+                    self._send_json({"responses": responses})
+                    return
+                full = bool(payload.get("full", False))
+                highlight = bool(payload.get("highlight", False))
+                batches = search_many(
+                    self._backend(),
+                    queries,
+                    limit=config.top_k,
+                    mode=payload.get("mode", "bm25"),
+                    unit=payload.get("unit", "document"),
+                    snippet_tokens=None if full else config.snippet_tokens,
+                    markers=_HIGHLIGHT_MARKERS if highlight else ("", ""),
+                    workers=config.batch_workers,
+                )
+                self._send_json({"results": batches})
                 return
 
             if parsed.path == "/generate":
@@ -92,8 +363,11 @@ class RagRequestHandler(BaseHTTPRequestHandler):
                 if not query:
                     self._send_json({"error": "query is required"}, status=400)
                     return
-                config = load_config()
-                results = search_documents(config.db_path, query, limit=config.top_k)
+                if not isinstance(query, str):
+                    self._send_json({"error": "query must be a string"}, status=400)
+                    return
+                config = self._config()
+                results = self._backend().search_passages(query, limit=config.top_k)
                 response = generate_response(query, results)
                 self._send_json(response)
                 return
@@ -113,21 +387,183 @@ class RagRequestHandler(BaseHTTPRequestHandler):
         except Exception as exc:  # noqa: BLE001
             self._handle_exception(exc)
 
+    @_traced
+    def do_DELETE(self) -> None:  # noqa: N802
+        try:
+            parsed = urlparse(self.path)
+            prefix = "/documents/"
+            if parsed.path.startswith(prefix) and len(parsed.path) > len(prefix):
+                doc_id = unquote(parsed.path[len(prefix) :])
+                if not self._backend().delete([doc_id]):
+                    self._send_json({"error": "document not found"}, status=404)
+                    return
+                self._send_json({"deleted": doc_id})
+                return
+
+            self._send_json({"error": "not found"}, status=404)
+        except Exception as exc:  # noqa: BLE001
+            self._handle_exception(exc)
+
     def log_message(self, fmt: str, *args: object) -> None:
         return
 
 
+class RagHTTPServer(HTTPServer):
+    """Single-threaded HTTP server that owns the process configuration.
+
+    Handlers read ``server.config`` instead of loading it per request. The
+    configuration is swapped between requests from ``service_actions`` when a
+    reload was requested (e.g. on SIGHUP) or, if
+    ``config_reload_interval`` is set, when the ``.env`` file's mtime changes,
+    and the new one is applied with ``configure_server``.
+    """
+
+    keep_alive = False
+
+    def __init__(
+        self,
+        server_address: Tuple[str, int],
+        handler_class: type,
+        config: Optional[Config] = None,
+    ) -> None:
+        super().__init__(server_address, handler_class)
+        self.config = config or load_config()
+        self._reload_requested = False
+        self._next_reload_check = time.monotonic() + self.config.config_reload_interval
+
+    def request_reload(self) -> None:
+        self._reload_requested = True
+
+    def service_actions(self) -> None:
+        flush_profile()
+        if self._reload_requested:
+            self._reload_requested = False
+            self._apply(reload_config())
+            return
+        interval = self.config.config_reload_interval
+        if interval <= 0:
+            return
+        now = time.monotonic()
+        if now < self._next_reload_check:
+            return
+        self._next_reload_check = now + interval
+        updated = reload_config_if_changed()
+        if updated is not None:
+            self._apply(updated)
+
+    def _apply(self, config: Config) -> None:
+        flush_profile(force=True)
+        configure_server(config)
+        self.config = config
+
+
+class WorkerPoolHTTPServer(RagHTTPServer):
+    """HTTP server that serves connections from a fixed pool of worker threads.
+
+    Accepted connections wait in a bounded queue. When the queue is full the
+    connection is answered with ``503 Service Unavailable`` straight away, so a
+    burst of slow requests applies backpressure instead of piling up threads.
+    """
+
+    keep_alive = True
+
+    def __init__(
+        self,
+        server_address: Tuple[str, int],
+        handler_class: type,
+        workers: int = 8,
+        queue_size: int = 64,
+        config: Optional[Config] = None,
+    ) -> None:
+        if workers <= 0:
+            raise ValueError("workers must be positive")
+        if queue_size <= 0:
+            raise ValueError("queue_size must be positive")
+        super().__init__(server_address, handler_class, config=config)
+        self.workers = workers
+        self._pending: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=queue_size)
+        self._threads: List[threading.Thread] = []
+        for idx in range(workers):
+            thread = threading.Thread(
+                target=self._work, name=f"rag-worker-{idx}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def process_request(self, request, client_address) -> None:  # noqa: ANN001
+        try:
+            self._pending.put_nowait((request, client_address))
+        except queue.Full:
+            self._reject(request)
+
+    def _reject(self, request) -> None:  # noqa: ANN001
+        try:
+            request.sendall(_OVERLOADED_RESPONSE)
+        except OSError:
+            pass
+        self.shutdown_request(request)
+
+    def _work(self) -> None:
+        while True:
+            item = self._pending.get()
+            if item is None:
+                return
+            request, client_address = item
+            try:
+                self.finish_request(request, client_address)
+            except Exception:  # noqa: BLE001
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    def server_close(self) -> None:
+        super().server_close()
+        for _ in self._threads:
+            self._pending.put(None)
+        for thread in self._threads:
+            thread.join()
+
+
+def create_server(config: Config) -> RagHTTPServer:
+    mode = config.server_mode
+    if mode not in SERVER_MODES:
+        raise ValueError(f"unknown server mode {mode!r}; expected one of {SERVER_MODES}")
+    address = (config.host, config.port)
+    if mode == "single":
+        return RagHTTPServer(address, RagRequestHandler, config=config)
+    return WorkerPoolHTTPServer(
+        address,
+        RagRequestHandler,
+        workers=config.workers,
+        queue_size=config.queue_size,
+        config=config,
+    )
+
+
+def configure_server(config: Config) -> None:
+    """Apply ``config`` to the process: at startup and after every reload."""
+    configure_process(config)
+    configure_profiling(config.profile_sample_rate, config.data_dir / "profiles" / "server")
+
+
 def run_server() -> None:
-    config = load_config()
-    initialize_database(config.db_path)
-    server = HTTPServer((config.host, config.port), RagRequestHandler)
-    print(f"RAG server running at http://{config.host}:{config.port}")
+    config = reload_config()
+    configure_server(config)
+    get_backend(config).initialize()
+    server = create_server(config)
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, lambda *_: server.request_reload())
+    print(
+        f"RAG server running at http://{config.host}:{config.port} "
+        f"({config.server_mode} mode)"
+    )
     try:
         server.serve_forever()
     except KeyboardInterrupt:
         pass
     finally:
         server.server_close()
+        flush_profile(force=True)
 
 
 if __name__ == "__main__":
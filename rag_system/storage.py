@@ -2,12 +2,36 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+import hashlib
 from pathlib import Path
 import json
+import os
+import queue
 import sqlite3
-from typing import Iterable, List, Optional
-import re
+import threading
+import time
+import zlib
+from typing import TYPE_CHECKING, Callable, Dict, Hashable, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from .cache import LRUCache
+from .chunking import DEFAULT_CHUNK_OVERLAP, DEFAULT_CHUNK_SIZE, chunk_text
+from .query import ParsedQuery, parse_query
+from .tracing import span
+
+if TYPE_CHECKING:
+    from .vectors import VectorIndex
+
+
+DEFAULT_POOL_SIZE = 4
+# Seconds between checks for commits by other processes; see
+# ConnectionPool.current_generation.
+DATA_VERSION_INTERVAL = 0.001
+
+# Search results keyed by (db_path, write generation, kind, FTS5 match expression, limit).
+query_cache = LRUCache(max_entries=1024, ttl=300, max_bytes=64 * 1024 * 1024)
 
 
 @dataclass(frozen=True)
@@ -18,6 +42,13 @@ class DocumentRecord:
     metadata: dict
 
 
+@dataclass(frozen=True)
+class WriteCounts:
+    inserted: int = 0
+    updated: int = 0
+    skipped: int = 0
+
+
 @dataclass(frozen=True)
 class SearchResult:
     doc_id: str
@@ -25,39 +56,628 @@ class SearchResult:
     source: str
     score: float
     metadata: dict
+    lexical_score: Optional[float] = None
+    dense_score: Optional[float] = None
 
 
 def _connect(db_path: Path) -> sqlite3.Connection:
-    db_path.parent.mkdir(parents=True, exist_ok=True)
-    connection = sqlite3.connect(db_path)
+    connection = sqlite3.connect(db_path, check_same_thread=False)
     connection.row_factory = sqlite3.Row
-    connection.execute("PRAGMA journal_mode=WAL;")
     connection.execute("PRAGMA foreign_keys=ON;")
     return connection
 
 
+class ConnectionPool:
+    """Long-lived SQLite connections for a single database file.
+
+    Readers are checked out of a bounded pool so concurrent threads never share
+    a connection, while every write goes through one writer connection guarded
+    by a lock. WAL mode lets readers proceed while the writer commits.
+    ``generation`` increases after every committed write so caches keyed on
+    it never serve results from before the write; ``current_generation`` also
+    accounts for writes committed by other processes. ``pinned_reader`` holds
+    one reader for a thread across many calls.
+    """
+
+    def __init__(self, db_path: Path, size: int = DEFAULT_POOL_SIZE) -> None:
+        if size <= 0:
+            raise ValueError("pool size must be positive")
+        self.db_path = db_path
+        self.size = size
+        self._readers: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+        self._writer_lock = threading.Lock()
+        self._writer: Optional[sqlite3.Connection] = None
+        self._closed = False
+        self._pinned = threading.local()
+        self.generation = 0
+        self._version_lock = threading.Lock()
+        self._version_connection: Optional[sqlite3.Connection] = None
+        self._data_version: Optional[int] = None
+        self._changes = 0
+        self._version_checked = float("-inf")
+
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self.writer() as connection:
+            connection.execute("PRAGMA journal_mode=WAL;")
+
+    def _checkout_reader(self) -> sqlite3.Connection:
+        try:
+            return self._readers.get_nowait()
+        except queue.Empty:
+            pass
+        with span("connection"):
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError("connection pool is closed")
+                if self._opened < self.size:
+                    self._opened += 1
+                    return _connect(self.db_path)
+            return self._readers.get()
+
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        pinned = getattr(self._pinned, "connection", None)
+        if pinned is not None:
+            yield pinned
+            return
+        connection = self._checkout_reader()
+        try:
+            yield connection
+        finally:
+            self._readers.put(connection)
+
+    @contextmanager
+    def pinned_reader(self) -> Iterator[sqlite3.Connection]:
+        """Check out one reader; ``reader()`` calls on this thread reuse it.
+
+        Batches wrap their queries in this so they skip the pool queue per
+        query. Reads are still one statement each, so they see writes
+        committed while the reader is held.
+        """
+        pinned = getattr(self._pinned, "connection", None)
+        if pinned is not None:
+            yield pinned
+            return
+        with self.reader() as connection:
+            self._pinned.connection = connection
+            try:
+                yield connection
+            finally:
+                self._pinned.connection = None
+
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        with self._writer_lock:
+            if self._writer is None:
+                if self._closed:
+                    raise RuntimeError("connection pool is closed")
+                self._writer = _connect(self.db_path)
+            with self._writer:
+                yield self._writer
+            self.generation += 1
+
+    def current_generation(self) -> int:
+        """A counter that grows after every commit to the database, from any process.
+
+        ``PRAGMA data_version`` on a connection of its own changes whenever any
+        other connection, in this process or another, commits to the file. The
+        pragma costs more than a cache hit, so it runs at most once per
+        ``DATA_VERSION_INTERVAL``; writes from this process still count at once.
+        The changes it has seen are counted apart from ``generation``, so neither
+        counter needs the other's lock and their sum never repeats.
+        """
+        now = time.monotonic()
+        if now - self._version_checked < DATA_VERSION_INTERVAL:
+            return self.generation + self._changes
+        with self._version_lock:
+            if self._version_connection is None:
+                if self._closed:
+                    raise RuntimeError("connection pool is closed")
+                self._version_connection = _connect(self.db_path)
+            data_version = self._version_connection.execute("PRAGMA data_version;").fetchone()[0]
+            if data_version != self._data_version:
+                if self._data_version is not None:
+                    self._changes += 1
+                self._data_version = data_version
+            self._version_checked = now
+            return self.generation + self._changes
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                self._readers.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._writer_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        with self._version_lock:
+            if self._version_connection is not None:
+                self._version_connection.close()
+                self._version_connection = None
+
+
+def shard_paths(db_path: Path, shards: int) -> List[Path]:
+    """Database files of a ``shards``-way split of ``db_path``.
+
+    A single shard is ``db_path`` itself. Names include the shard count, so a
+    database sharded another way is never half-read; changing the count means
+    re-ingesting.
+    """
+    if shards <= 0:
+        raise ValueError("shards must be positive")
+    db_path = Path(db_path)
+    if shards == 1:
+        return [db_path]
+    return [
+        db_path.with_name(f"{db_path.stem}.shard-{idx}-of-{shards}{db_path.suffix}")
+        for idx in range(shards)
+    ]
+
+
+def shard_index(doc_id: str, shards: int) -> int:
+    """The shard that owns ``doc_id``; CRC32 is stable across processes."""
+    return zlib.crc32(doc_id.encode("utf-8")) % shards
+
+
+# Pools by resolved path, and by each path callers passed in (relative ones
+# with the working directory), so only the first lookup of a path resolves it.
+_POOLS: Dict[Path, ConnectionPool] = {}
+_POOL_ALIASES: Dict[object, ConnectionPool] = {}
+_POOLS_LOCK = threading.Lock()
+_pool_size = DEFAULT_POOL_SIZE
+
+
+def configure_pool(size: int) -> None:
+    """Set the reader pool size used for pools opened after this call."""
+    global _pool_size
+    if size <= 0:
+        raise ValueError("pool size must be positive")
+    _pool_size = size
+
+
+def get_pool(db_path: Path) -> ConnectionPool:
+    """The pool for ``db_path``; every spelling of one file shares a pool."""
+    db_path = Path(db_path)
+    alias = db_path if db_path.is_absolute() else (os.getcwd(), db_path)
+    pool = _POOL_ALIASES.get(alias)
+    if pool is not None:
+        return pool
+    resolved = db_path.resolve()
+    with _POOLS_LOCK:
+        pool = _POOLS.get(resolved)
+        if pool is None:
+            pool = ConnectionPool(resolved, size=_pool_size)
+            _POOLS[resolved] = pool
+        _POOL_ALIASES[alias] = pool
+    return pool
+
+
+def configure_query_cache(
+    max_entries: int, ttl: Optional[float] = None, max_bytes: Optional[int] = None
+) -> None:
+    """Resize the shared search result cache; ``max_entries=0`` disables it."""
+    query_cache.configure(max_entries, ttl=ttl, max_bytes=max_bytes)
+
+
+_chunk_size = DEFAULT_CHUNK_SIZE
+_chunk_overlap = DEFAULT_CHUNK_OVERLAP
+
+
+def configure_chunking(size: int, overlap: int) -> None:
+    """Set the passage window used for documents written after this call."""
+    global _chunk_size, _chunk_overlap
+    chunk_text("probe", size=size, overlap=overlap)
+    _chunk_size, _chunk_overlap = size, overlap
+
+
+DENSE_INDEXES = ("flat", "ivf")
+
+# rag_system.vectors.DEFAULT_DIM and rag_system.ann.DEFAULT_NPROBE. The dense
+# modules load NumPy, so they are imported when an index is first opened
+# rather than here, and lexical-only processes never pay for them.
+_DEFAULT_DENSE_DIM = 256
+_DEFAULT_NPROBE = 16
+
+_dense_dim = _DEFAULT_DENSE_DIM
+_dense_index = "flat"
+_ivf_lists = 0
+_ivf_nprobe = _DEFAULT_NPROBE
+_VECTOR_INDEXES: Dict[tuple, VectorIndex] = {}
+_VECTOR_LOCK = threading.Lock()
+
+
+def configure_dense(
+    dim: int, index: str = "flat", lists: int = 0, nprobe: int = _DEFAULT_NPROBE
+) -> None:
+    """Set the dense index used by later calls; ``dim=0`` disables it.
+
+    ``index`` is ``"flat"`` (exact scan) or ``"ivf"`` (approximate, scanning
+    the ``nprobe`` nearest of ``lists`` clusters; ``lists=0`` sizes it from the
+    corpus). Both read and write the same vector files.
+    """
+    global _dense_dim, _dense_index, _ivf_lists, _ivf_nprobe
+    if dim < 0:
+        raise ValueError("dense dim must not be negative")
+    if index not in DENSE_INDEXES:
+        raise ValueError(f"dense index must be one of {DENSE_INDEXES}")
+    if lists < 0 or nprobe <= 0:
+        raise ValueError("ivf lists must not be negative and nprobe must be positive")
+    _dense_dim, _dense_index, _ivf_lists, _ivf_nprobe = dim, index, lists, nprobe
+
+
+def get_vector_index(db_path: Path) -> Optional[VectorIndex]:
+    """Return the dense index for ``db_path``, or ``None`` when it is disabled.
+
+    The first call in a process checks the index against ``document_meta`` and
+    rebuilds it from the documents table if it is missing or out of step, e.g.
+    for databases written before the dense index existed.
+    """
+    if not _dense_dim:
+        return None
+    pool = get_pool(db_path)
+    key = (pool.db_path, _dense_dim, _dense_index, _ivf_lists, _ivf_nprobe)
+    index = _VECTOR_INDEXES.get(key)
+    if index is not None:
+        return index
+    with _VECTOR_LOCK:
+        index = _VECTOR_INDEXES.get(key)
+        if index is None:
+            from .ann import IVFIndex
+            from .vectors import VectorIndex
+
+            if _dense_index == "ivf":
+                index = IVFIndex(
+                    pool.db_path, dim=_dense_dim, lists=_ivf_lists, nprobe=_ivf_nprobe
+                )
+            else:
+                index = VectorIndex(pool.db_path, dim=_dense_dim)
+            with pool.reader() as connection:
+                count = connection.execute("SELECT COUNT(*) FROM document_meta;").fetchone()[0]
+                try:
+                    stale = len(index) != count
+                except ValueError:  # built with a different RAG_DENSE_DIM
+                    stale = True
+                if stale:
+                    index.rebuild(
+                        (row["doc_id"], row["content"])
+                        for row in connection.execute("SELECT doc_id, content FROM documents;")
+                    )
+            _VECTOR_INDEXES[key] = index
+    return index
+
+
+def build_vector_index(db_path: Path, rebuild: bool = False) -> Optional[VectorIndex]:
+    """Bring the dense index up to date now instead of on the first search.
+
+    ``rebuild`` re-embeds every document; an IVF index is (re)trained.
+    """
+    index = get_vector_index(db_path)
+    if index is None:
+        return None
+    if rebuild:
+        with get_pool(db_path).reader() as connection:
+            index.rebuild(
+                (row["doc_id"], row["content"])
+                for row in connection.execute("SELECT doc_id, content FROM documents;")
+            )
+    from .ann import IVFIndex
+
+    if isinstance(index, IVFIndex):
+        index.train()
+    return index
+
+
+def close_pools() -> None:
+    with _POOLS_LOCK:
+        pools = list(_POOLS.values())
+        _POOLS.clear()
+        _POOL_ALIASES.clear()
+    with _VECTOR_LOCK:
+        _VECTOR_INDEXES.clear()
+    for pool in pools:
+        pool.close()
+
+
+# Columns added to document_meta after the initial schema, with their types.
+_META_MIGRATIONS = (
+    ("content_hash", "TEXT"),
+    ("mtime_ns", "INTEGER"),
+    ("size", "INTEGER"),
+    ("source", "TEXT"),
+    ("metadata", "TEXT"),
+)
+
+
+_DOCUMENTS_TABLE = """
+CREATE VIRTUAL TABLE IF NOT EXISTS {name} USING fts5(
+    doc_id,
+    content,
+    source,
+    metadata,
+    tokenize='porter'
+);
+"""
+
+
 def initialize_database(db_path: Path) -> None:
-    with _connect(db_path) as connection:
+    with get_pool(db_path).writer() as connection:
+        connection.execute(_DOCUMENTS_TABLE.format(name="documents"))
+        connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS document_meta (
+                doc_id TEXT PRIMARY KEY,
+                created_at TEXT NOT NULL,
+                content_hash TEXT,
+                mtime_ns INTEGER,
+                size INTEGER
+            );
+            """
+        )
+        columns = {row["name"] for row in connection.execute("PRAGMA table_info(document_meta);")}
+        for name, column_type in _META_MIGRATIONS:
+            if name not in columns:
+                connection.execute(f"ALTER TABLE document_meta ADD COLUMN {name} {column_type};")
+
+        has_passages = connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'passage_meta';"
+        ).fetchone()
         connection.execute(
             """
-            CREATE VIRTUAL TABLE IF NOT EXISTS documents USING fts5(
-                doc_id,
+            CREATE VIRTUAL TABLE IF NOT EXISTS passages USING fts5(
                 content,
-                source,
-                metadata,
                 tokenize='porter'
             );
             """
         )
         connection.execute(
             """
-            CREATE TABLE IF NOT EXISTS document_meta (
-                doc_id TEXT PRIMARY KEY,
-                created_at TEXT NOT NULL
+            CREATE TABLE IF NOT EXISTS passage_meta (
+                rowid INTEGER PRIMARY KEY,
+                doc_id TEXT NOT NULL,
+                passage_index INTEGER NOT NULL,
+                start_offset INTEGER NOT NULL,
+                end_offset INTEGER NOT NULL
             );
             """
         )
-        connection.commit()
+        connection.execute(
+            "CREATE INDEX IF NOT EXISTS passage_meta_doc_id ON passage_meta (doc_id);"
+        )
+        if connection.execute("PRAGMA user_version;").fetchone()[0] < 1:
+            _align_document_rowids(connection)
+            connection.execute("PRAGMA user_version = 1;")
+        if not has_passages:
+            _backfill_passages(connection)
+
+
+def _align_document_rowids(connection: sqlite3.Connection) -> None:
+    # Schema version 1 gives each FTS5 row the rowid of its document_meta row,
+    # so documents are fetched by doc_id through the primary key index instead
+    # of a scan. Older databases are rebuilt once; empty ones need no copy.
+    if not connection.execute("SELECT 1 FROM documents LIMIT 1;").fetchone():
+        return
+    connection.execute(
+        """
+        INSERT OR IGNORE INTO document_meta (doc_id, created_at, source, metadata)
+        SELECT doc_id, datetime('now'), source, metadata FROM documents;
+        """
+    )
+    connection.execute(_DOCUMENTS_TABLE.format(name="documents_aligned"))
+    connection.execute(
+        """
+        INSERT INTO documents_aligned (rowid, doc_id, content, source, metadata)
+        SELECT document_meta.rowid, documents.doc_id, documents.content,
+               documents.source, documents.metadata
+        FROM documents JOIN document_meta ON document_meta.doc_id = documents.doc_id;
+        """
+    )
+    connection.execute("DROP TABLE documents;")
+    connection.execute("ALTER TABLE documents_aligned RENAME TO documents;")
+
+
+def _backfill_passages(connection: sqlite3.Connection) -> None:
+    # Databases created before passages existed: chunk what is already indexed
+    # and copy source/metadata into document_meta for passage lookups.
+    rows = connection.execute("SELECT doc_id, content, source, metadata FROM documents;")
+    for row in rows.fetchall():
+        _write_passages(connection, [(row["doc_id"], row["content"])])
+        connection.execute(
+            "UPDATE document_meta SET source = ?, metadata = ? WHERE doc_id = ?;",
+            (row["source"], row["metadata"], row["doc_id"]),
+        )
+
+
+def _write_passages(connection: sqlite3.Connection, documents: Sequence[Tuple[str, str]]) -> None:
+    """Chunk ``(doc_id, content)`` pairs into ``passages``/``passage_meta``.
+
+    Both tables share a rowid, so passages can be deleted by doc_id through the
+    indexed ``passage_meta`` table instead of scanning the FTS5 index.
+    """
+    next_rowid = connection.execute(
+        "SELECT COALESCE(MAX(rowid), 0) + 1 FROM passage_meta;"
+    ).fetchone()[0]
+    texts = []
+    metas = []
+    for doc_id, content in documents:
+        for passage in chunk_text(content, size=_chunk_size, overlap=_chunk_overlap):
+            texts.append((next_rowid, passage.text))
+            metas.append((next_rowid, doc_id, passage.index, passage.start, passage.end))
+            next_rowid += 1
+    connection.executemany("INSERT INTO passages (rowid, content) VALUES (?, ?);", texts)
+    connection.executemany(
+        """
+        INSERT INTO passage_meta (rowid, doc_id, passage_index, start_offset, end_offset)
+        VALUES (?, ?, ?, ?, ?);
+        """,
+        metas,
+    )
+
+
+def _delete_documents(connection: sqlite3.Connection, doc_ids: Sequence[str]) -> None:
+    """Delete stored documents and their passages through the shared rowids."""
+    for offset in range(0, len(doc_ids), _MAX_IN_PARAMS):
+        chunk = doc_ids[offset : offset + _MAX_IN_PARAMS]
+        placeholders = ",".join("?" * len(chunk))
+        connection.execute(
+            f"""
+            DELETE FROM documents WHERE rowid IN (
+                SELECT rowid FROM document_meta WHERE doc_id IN ({placeholders})
+            );
+            """,
+            chunk,
+        )
+        connection.execute(f"DELETE FROM document_meta WHERE doc_id IN ({placeholders});", chunk)
+    _delete_passages(connection, doc_ids)
+
+
+def _delete_passages(connection: sqlite3.Connection, doc_ids: Sequence[str]) -> None:
+    for offset in range(0, len(doc_ids), _MAX_IN_PARAMS):
+        chunk = doc_ids[offset : offset + _MAX_IN_PARAMS]
+        placeholders = ",".join("?" * len(chunk))
+        connection.execute(
+            f"""
+            DELETE FROM passages WHERE rowid IN (
+                SELECT rowid FROM passage_meta WHERE doc_id IN ({placeholders})
+            );
+            """,
+            chunk,
+        )
+        connection.execute(f"DELETE FROM passage_meta WHERE doc_id IN ({placeholders});", chunk)
+
+
+# Keeps "IN (...)" lists below SQLite's default host-parameter limit.
+_MAX_IN_PARAMS = 500
+
+
+def _select_in(
+    connection: sqlite3.Connection, sql: str, values: Sequence[str]
+) -> Iterator[sqlite3.Row]:
+    """Run ``sql`` (containing one ``{placeholders}`` slot) over ``values`` in chunks."""
+    for offset in range(0, len(values), _MAX_IN_PARAMS):
+        chunk = values[offset : offset + _MAX_IN_PARAMS]
+        yield from connection.execute(sql.format(placeholders=",".join("?" * len(chunk))), chunk)
+
+
+def content_hash(content: str, source: str, metadata_json: str) -> str:
+    digest = hashlib.sha256()
+    for part in (content, source, metadata_json):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def load_file_state(
+    connection: sqlite3.Connection, doc_ids: Sequence[str]
+) -> Dict[str, Tuple[Optional[int], Optional[int]]]:
+    """Return the stored ``(mtime_ns, size)`` for each known doc_id."""
+    return {
+        row["doc_id"]: (row["mtime_ns"], row["size"])
+        for row in _select_in(
+            connection,
+            "SELECT doc_id, mtime_ns, size FROM document_meta WHERE doc_id IN ({placeholders});",
+            doc_ids,
+        )
+    }
+
+
+def write_batch(
+    connection: sqlite3.Connection,
+    records: Iterable[DocumentRecord],
+    file_stats: Optional[Mapping[str, Tuple[int, int]]] = None,
+    skip_unchanged: bool = False,
+    vectors: Optional[VectorIndex] = None,
+) -> WriteCounts:
+    """Upsert ``records`` on an open writer connection with batched statements.
+
+    Only doc_ids already present in ``document_meta`` trigger a delete from the
+    FTS5 table, and that delete goes through the shared rowid, so writes never
+    scan the index. When a doc_id repeats within the batch the last record
+    wins, matching sequential inserts. With ``skip_unchanged``, records whose
+    content hash matches the stored one are left alone apart from refreshing
+    their ``file_stats`` (``mtime_ns``, ``size``) so the next stat check can
+    skip them without reading the file. Written documents are also embedded
+    into ``vectors`` when it is given.
+    """
+    unique: Dict[str, DocumentRecord] = {}
+    for record in records:
+        unique.pop(record.doc_id, None)
+        unique[record.doc_id] = record
+    if not unique:
+        return WriteCounts()
+    file_stats = file_stats or {}
+
+    doc_ids = list(unique)
+    existing = {
+        row["doc_id"]: row["content_hash"]
+        for row in _select_in(
+            connection,
+            "SELECT doc_id, content_hash FROM document_meta WHERE doc_id IN ({placeholders});",
+            doc_ids,
+        )
+    }
+
+    rows = []
+    unchanged = []
+    for doc_id, record in unique.items():
+        metadata_json = json.dumps(record.metadata)
+        digest = content_hash(record.content, record.source, metadata_json)
+        if skip_unchanged and existing.get(doc_id) == digest:
+            unchanged.append(doc_id)
+            continue
+        rows.append((record, metadata_json, digest))
+
+    if unchanged and file_stats:
+        connection.executemany(
+            "UPDATE document_meta SET mtime_ns = ?, size = ? WHERE doc_id = ?;",
+            [(*file_stats[doc_id], doc_id) for doc_id in unchanged if doc_id in file_stats],
+        )
+
+    replaced = [record.doc_id for record, _, _ in rows if record.doc_id in existing]
+    _delete_documents(connection, replaced)
+
+    connection.executemany(
+        """
+        INSERT INTO document_meta (
+            doc_id, created_at, content_hash, mtime_ns, size, source, metadata
+        )
+        VALUES (?, datetime('now'), ?, ?, ?, ?, ?);
+        """,
+        [
+            (
+                record.doc_id,
+                digest,
+                *file_stats.get(record.doc_id, (None, None)),
+                record.source,
+                metadata_json,
+            )
+            for record, metadata_json, digest in rows
+        ],
+    )
+    connection.executemany(
+        """
+        INSERT INTO documents (rowid, doc_id, content, source, metadata)
+        VALUES ((SELECT rowid FROM document_meta WHERE doc_id = ?), ?, ?, ?, ?);
+        """,
+        [
+            (record.doc_id, record.doc_id, record.content, record.source, metadata_json)
+            for record, metadata_json, _ in rows
+        ],
+    )
+    written = [(record.doc_id, record.content) for record, _, _ in rows]
+    _write_passages(connection, written)
+    if vectors is not None:
+        vectors.upsert(written)
+    return WriteCounts(
+        inserted=len(rows) - len(replaced),
+        updated=len(replaced),
+        skipped=len(unchanged),
+    )
 
 
 def add_document(
@@ -72,72 +692,152 @@ def add_document(
     if not content:
         raise ValueError("content must be provided")
 
-    metadata_payload = metadata or {}
-    with _connect(db_path) as connection:
-        connection.execute("DELETE FROM documents WHERE doc_id = ?;", (doc_id,))
-        connection.execute("DELETE FROM document_meta WHERE doc_id = ?;", (doc_id,))
-        connection.execute(
-            "INSERT INTO documents (doc_id, content, source, metadata) VALUES (?, ?, ?, ?);",
-            (doc_id, content, source, json.dumps(metadata_payload)),
-        )
-        connection.execute(
-            "INSERT INTO document_meta (doc_id, created_at) VALUES (?, datetime('now'));",
-            (doc_id,),
-        )
-        connection.commit()
-
-    return DocumentRecord(
+    record = DocumentRecord(
         doc_id=doc_id,
         content=content,
         source=source,
-        metadata=metadata_payload,
+        metadata=metadata or {},
     )
+    vectors = get_vector_index(db_path)
+    with get_pool(db_path).writer() as connection:
+        write_batch(connection, [record], vectors=vectors)
+    return record
 
 
 def add_documents(db_path: Path, records: Iterable[DocumentRecord]) -> List[DocumentRecord]:
-    inserted: List[DocumentRecord] = []
-    with _connect(db_path) as connection:
-        for record in records:
-            connection.execute("DELETE FROM documents WHERE doc_id = ?;", (record.doc_id,))
-            connection.execute("DELETE FROM document_meta WHERE doc_id = ?;", (record.doc_id,))
-            connection.execute(
-                "INSERT INTO documents (doc_id, content, source, metadata) VALUES (?, ?, ?, ?);",
-                (
-                    record.doc_id,
-                    record.content,
-                    record.source,
-                    json.dumps(record.metadata),
-                ),
+    records = list(records)
+    vectors = get_vector_index(db_path)
+    with get_pool(db_path).writer() as connection:
+        write_batch(connection, records, vectors=vectors)
+    return records
+
+
+def delete_documents(db_path: Path, doc_ids: Iterable[str]) -> int:
+    """Delete documents with their passages and vectors; returns how many existed."""
+    doc_ids = list(dict.fromkeys(doc_ids))
+    vectors = get_vector_index(db_path)
+    with get_pool(db_path).writer() as connection:
+        existing = [
+            row["doc_id"]
+            for row in _select_in(
+                connection,
+                "SELECT doc_id FROM document_meta WHERE doc_id IN ({placeholders});",
+                doc_ids,
             )
-            connection.execute(
-                "INSERT INTO document_meta (doc_id, created_at) VALUES (?, datetime('now'));",
-                (record.doc_id,),
+        ]
+        _delete_documents(connection, existing)
+        # Under the writer lock, like ``write_batch(vectors=...)``, so a
+        # concurrent re-add of a doc_id cannot be undone by this removal.
+        if vectors is not None:
+            vectors.remove(existing)
+    return len(existing)
+
+
+# Projections for listing documents, and the record fields each one fills.
+# Fields left out of a projection come back empty.
+LIST_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "full": ("doc_id", "content", "source", "metadata"),
+    "metadata": ("doc_id", "source", "metadata"),
+    "ids": ("doc_id",),
+}
+# Rows fetched per reader checkout while listing.
+LIST_PAGE_SIZE = 500
+
+# CROSS JOIN keeps document_meta as the outer loop, so each page is a range
+# scan of its primary key; otherwise SQLite scans the FTS5 table and sorts.
+_LIST_QUERIES = {
+    "full": """
+        SELECT document_meta.doc_id, documents.content, documents.source, documents.metadata
+        FROM document_meta CROSS JOIN documents ON documents.rowid = document_meta.rowid
+        WHERE document_meta.doc_id > ? ORDER BY document_meta.doc_id LIMIT ?;
+    """,
+    "metadata": """
+        SELECT document_meta.doc_id, documents.source, documents.metadata
+        FROM document_meta CROSS JOIN documents ON documents.rowid = document_meta.rowid
+        WHERE document_meta.doc_id > ? ORDER BY document_meta.doc_id LIMIT ?;
+    """,
+    "ids": "SELECT doc_id FROM document_meta WHERE doc_id > ? ORDER BY doc_id LIMIT ?;",
+}
+
+
+def check_listing(limit: Optional[int], fields: str) -> None:
+    if limit is not None and limit <= 0:
+        raise ValueError("limit must be positive")
+    if fields not in LIST_FIELDS:
+        raise ValueError(f"fields must be one of {tuple(LIST_FIELDS)}")
+
+
+def project_record(record: DocumentRecord, fields: str) -> DocumentRecord:
+    """``record`` with the fields outside the ``fields`` projection emptied."""
+    if fields == "full":
+        return record
+    if fields == "metadata":
+        return replace(record, content="")
+    return DocumentRecord(doc_id=record.doc_id, content="", source="", metadata={})
+
+
+def document_payload(record: DocumentRecord, fields: str = "full") -> dict:
+    """JSON-ready dict of the fields in the ``fields`` projection."""
+    return {name: getattr(record, name) for name in LIST_FIELDS[fields]}
+
+
+def iter_documents(
+    db_path: Path,
+    after: Optional[str] = None,
+    limit: Optional[int] = None,
+    fields: str = "full",
+) -> Iterator[DocumentRecord]:
+    """Yield documents in doc_id order, starting after the doc_id ``after``.
+
+    Rows are read in keyset pages of ``LIST_PAGE_SIZE`` (``doc_id > last``
+    through the ``document_meta`` primary key), each on a short reader
+    checkout, so memory stays bounded by one page however many documents
+    there are. Pages are not one snapshot: each document is yielded at most
+    once, and writes made during the walk may or may not be seen.
+    ``fields`` picks a projection from ``LIST_FIELDS``; ``ids`` is answered
+    from the primary key index alone.
+    """
+    check_listing(limit, fields)
+    pool = get_pool(db_path)
+    query = _LIST_QUERIES[fields]
+    cursor = after or ""
+    remaining = limit
+    while remaining is None or remaining > 0:
+        page = LIST_PAGE_SIZE if remaining is None else min(LIST_PAGE_SIZE, remaining)
+        with pool.reader() as connection:
+            rows = connection.execute(query, (cursor, page)).fetchall()
+        for row in rows:
+            yield DocumentRecord(
+                doc_id=row["doc_id"],
+                content=row["content"] if fields == "full" else "",
+                source=row["source"] if fields != "ids" else "",
+                metadata=json.loads(row["metadata"] or "{}") if fields != "ids" else {},
             )
-            inserted.append(record)
-        connection.commit()
-    return inserted
+        if len(rows) < page:
+            return
+        cursor = rows[-1]["doc_id"]
+        if remaining is not None:
+            remaining -= len(rows)
 
 
-def list_documents(db_path: Path) -> List[DocumentRecord]:
-    with _connect(db_path) as connection:
-        rows = connection.execute(
-            "SELECT doc_id, content, source, metadata FROM documents ORDER BY doc_id ASC;"
-        ).fetchall()
-    return [
-        DocumentRecord(
-            doc_id=row["doc_id"],
-            content=row["content"],
-            source=row["source"],
-            metadata=json.loads(row["metadata"] or "{}"),
-        )
-        for row in rows
-    ]
+def list_documents(
+    db_path: Path,
+    after: Optional[str] = None,
+    limit: Optional[int] = None,
+    fields: str = "full",
+) -> List[DocumentRecord]:
+    """``iter_documents`` collected into a list."""
+    return list(iter_documents(db_path, after, limit, fields))
 
 
 def get_document(db_path: Path, doc_id: str) -> Optional[DocumentRecord]:
-    with _connect(db_path) as connection:
+    with get_pool(db_path).reader() as connection:
         row = connection.execute(
-            "SELECT doc_id, content, source, metadata FROM documents WHERE doc_id = ?;",
+            """
+            SELECT documents.doc_id, documents.content, documents.source, documents.metadata
+            FROM document_meta JOIN documents ON documents.rowid = document_meta.rowid
+            WHERE document_meta.doc_id = ?;
+            """,
             (doc_id,),
         ).fetchone()
     if not row:
@@ -150,88 +850,351 @@ def get_document(db_path: Path, doc_id: str) -> Optional[DocumentRecord]:
     )
 
 
-def search_documents(db_path: Path, query: str, limit: int = 5) -> List[SearchResult]:
-    if not query:
-        raise ValueError("query must be provided")
+def _parsed_query(query: str, limit: int) -> ParsedQuery:
+    with span("parse"):
+        parsed = parse_query(query)
     if limit <= 0:
         raise ValueError("limit must be positive")
+    return parsed
+
+
+def _cached_search(
+    db_path: Path,
+    kind: Hashable,
+    match: str,
+    limit: int,
+    fetch: Callable[[sqlite3.Connection], List[SearchResult]],
+) -> List[SearchResult]:
+    pool = get_pool(db_path)
+    cache_key = (pool.db_path, pool.current_generation(), kind, match, limit)
+    cached = query_cache.get(cache_key)
+    if cached is not None:
+        return list(cached)
+
+    with pool.reader() as connection:
+        results = fetch(connection)
+    if query_cache.enabled:
+        size = sum(
+            len(result.doc_id) + len(result.content) + len(result.source) + 128
+            for result in results
+        )
+        query_cache.put(cache_key, tuple(results), size=size)
+    return results
+
+
+_STATISTICS_TABLES = {"documents": "document_meta", "passages": "passage_meta"}
+
+
+def term_statistics(
+    db_path: Path, terms: Sequence[str], table: str = "documents"
+) -> Tuple[int, Tuple[int, ...]]:
+    """Rows of ``table`` and, for each of ``terms``, how many rows match it.
+
+    ``terms`` are FTS5 phrase expressions, as in ``ParsedQuery.phrases``.
+    Sharded searches combine these into corpus-wide bm25 idf values. Results
+    are cached with search results, keyed on the write generation.
+    """
+    meta_table = _STATISTICS_TABLES[table]
+    pool = get_pool(db_path)
+    cache_key = (pool.db_path, pool.current_generation(), ("statistics", table), tuple(terms), 0)
+    cached = query_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    with pool.reader() as connection:
+        rows = connection.execute(f"SELECT COUNT(*) FROM {meta_table};").fetchone()[0]
+        matches = tuple(
+            connection.execute(
+                f"SELECT COUNT(*) FROM {table} WHERE {table} MATCH ?;",
+                (term,),
+            ).fetchone()[0]
+            for term in terms
+        )
+    statistics = (rows, matches)
+    query_cache.put(cache_key, statistics, size=64 + 8 * len(terms))
+    return statistics
+
+
+# FTS5 caps snippet() windows at 64 tokens.
+MAX_SNIPPET_TOKENS = 64
+SEARCH_MODES = ("bm25", "dense", "hybrid")
+# Hybrid mode fuses this many candidates per requested result from each side.
+HYBRID_CANDIDATES = 4
+
+# Threads are only started on first use.
+_HYBRID_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="rag-hybrid")
+
+
+def _excerpt(content: str, tokens: int) -> str:
+    words = content.split(None, tokens)
+    if len(words) <= tokens:
+        return content
+    return " ".join(words[:tokens]) + "..."
 
-    normalized = re.sub(r"[^\w\s'-]", " ", query).strip()
-    tokens = normalized.split()
-    stop_words = {
-        "a",
-        "an",
-        "and",
-        "are",
-        "as",
-        "at",
-        "be",
-        "but",
-        "by",
-        "do",
-        "does",
-        "for",
-        "from",
-        "in",
-        "is",
-        "it",
-        "of",
-        "on",
-        "or",
-        "that",
-        "the",
-        "to",
-        "what",
-        "when",
-        "where",
-        "which",
-        "who",
-        "why",
-    }
-    tokens = [token for token in tokens if token.lower() not in stop_words]
-    normalized = " ".join(tokens)
-    if not normalized:
-        raise ValueError("query must contain searchable terms")
 
-    with _connect(db_path) as connection:
+def _lexical_results(
+    connection: sqlite3.Connection,
+    match: str,
+    limit: int,
+    snippet_tokens: Optional[int],
+    markers: Tuple[str, str],
+) -> List[SearchResult]:
+    if snippet_tokens is None:
+        content_sql = "content"
+        params: tuple = (match, limit)
+    else:
+        content_sql = "snippet(documents, 1, ?, ?, '...', ?)"
+        params = (*markers, snippet_tokens, match, limit)
+    with span("fts5"):
         rows = connection.execute(
-            """
-            SELECT doc_id, content, source, metadata, bm25(documents) AS score
+            f"""
+            SELECT doc_id, {content_sql} AS content, source, metadata, rank AS score
             FROM documents
             WHERE documents MATCH ?
-            ORDER BY score
+            ORDER BY rank
             LIMIT ?;
             """,
-            (normalized, limit),
+            params,
         ).fetchall()
+    with span("decode"):
+        return [
+            SearchResult(
+                doc_id=row["doc_id"],
+                content=row["content"],
+                source=row["source"],
+                score=float(row["score"]),
+                metadata=json.loads(row["metadata"] or "{}"),
+                lexical_score=float(row["score"]),
+            )
+            for row in rows
+        ]
+
+
+def _dense_results(
+    connection: sqlite3.Connection,
+    hits: Sequence[Tuple[str, float]],
+    snippet_tokens: Optional[int],
+) -> List[SearchResult]:
+    with span("dense_fetch"):
+        rows = {
+            row["doc_id"]: row
+            for row in _select_in(
+                connection,
+                """
+                SELECT documents.doc_id, documents.content, documents.source, documents.metadata
+                FROM document_meta JOIN documents ON documents.rowid = document_meta.rowid
+                WHERE document_meta.doc_id IN ({placeholders});
+                """,
+                [doc_id for doc_id, _ in hits],
+            )
+        }
+    results = []
+    for doc_id, score in hits:
+        row = rows.get(doc_id)
+        if row is None:
+            continue
+        content = row["content"]
+        results.append(
+            SearchResult(
+                doc_id=doc_id,
+                content=content if snippet_tokens is None else _excerpt(content, snippet_tokens),
+                source=row["source"],
+                score=score,
+                metadata=json.loads(row["metadata"] or "{}"),
+                dense_score=score,
+            )
+        )
+    return results
+
+
+def _dense_scan(index: VectorIndex, text: str, limit: int) -> List[Tuple[str, float]]:
+    with span("dense_scan"):
+        return index.search(text, limit)
+
 
+def _vector_index_or_error(db_path: Path) -> VectorIndex:
+    index = get_vector_index(db_path)
+    if index is None:
+        raise ValueError("dense retrieval is disabled (RAG_DENSE_DIM=0)")
+    return index
+
+
+def search_documents(
+    db_path: Path,
+    query: str,
+    limit: int = 5,
+    snippet_tokens: Optional[int] = None,
+    markers: Tuple[str, str] = ("", ""),
+    mode: str = "bm25",
+) -> List[SearchResult]:
+    """Rank documents with bm25 (default), the dense index, or both.
+
+    ``content`` is the full text by default. With ``snippet_tokens``, bm25
+    hits carry an FTS5 ``snippet()`` of at most that many tokens around the
+    best match, with matched terms wrapped in ``markers``, and the full text is
+    never read out of SQLite. Dense hits have no match positions, so they carry
+    the first ``snippet_tokens`` words instead.
+
+    Ordering by FTS5's ``rank`` column (bm25 by default) lets FTS5 sort matches
+    itself, so content and snippets are only produced for the returned rows.
+    ``score`` is the bm25 rank (lower is better) in bm25 mode, the cosine
+    similarity (higher is better) in dense mode, and the reciprocal rank
+    fusion score (higher is better) in hybrid mode; ``lexical_score`` and
+    ``dense_score`` keep each side's own score where it matched.
+    """
+    parsed = _parsed_query(query, limit)
+    if snippet_tokens is not None and not 0 < snippet_tokens <= MAX_SNIPPET_TOKENS:
+        raise ValueError(f"snippet_tokens must be between 1 and {MAX_SNIPPET_TOKENS}")
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"mode must be one of {SEARCH_MODES}")
+
+    if mode == "bm25":
+        kind: Hashable = "document"
+        if snippet_tokens is not None:
+            kind = ("snippet", snippet_tokens, markers)
+        return _cached_search(
+            db_path,
+            kind,
+            parsed.match,
+            limit,
+            lambda connection: _lexical_results(
+                connection, parsed.match, limit, snippet_tokens, markers
+            ),
+        )
+
+    index = _vector_index_or_error(db_path)
+    if mode == "dense":
+        return _cached_search(
+            db_path,
+            ("dense", snippet_tokens),
+            parsed.match,
+            limit,
+            lambda connection: _dense_results(
+                connection, _dense_scan(index, parsed.text, limit), snippet_tokens
+            ),
+        )
+
+    def fetch_hybrid(connection: sqlite3.Connection) -> List[SearchResult]:
+        return _hybrid_results(connection, index, parsed, limit, snippet_tokens, markers)
+
+    return _cached_search(
+        db_path, ("hybrid", snippet_tokens, markers), parsed.match, limit, fetch_hybrid
+    )
+
+
+def _hybrid_results(
+    connection: sqlite3.Connection,
+    index: VectorIndex,
+    parsed: ParsedQuery,
+    limit: int,
+    snippet_tokens: Optional[int],
+    markers: Tuple[str, str],
+) -> List[SearchResult]:
+    """Fuse bm25 and dense candidates with reciprocal rank fusion.
+
+    The dense scan runs on a background thread while FTS5 answers on this one;
+    both release the GIL for most of their work (NumPy and SQLite).
+    """
+    depth = limit * HYBRID_CANDIDATES
+    dense_future = _HYBRID_EXECUTOR.submit(_dense_scan, index, parsed.text, depth)
+    lexical = _lexical_results(connection, parsed.match, depth, snippet_tokens, markers)
+    dense_hits = dense_future.result()
+
+    from .fusion import reciprocal_rank_fusion
+
+    fused = reciprocal_rank_fusion(
+        [[result.doc_id for result in lexical], [doc_id for doc_id, _ in dense_hits]]
+    )[:limit]
+    by_id = {result.doc_id: result for result in lexical}
+    dense_scores = dict(dense_hits)
+    dense_only = [
+        (doc_id, dense_scores[doc_id]) for doc_id, _ in fused if doc_id not in by_id
+    ]
+    by_id.update(
+        (result.doc_id, result)
+        for result in _dense_results(connection, dense_only, snippet_tokens)
+    )
     return [
-        SearchResult(
-            doc_id=row["doc_id"],
-            content=row["content"],
-            source=row["source"],
-            score=float(row["score"]),
-            metadata=json.loads(row["metadata"] or "{}"),
-        )
-        for row in rows
+        replace(by_id[doc_id], score=score, dense_score=dense_scores.get(doc_id))
+        for doc_id, score in fused
+        if doc_id in by_id
     ]
 
 
-def ensure_sample_data(db_path: Path, sample_dir: Path) -> List[DocumentRecord]:
+def search_passages(db_path: Path, query: str, limit: int = 5) -> List[SearchResult]:
+    """Return the best-matching passage of each of the top ``limit`` documents.
+
+    Results carry the parent ``doc_id`` and the passage text as ``content``;
+    ``metadata["passage"]`` records the passage index and character offsets.
+    """
+    parsed = _parsed_query(query, limit)
+
+    def fetch(connection: sqlite3.Connection) -> List[SearchResult]:
+        with span("fts5"):
+            rows = connection.execute(
+                """
+                WITH hits AS (
+                    SELECT rowid, bm25(passages) AS score FROM passages WHERE passages MATCH ?
+                ),
+                ranked AS (
+                    SELECT
+                        hits.rowid,
+                        hits.score,
+                        ROW_NUMBER() OVER (
+                            PARTITION BY passage_meta.doc_id ORDER BY hits.score
+                        ) AS doc_rank
+                    FROM hits JOIN passage_meta ON passage_meta.rowid = hits.rowid
+                ),
+                best AS (
+                    SELECT rowid, score FROM ranked WHERE doc_rank = 1 ORDER BY score LIMIT ?
+                )
+                SELECT
+                    passage_meta.doc_id,
+                    passage_meta.passage_index,
+                    passage_meta.start_offset,
+                    passage_meta.end_offset,
+                    passages.content,
+                    document_meta.source,
+                    document_meta.metadata,
+                    best.score
+                FROM best
+                JOIN passage_meta ON passage_meta.rowid = best.rowid
+                JOIN passages ON passages.rowid = best.rowid
+                LEFT JOIN document_meta ON document_meta.doc_id = passage_meta.doc_id
+                ORDER BY best.score;
+                """,
+                (parsed.match, limit),
+            ).fetchall()
+        results = []
+        with span("decode"):
+            for row in rows:
+                metadata = json.loads(row["metadata"] or "{}")
+                metadata["passage"] = {
+                    "index": row["passage_index"],
+                    "start": row["start_offset"],
+                    "end": row["end_offset"],
+                }
+                results.append(
+                    SearchResult(
+                        doc_id=row["doc_id"],
+                        content=row["content"],
+                        source=row["source"] or "",
+                        score=float(row["score"]),
+                        metadata=metadata,
+                    )
+                )
+        return results
+
+    return _cached_search(db_path, "passage", parsed.match, limit, fetch)
+
+
+def ensure_sample_data(
+    db_path: Path, sample_dir: Path, workers: int = 1
+) -> List[DocumentRecord]:
+    # Imported here because rag_system.pipeline builds on this module.
+    from .pipeline import iter_file_records
+
     initialize_database(db_path)
     if not sample_dir.exists():
         return []
-    records = []
-    for path in sorted(sample_dir.glob("*.txt")):
-        content = path.read_text(encoding="utf-8").strip()
-        if not content:
-            continue
-        records.append(
-            DocumentRecord(
-                doc_id=path.stem,
-                content=content,
-                source=str(path),
-                metadata={"filename": path.name},
-            )
-        )
-    return add_documents(db_path, records)
+    paths = sorted(sample_dir.glob("*.txt"))
+    return add_documents(db_path, iter_file_records(paths, strip=True, workers=workers))
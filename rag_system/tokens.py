@@ -0,0 +1,36 @@
+"""Tokenization shared by the dense embeddings and the memory backend.
+
+Kept apart from ``rag_system.vectors`` so that lexical search can tokenize
+without loading NumPy.
+"""
+
+from __future__ import annotations
+
+from functools import lru_cache
+import re
+from typing import List
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_SUFFIXES = ("ing", "ed", "s")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased alphanumeric tokens of ``text``, as embedded and indexed."""
+    return _TOKEN_RE.findall(text.lower())
+
+
+@lru_cache(maxsize=65536)
+def stem(token: str) -> str:
+    """Crude suffix stripping so "buckets" and "bucket" share a term.
+
+    In the spirit of the porter tokenizer the FTS5 tables use. Cached because
+    vocabularies are small next to the number of tokens processed.
+    """
+    for suffix in _SUFFIXES:
+        if token.endswith(suffix) and not token.endswith("s" + suffix):
+            if len(token) - len(suffix) >= 3:
+                token = token[: -len(suffix)]
+            break
+    if len(token) > 3 and token.endswith("e"):
+        token = token[:-1]
+    return token
@@ -0,0 +1,231 @@
+"""Per-stage request timing: spans, histograms and Server-Timing headers.
+
+Code on the request path wraps each stage in ``span(name)``. While tracing is
+enabled, every finished span is added to a process-wide histogram for its
+stage, and to the trace of the request running on the same thread, if
+``request_trace`` started one. ``server_timing`` formats that trace as a
+``Server-Timing`` header, and ``render_prometheus`` exports the histograms in
+the Prometheus text format.
+
+Tracing is off until ``configure_tracing(True)``. While it is off, ``span``
+and ``request_trace`` return one shared object whose enter and exit do
+nothing, so instrumented code pays a function call per stage.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+import threading
+import time
+from typing import Dict, Iterator, List, Mapping, Optional, Tuple
+
+# Upper bounds of the histogram buckets, in seconds.
+BUCKETS: Tuple[float, ...] = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+# Stage recorded by ``request_trace`` for a whole request.
+REQUEST_STAGE = "request"
+
+_enabled = False
+_lock = threading.Lock()
+_local = threading.local()
+
+
+class Histogram:
+    """Counts of observed durations per bucket, plus their count and sum."""
+
+    __slots__ = ("buckets", "count", "total")
+
+    def __init__(self) -> None:
+        # The last bucket holds durations above every bound.
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.buckets[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+
+_histograms: Dict[str, Histogram] = {}
+
+
+def configure_tracing(enabled: bool) -> None:
+    """Turn span recording on or off; turning it on clears the histograms."""
+    global _enabled
+    with _lock:
+        if enabled and not _enabled:
+            _histograms.clear()
+        _enabled = enabled
+
+
+def tracing_enabled() -> bool:
+    return _enabled
+
+
+def record(stage: str, seconds: float) -> None:
+    """Add one duration for ``stage``, as a finished span would."""
+    with _lock:
+        histogram = _histograms.get(stage)
+        if histogram is None:
+            histogram = _histograms[stage] = Histogram()
+        histogram.observe(seconds)
+    trace = getattr(_local, "trace", None)
+    if trace is not None:
+        trace.append((stage, seconds))
+
+
+class _Span:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage: str) -> None:
+        self.stage = stage
+
+    def __enter__(self) -> "_Span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        record(self.stage, time.perf_counter() - self.start)
+
+
+class _RequestTrace:
+    __slots__ = ("start", "outer")
+
+    def __enter__(self) -> "_RequestTrace":
+        self.outer = (getattr(_local, "trace", None), getattr(_local, "start", 0.0))
+        _local.trace = []
+        _local.start = self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        elapsed = time.perf_counter() - self.start
+        _local.trace, _local.start = self.outer
+        record(REQUEST_STAGE, elapsed)
+
+
+class _Disabled:
+    __slots__ = ()
+
+    def __enter__(self) -> "_Disabled":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        return None
+
+
+_DISABLED = _Disabled()
+
+
+def span(stage: str):
+    """Context manager timing one ``stage`` of the current request."""
+    if not _enabled:
+        return _DISABLED
+    return _Span(stage)
+
+
+def request_trace():
+    """Context manager collecting this thread's spans for ``server_timing``.
+
+    The whole block is also recorded as the ``request`` stage.
+    """
+    if not _enabled:
+        return _DISABLED
+    return _RequestTrace()
+
+
+def server_timing() -> Optional[str]:
+    """The current request's stages as a ``Server-Timing`` header value.
+
+    Repeated stages are summed and listed in the order they first finished,
+    followed by ``request``: the time since the request started. Returns
+    ``None`` outside a traced request.
+    """
+    trace: Optional[List[Tuple[str, float]]] = getattr(_local, "trace", None)
+    if trace is None:
+        return None
+    totals: Dict[str, float] = {}
+    for stage, seconds in trace:
+        totals[stage] = totals.get(stage, 0.0) + seconds
+    totals[REQUEST_STAGE] = time.perf_counter() - _local.start
+    return ", ".join(f"{stage};dur={seconds * 1000:.3f}" for stage, seconds in totals.items())
+
+
+def stage_stats() -> Dict[str, Dict[str, float]]:
+    """Count and total seconds per stage, for the JSON ``/metrics``."""
+    with _lock:
+        return {
+            stage: {"count": histogram.count, "seconds": round(histogram.total, 6)}
+            for stage, histogram in sorted(_histograms.items())
+        }
+
+
+def _prometheus_lines(
+    name: str, kind: str, help_text: str, samples: Iterator[Tuple[str, object]]
+) -> List[str]:
+    # Each sample is the text following the metric name (a suffix such as
+    # "_sum" and the labels) and its value.
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    lines.extend(f"{name}{series} {value}" for series, value in samples)
+    return lines
+
+
+def render_prometheus(caches: Optional[Mapping[str, Mapping[str, int]]] = None) -> str:
+    """Stage histograms, and the ``stats()`` of each named cache, as Prometheus text."""
+    caches = caches or {}
+    with _lock:
+        snapshot = [
+            (stage, list(histogram.buckets), histogram.count, histogram.total)
+            for stage, histogram in sorted(_histograms.items())
+        ]
+
+    def stage_samples() -> Iterator[Tuple[str, object]]:
+        for stage, buckets, count, total in snapshot:
+            cumulative = 0
+            for bound, observed in zip(BUCKETS, buckets):
+                cumulative += observed
+                yield f'_bucket{{stage="{stage}",le="{bound:g}"}}', cumulative
+            yield f'_bucket{{stage="{stage}",le="+Inf"}}', count
+            yield f'_sum{{stage="{stage}"}}', repr(total)
+            yield f'_count{{stage="{stage}"}}', count
+
+    lines = _prometheus_lines(
+        "rag_stage_duration_seconds",
+        "histogram",
+        "Time spent in each request stage.",
+        stage_samples(),
+    )
+    for field, kind in (
+        ("hits", "counter"),
+        ("misses", "counter"),
+        ("evictions", "counter"),
+        ("expirations", "counter"),
+        ("entries", "gauge"),
+        ("bytes", "gauge"),
+    ):
+        suffix = "_total" if kind == "counter" else ""
+        lines.extend(
+            _prometheus_lines(
+                f"rag_cache_{field}{suffix}",
+                kind,
+                f"Cache {field}.",
+                ((f'{{cache="{cache}"}}', stats[field]) for cache, stats in caches.items()),
+            )
+        )
+    return "\n".join(lines) + "\n"
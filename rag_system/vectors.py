@@ -0,0 +1,395 @@
+"""Deterministic dense embeddings and a flat vector index kept next to the database.
+
+Embeddings are signed feature-hashed term frequencies: every token is hashed
+with CRC32 into one of ``dim`` buckets with a +1/-1 sign, weighted by
+``1 + log(tf)`` and L2-normalized. That is a random projection of the
+bag-of-words vector, so cosine similarity between embeddings approximates
+cosine similarity between term-frequency vectors. No model or network access
+is needed and the same text embeds identically in every process.
+
+The index is a fixed-stride, little-endian float32 matrix in ``<db>.vectors``.
+Row doc_ids are JSON lines in ``<db>.vectors.ids``, and ``<db>.vectors.offsets``
+holds one int64 per row: the byte offset of that row's line, or -1 once the
+row is removed. With NumPy, the matrix and offset table are opened with
+``np.memmap``, so opening an index costs the same at any size, processes
+sharing a database share the pages through the OS page cache, and a search
+only reads the doc_ids of the rows it returns. The doc_id -> row map that
+writes need is parsed from the ids file on the first write. Without NumPy, the
+files are copied into arrays and scanned in pure Python, which gives the same
+results more slowly.
+"""
+
+from __future__ import annotations
+
+from array import array
+from collections import Counter
+from functools import lru_cache
+import heapq
+from itertools import islice
+import json
+import math
+import mmap
+import os
+from pathlib import Path
+import struct
+import sys
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import zlib
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+from .tokens import stem, tokenize
+
+
+DEFAULT_DIM = 256
+
+_HEADER = "rag-vectors 1 dim={dim}\n"
+_REMOVED_OFFSET = -1
+# Documents embedded per file write; bounds memory during a rebuild.
+_UPSERT_BATCH = 1000
+
+
+@lru_cache(maxsize=65536)
+def _feature(token: str) -> int:
+    return zlib.crc32(stem(token).encode("utf-8"))
+
+
+def embed_text(text: str, dim: int = DEFAULT_DIM) -> array:
+    """Return the L2-normalized ``dim``-dimensional embedding of ``text``."""
+    if dim <= 0:
+        raise ValueError("dim must be positive")
+    features: Dict[int, int] = {}
+    for token, count in Counter(tokenize(text)).items():
+        feature = _feature(token)
+        features[feature] = features.get(feature, 0) + count
+    buckets: Dict[int, float] = {}
+    for feature, count in features.items():
+        weight = 1.0 + math.log(count)
+        bucket = feature % dim
+        buckets[bucket] = buckets.get(bucket, 0.0) + (
+            weight if feature & 0x80000000 else -weight
+        )
+    vector = array("f", bytes(4 * dim))
+    norm = math.sqrt(sum(value * value for value in buckets.values()))
+    if norm:
+        for bucket, value in buckets.items():
+            vector[bucket] = value / norm
+    return vector
+
+
+def _file_signature(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    temp_path = path.with_name(path.name + ".tmp")
+    temp_path.write_bytes(data)
+    os.replace(temp_path, path)
+
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _map_file(path: Path, count: int, typecode: str):
+    """The first ``count`` little-endian ``typecode`` items stored in ``path``.
+
+    A read-only ``np.memmap`` with NumPy; an ``array`` copy without it.
+    """
+    if np is not None:
+        dtype = "<f4" if typecode == "f" else "<i8"
+        if not count:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode="r", shape=(count,))
+    values = array(typecode)
+    if not count:
+        return values
+    with path.open("rb") as handle:
+        values.fromfile(handle, count)
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
+
+
+def _read_id(ids_map, offsets, row: int) -> Optional[str]:
+    start = int(offsets[row])
+    if start < 0:
+        return None
+    return json.loads(ids_map[start : ids_map.find(b"\n", start)])
+
+
+class VectorIndex:
+    """Flat (exhaustive) cosine-similarity index over document embeddings.
+
+    Rows are updated in place when a doc_id is rewritten and appended for new
+    doc_ids; removed rows are zeroed and their offsets set to -1. The files
+    are remapped when another process changes them.
+    """
+
+    def __init__(self, db_path: Path, dim: int = DEFAULT_DIM) -> None:
+        if dim <= 0:
+            raise ValueError("dim must be positive")
+        db_path = Path(db_path)
+        self.dim = dim
+        self.vectors_path = db_path.with_name(db_path.name + ".vectors")
+        self.ids_path = db_path.with_name(db_path.name + ".vectors.ids")
+        self.offsets_path = db_path.with_name(db_path.name + ".vectors.offsets")
+        self._lock = threading.RLock()
+        self._unmap()
+        self._signature: Optional[tuple] = None
+        self._loaded = False
+
+    def _unmap(self) -> None:
+        self._count = 0
+        self._matrix = _map_file(self.vectors_path, 0, "f")
+        self._offsets = _map_file(self.offsets_path, 0, "q")
+        self._ids_map = b""
+        # Built on first use by ``_row_map`` and ``_live_count``.
+        self._rows: Optional[Dict[str, int]] = None
+        self._live: Optional[int] = None
+
+    def _signatures(self) -> tuple:
+        return tuple(
+            _file_signature(path)
+            for path in (self.vectors_path, self.ids_path, self.offsets_path)
+        )
+
+    def exists(self) -> bool:
+        return self.ids_path.exists() and self.vectors_path.exists()
+
+    def _ensure_loaded(self) -> None:
+        if not self._loaded or self._signatures() != self._signature:
+            self._load()
+
+    def _load(self) -> None:
+        self._unmap()
+        if self.exists():
+            with self.ids_path.open("rb") as handle:
+                header = handle.readline().decode("utf-8", "replace")
+                if header != _HEADER.format(dim=self.dim):
+                    raise ValueError(
+                        f"{self.ids_path} was built with a different dimension: {header.strip()!r}"
+                    )
+                if not self.offsets_path.exists():
+                    self._index_ids(handle)
+                self._ids_map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            # Rows are written before their ids and ids before their offsets,
+            # so a crash can leave extra rows or lines (ignored) but never an
+            # offset without a row.
+            self._count = min(
+                self.vectors_path.stat().st_size // (4 * self.dim),
+                self.offsets_path.stat().st_size // 8,
+            )
+            matrix = _map_file(self.vectors_path, self._count * self.dim, "f")
+            self._matrix = matrix.reshape(-1, self.dim) if np is not None else matrix
+            self._offsets = _map_file(self.offsets_path, self._count, "q")
+        self._signature = self._signatures()
+        self._loaded = True
+
+    def _index_ids(self, handle) -> None:
+        # Indexes written before the offset table existed marked removed rows
+        # with a ``null`` line; build the table from the ids file once.
+        offsets = array("q")
+        position = handle.tell()
+        for line in handle:
+            if not line.endswith(b"\n"):
+                break
+            offsets.append(_REMOVED_OFFSET if line.strip() == b"null" else position)
+            position += len(line)
+        _write_atomic(self.offsets_path, _little_endian(offsets))
+
+    def _refresh(self) -> None:
+        # Remap after this process's own writes, keeping the doc_id map.
+        rows = self._rows
+        self._load()
+        self._rows = rows
+        self._live = len(rows)
+
+    def _row_map(self) -> Dict[str, int]:
+        """doc_id -> row, parsed from the ids file the first time it is needed."""
+        if self._rows is None:
+            ids_map = self._ids_map
+            if np is None or not self._count:
+                self._rows = {}
+                for row, start in enumerate(self._offsets.tolist()):
+                    if start >= 0:
+                        self._rows[_read_id(ids_map, self._offsets, row)] = row
+                return self._rows
+            # Parse every complete line with one ``json.loads`` and find each
+            # row's line by binary search over the line start positions.
+            data = ids_map[: ids_map.rfind(b"\n") + 1]
+            newlines = np.flatnonzero(np.frombuffer(data, dtype=np.uint8) == ord("\n"))
+            doc_ids = json.loads(b"[" + b",".join(data[newlines[0] + 1 : -1].split(b"\n")) + b"]")
+            offsets = np.asarray(self._offsets)
+            live = np.flatnonzero(offsets >= 0)
+            lines = np.searchsorted(newlines[:-1] + 1, offsets[live])
+            self._rows = dict(zip(map(doc_ids.__getitem__, lines.tolist()), live.tolist()))
+        return self._rows
+
+    def _live_count(self) -> int:
+        if self._live is None:
+            if self._rows is not None:
+                self._live = len(self._rows)
+            elif np is not None:
+                self._live = int(np.count_nonzero(self._offsets >= 0))
+            else:
+                self._live = sum(1 for start in self._offsets if start >= 0)
+        return self._live
+
+    def upsert(self, documents: Iterable[Tuple[str, str]]) -> None:
+        """Embed and store ``(doc_id, content)`` pairs."""
+        documents = iter(documents)
+        while True:
+            embedded = [
+                (doc_id, embed_text(content, self.dim))
+                for doc_id, content in islice(documents, _UPSERT_BATCH)
+            ]
+            if not embedded:
+                return
+            self._store(embedded)
+
+    def _store(self, embedded: Sequence[Tuple[str, array]]) -> None:
+        with self._lock:
+            self._ensure_loaded()
+            if not self.exists():
+                self.vectors_path.touch()
+                self.offsets_path.touch()
+                self.ids_path.write_text(_HEADER.format(dim=self.dim), encoding="utf-8")
+                self._load()
+            rows = self._row_map()
+            appended: List[str] = []
+            row_size = 4 * self.dim
+            with self.vectors_path.open("r+b") as handle:
+                position = -1
+                for doc_id, vector in embedded:
+                    row = rows.get(doc_id)
+                    if row is None:
+                        row = self._count + len(appended)
+                        rows[doc_id] = row
+                        appended.append(doc_id)
+                    # Appends are contiguous; only seek for in-place updates.
+                    if position != row * row_size:
+                        handle.seek(row * row_size)
+                    handle.write(_little_endian(vector))
+                    position = (row + 1) * row_size
+            if appended:
+                self._append_ids(appended)
+            self._refresh()
+
+    def _append_ids(self, doc_ids: Sequence[str]) -> None:
+        offsets = array("q")
+        lines = []
+        with self.ids_path.open("ab") as handle:
+            position = handle.seek(0, os.SEEK_END)
+            for doc_id in doc_ids:
+                line = (json.dumps(doc_id) + "\n").encode("utf-8")
+                offsets.append(position)
+                lines.append(line)
+                position += len(line)
+            handle.write(b"".join(lines))
+        with self.offsets_path.open("r+b") as handle:
+            handle.seek(8 * self._count)
+            handle.write(_little_endian(offsets))
+            handle.truncate()
+
+    def remove(self, doc_ids: Iterable[str]) -> None:
+        with self._lock:
+            self._ensure_loaded()
+            row_map = self._row_map()
+            rows = sorted(row_map.pop(doc_id) for doc_id in set(doc_ids) if doc_id in row_map)
+            if not rows:
+                return
+            zeros = bytes(4 * self.dim)
+            with self.vectors_path.open("r+b") as handle:
+                for row in rows:
+                    handle.seek(row * len(zeros))
+                    handle.write(zeros)
+            removed = struct.pack("<q", _REMOVED_OFFSET)
+            with self.offsets_path.open("r+b") as handle:
+                for row in rows:
+                    handle.seek(8 * row)
+                    handle.write(removed)
+            self._refresh()
+
+    def rebuild(self, documents: Iterable[Tuple[str, str]]) -> None:
+        """Replace the whole index with embeddings of ``documents``."""
+        with self._lock:
+            self._unmap()
+            for path in (self.vectors_path, self.ids_path, self.offsets_path):
+                if path.exists():
+                    path.unlink()
+            self._signature = self._signatures()
+            self._loaded = True
+            self.upsert(documents)
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._ensure_loaded()
+            return self._live_count()
+
+    def _candidates(self, query: array):
+        """Rows worth scoring for ``query``, or ``None`` to scan every row.
+
+        Called with the lock held; approximate indexes narrow the scan here.
+        """
+        return None
+
+    def search(self, text: str, limit: int) -> List[Tuple[str, float]]:
+        """Return up to ``limit`` ``(doc_id, cosine similarity)`` pairs, best first.
+
+        Rows with no positive similarity (including removed rows) are dropped.
+        """
+        if limit <= 0:
+            raise ValueError("limit must be positive")
+        query = embed_text(text, self.dim)
+        with self._lock:
+            self._ensure_loaded()
+            count = self._count
+            matrix = self._matrix
+            offsets = self._offsets
+            ids_map = self._ids_map
+            candidates = self._candidates(query) if count else None
+        if not count:
+            return []
+
+        if np is not None:
+            vector = np.frombuffer(query, dtype=np.float32)
+            if candidates is None:
+                rows = None
+                scores = matrix @ vector
+            else:
+                rows = candidates
+                scores = matrix[rows] @ vector
+            k = min(limit, len(scores))
+            if not k:
+                return []
+            top = np.argpartition(-scores, k - 1)[:k]
+            ranked = [
+                (float(scores[pos]), int(pos if rows is None else rows[pos])) for pos in top
+            ]
+            ranked.sort(key=lambda pair: (-pair[0], pair[1]))
+        else:
+            nonzero = [(idx, value) for idx, value in enumerate(query) if value]
+            dim = self.dim
+            scored = (
+                (sum(matrix[base + idx] * value for idx, value in nonzero), row)
+                for row, base in enumerate(range(0, count * dim, dim))
+            )
+            ranked = heapq.nsmallest(limit, scored, key=lambda pair: (-pair[0], pair[1]))
+        results = []
+        for score, row in ranked:
+            doc_id = _read_id(ids_map, offsets, row) if score > 0 else None
+            if doc_id is not None:
+                results.append((doc_id, score))
+        return results
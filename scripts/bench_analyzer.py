@@ -0,0 +1,109 @@
+"""Measure analyzer throughput and peak memory on multi-megabyte documents.
+
+A Zipf-distributed vocabulary (about 10% capitalized words) is used to build
+``--docs`` synthetic documents of ``--mb`` megabytes each. The report gives
+``analyze_text`` time and tracemalloc peak for one document, then
+``analyze_many`` time for the whole batch in-process and with ``--workers``
+processes. With ``--baseline REV`` the analyzer at that git revision is timed
+on the same document for comparison.
+
+Usage: python scripts/bench_analyzer.py [--mb 4] [--docs 8] [--workers 4]
+"""
+
+import argparse
+import importlib.util
+import json
+from pathlib import Path
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from rag_system.analyzer import analyze_many, analyze_text  # noqa: E402
+
+
+def _document(rng: random.Random, megabytes: float) -> str:
+    vocabulary = [
+        "".join(rng.choice("abcdefghijklmnop") for _ in range(rng.randint(3, 9)))
+        for _ in range(20000)
+    ]
+    vocabulary = [word.capitalize() if rng.random() < 0.1 else word for word in vocabulary]
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    words = []
+    size = 0
+    while size < megabytes * 1_000_000:
+        chunk = rng.choices(vocabulary, weights, k=10000)
+        words.extend(chunk)
+        size += sum(map(len, chunk)) + len(chunk)
+    return " ".join(words) + "."
+
+
+def _baseline(revision: str):
+    source = subprocess.run(
+        ["git", "show", f"{revision}:rag_system/analyzer.py"],
+        cwd=ROOT,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = Path(temp_dir) / "baseline_analyzer.py"
+        path.write_text(source, encoding="utf-8")
+        spec = importlib.util.spec_from_file_location("baseline_analyzer", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    return module.analyze_text
+
+
+def _measure(analyze, text: str, repeat: int):
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        analyze(text)
+        seconds.append(time.perf_counter() - start)
+    tracemalloc.start()
+    analyze(text)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "seconds": round(min(seconds), 3),
+        "mb_per_second": round(len(text) / 1_000_000 / min(seconds), 2),
+        "peak_mb": round(peak / 1_000_000, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--mb", type=float, default=4)
+    parser.add_argument("--docs", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", help="git revision of the analyzer to compare with")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    texts = [_document(rng, args.mb) for _ in range(args.docs)]
+    report = {
+        "document_mb": round(len(texts[0]) / 1_000_000, 2),
+        "docs": args.docs,
+        "analyze_text": _measure(analyze_text, texts[0], args.repeat),
+    }
+    if args.baseline:
+        report["baseline"] = _measure(_baseline(args.baseline), texts[0], args.repeat)
+    for workers in sorted({1, args.workers}):
+        start = time.perf_counter()
+        analyze_many(texts, workers=workers)
+        report[f"analyze_many_workers_{workers}_seconds"] = round(
+            time.perf_counter() - start, 3
+        )
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
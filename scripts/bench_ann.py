@@ -0,0 +1,110 @@
+"""Measure IVF recall and latency against the exact dense scan.
+
+Documents are embedded straight into a vector index (no SQLite), the IVF
+quantizer is trained once, and every query is answered both exactly and with
+IVF at each ``nprobe``. Recall@k is the fraction of the exact top-k that IVF
+also returns.
+
+Usage: python scripts/bench_ann.py [--docs 100000] [--nprobe 1,4,8,16,32,64]
+"""
+
+import argparse
+import json
+from pathlib import Path
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from rag_system.ann import IVFIndex  # noqa: E402
+from rag_system.vectors import VectorIndex, np  # noqa: E402
+
+# Documents mix a shared background vocabulary with the vocabulary of one
+# topic, so the corpus has the cluster structure real collections have.
+_BACKGROUND = [f"common{idx}" for idx in range(500)]
+_BACKGROUND_WEIGHTS = [1 / (rank + 1) for rank in range(len(_BACKGROUND))]
+_TOPIC_WORDS = 200
+_TOPIC_WEIGHTS = [1 / (rank + 1) for rank in range(_TOPIC_WORDS)]
+
+
+def _topics(count: int, rng: random.Random) -> list:
+    vocabulary = [f"term{idx}" for idx in range(20_000)]
+    return [rng.sample(vocabulary, _TOPIC_WORDS) for _ in range(count)]
+
+
+def _document(topic: list, words: int, rng: random.Random) -> str:
+    topical = int(words * 0.6)
+    return " ".join(
+        rng.choices(topic, _TOPIC_WEIGHTS, k=topical)
+        + rng.choices(_BACKGROUND, _BACKGROUND_WEIGHTS, k=words - topical)
+    )
+
+
+def _timed(index, queries, k):
+    results = []
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        results.append([doc_id for doc_id, _ in index.search(query, k)])
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    latency = {
+        "p50_ms": round(statistics.median(samples), 3),
+        "p99_ms": round(samples[int(len(samples) * 0.99) - 1], 3),
+    }
+    return results, latency
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--docs", type=int, default=100_000)
+    parser.add_argument("--words", type=int, default=80)
+    parser.add_argument("--topics", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--lists", type=int, default=0, help="0 sizes lists as sqrt(docs)")
+    parser.add_argument("--nprobe", default="1,4,8,16,32,64")
+    args = parser.parse_args()
+    if np is None:
+        sys.exit("bench_ann.py needs NumPy")
+
+    rng = random.Random(17)
+    topics = _topics(args.topics, rng)
+    queries = [" ".join(rng.sample(rng.choice(topics)[:50], 3)) for _ in range(args.queries)]
+    report = {"docs": args.docs, "k": args.k}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = Path(temp_dir) / "rag.db"
+        start = time.perf_counter()
+        VectorIndex(db_path).upsert(
+            (f"doc-{idx}", _document(rng.choice(topics), args.words, rng))
+            for idx in range(args.docs)
+        )
+        report["embed_seconds"] = round(time.perf_counter() - start, 2)
+
+        exact, report["exact"] = _timed(VectorIndex(db_path), queries, args.k)
+
+        start = time.perf_counter()
+        IVFIndex(db_path, lists=args.lists).train()
+        report["train_seconds"] = round(time.perf_counter() - start, 2)
+
+        report["ivf"] = []
+        for nprobe in (int(value) for value in args.nprobe.split(",")):
+            index = IVFIndex(db_path, lists=args.lists, nprobe=nprobe)
+            approximate, latency = _timed(index, queries, args.k)
+            recall = statistics.fmean(
+                len(set(found) & set(expected)) / len(expected)
+                for found, expected in zip(approximate, exact)
+                if expected
+            )
+            report["ivf"].append({"nprobe": nprobe, "recall": round(recall, 3), **latency})
+        report["lists"] = len(index._centroids)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Compare search latency of FTS5 bm25, the dense vector index, and hybrid fusion.
+
+Each corpus size gets its own database built with ``bulk_ingest`` (which also
+writes the dense index). Queries are two terms drawn from a skewed synthetic
+vocabulary; the query cache is disabled so every search hits the index.
+
+Usage: python scripts/bench_dense.py [--sizes 10000,100000,1000000] [--queries 200]
+"""
+
+import argparse
+import json
+from pathlib import Path
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from rag_system import vectors  # noqa: E402
+from rag_system.pipeline import bulk_ingest  # noqa: E402
+from rag_system.storage import (  # noqa: E402
+    DocumentRecord,
+    close_pools,
+    configure_query_cache,
+    get_vector_index,
+    search_documents,
+)
+
+_VOCAB = [f"term{idx}" for idx in range(5000)]
+_WEIGHTS = [1 / (rank + 1) for rank in range(len(_VOCAB))]
+
+
+def _records(count: int, words: int, rng: random.Random):
+    for idx in range(count):
+        yield DocumentRecord(
+            doc_id=f"doc-{idx:07d}",
+            content=" ".join(rng.choices(_VOCAB, _WEIGHTS, k=words)),
+            source="bench",
+            metadata={},
+        )
+
+
+def _latency(db_path: Path, queries: list, mode: str) -> dict:
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        search_documents(db_path, query, limit=10, mode=mode)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "p50_ms": round(statistics.median(samples), 3),
+        "p99_ms": round(samples[int(len(samples) * 0.99) - 1], 3),
+        "mean_ms": round(statistics.fmean(samples), 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="10000,100000")
+    parser.add_argument("--words", type=int, default=80, help="Words per document")
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(13)
+    configure_query_cache(0)
+    queries = [
+        " ".join(rng.choices(_VOCAB[20:2000], k=2)) for _ in range(args.queries)
+    ]
+    report = {"numpy": vectors.np is not None, "sizes": []}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for size in (int(value) for value in args.sizes.split(",")):
+            db_path = Path(temp_dir) / f"rag-{size}.db"
+            stats = bulk_ingest(db_path, _records(size, args.words, rng))
+            get_vector_index(db_path)
+            report["sizes"].append(
+                {
+                    "docs": size,
+                    "ingest_seconds": round(stats.seconds, 2),
+                    "bm25": _latency(db_path, queries, "bm25"),
+                    "dense": _latency(db_path, queries, "dense"),
+                    "hybrid": _latency(db_path, queries, "hybrid"),
+                }
+            )
+        close_pools()
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
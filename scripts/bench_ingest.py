@@ -0,0 +1,110 @@
+"""Measure bulk ingest throughput against per-record inserts.
+
+The legacy path replays the original ``add_documents`` loop (two DELETEs and
+two INSERTs per record, all in one transaction). The bulk path streams the same
+synthetic corpus through ``rag_system.pipeline.bulk_ingest``.
+
+Usage: python scripts/bench_ingest.py [--docs 100000] [--legacy-docs 5000]
+"""
+
+import argparse
+import json
+from pathlib import Path
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from rag_system.pipeline import DEFAULT_BATCH_SIZE, bulk_ingest  # noqa: E402
+from rag_system.storage import DocumentRecord, close_pools, initialize_database  # noqa: E402
+
+_VOCAB = [
+    f"{stem}{suffix}"
+    for stem in ("lambda", "bucket", "index", "queue", "stream", "policy", "metric", "region")
+    for suffix in ("", "s", "ing", "ed", "er", "al", "ity", "ize")
+]
+
+
+def synthetic_records(count: int, words: int, seed: int = 7):
+    rng = random.Random(seed)
+    for idx in range(count):
+        yield DocumentRecord(
+            doc_id=f"doc-{idx:07d}",
+            content=" ".join(rng.choices(_VOCAB, k=words)),
+            source="bench",
+            metadata={"idx": idx},
+        )
+
+
+def legacy_ingest(db_path: Path, records) -> int:
+    connection = sqlite3.connect(db_path)
+    count = 0
+    with connection:
+        for record in records:
+            connection.execute("DELETE FROM documents WHERE doc_id = ?;", (record.doc_id,))
+            connection.execute("DELETE FROM document_meta WHERE doc_id = ?;", (record.doc_id,))
+            connection.execute(
+                "INSERT INTO documents (doc_id, content, source, metadata) VALUES (?, ?, ?, ?);",
+                (record.doc_id, record.content, record.source, json.dumps(record.metadata)),
+            )
+            connection.execute(
+                "INSERT INTO document_meta (doc_id, created_at) VALUES (?, datetime('now'));",
+                (record.doc_id,),
+            )
+            count += 1
+    connection.close()
+    return count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--docs", type=int, default=100_000)
+    parser.add_argument(
+        "--legacy-docs",
+        type=int,
+        default=5_000,
+        help="Corpus size for the per-record baseline (its cost grows with index size)",
+    )
+    parser.add_argument("--words", type=int, default=80, help="Words per document")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--optimize", action="store_true")
+    args = parser.parse_args()
+
+    report = {"docs": args.docs, "words_per_doc": args.words, "batch_size": args.batch_size}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        if args.legacy_docs:
+            legacy_path = Path(temp_dir) / "legacy.db"
+            initialize_database(legacy_path)
+            start = time.perf_counter()
+            count = legacy_ingest(legacy_path, synthetic_records(args.legacy_docs, args.words))
+            elapsed = time.perf_counter() - start
+            report["legacy"] = {
+                "docs": count,
+                "seconds": round(elapsed, 2),
+                "docs_per_minute": round(count * 60 / elapsed),
+            }
+
+        bulk_path = Path(temp_dir) / "bulk.db"
+        stats = bulk_ingest(
+            bulk_path,
+            synthetic_records(args.docs, args.words),
+            batch_size=args.batch_size,
+            optimize=args.optimize,
+        )
+        report["bulk"] = {
+            "docs": stats.inserted,
+            "batches": stats.batches,
+            "seconds": round(stats.seconds, 2),
+            "docs_per_minute": round(stats.docs_per_minute),
+        }
+        close_pools()
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Compare response size and JSON encoding time before and after ``serialization.dumps``.
+
+"before" encodes as the API used to: ``/search`` results copied into dicts,
+``/generate`` results copied with ``asdict`` including their full content,
+then ``json.dumps`` with its default separators. "stdlib" and "orjson" encode
+the current payloads with ``dumps``; "orjson" is skipped when it is not
+installed.
+
+Usage: python scripts/bench_serialization.py [--docs 500] [--doc-words 2000]
+"""
+
+import argparse
+from dataclasses import asdict
+import json
+from pathlib import Path
+import random
+import sys
+import tempfile
+import time
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from rag_system import serialization  # noqa: E402
+from rag_system.generator import configure_generation_cache, generate_response  # noqa: E402
+from rag_system.pipeline import bulk_ingest  # noqa: E402
+from rag_system.storage import (  # noqa: E402
+    DocumentRecord,
+    close_pools,
+    configure_query_cache,
+    search_documents,
+    search_passages,
+)
+
+_VOCAB = [f"term{idx}" for idx in range(5000)]
+_WEIGHTS = [1 / (rank + 1) for rank in range(len(_VOCAB))]
+
+
+def _before_search(results: list) -> bytes:
+    return json.dumps({"results": [result.__dict__ for result in results]}).encode("utf-8")
+
+
+def _before_generate(payload: dict, passages: list) -> bytes:
+    old = dict(payload, results=[asdict(result) for result in passages])
+    return json.dumps(old).encode("utf-8")
+
+
+def _stdlib(payload: object) -> bytes:
+    orjson, serialization.orjson = serialization.orjson, None
+    try:
+        return serialization.dumps(payload)
+    finally:
+        serialization.orjson = orjson
+
+
+def _measure(encode, payloads: list, repeat: int) -> dict:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for payload in payloads:
+            encode(*payload)
+        best = min(best, time.perf_counter() - start)
+    size = sum(len(encode(*payload)) for payload in payloads)
+    return {
+        "avg_response_bytes": size // len(payloads),
+        "avg_encode_us": round(best * 1e6 / len(payloads), 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--docs", type=int, default=500)
+    parser.add_argument("--doc-words", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5, help="Encoding runs; the best counts")
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    configure_query_cache(0)
+    configure_generation_cache(0)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = Path(temp_dir) / "rag.db"
+        bulk_ingest(
+            db_path,
+            (
+                DocumentRecord(
+                    doc_id=f"doc-{idx}",
+                    content=" ".join(rng.choices(_VOCAB, _WEIGHTS, k=args.doc_words)),
+                    source="bench",
+                    metadata={"index": idx},
+                )
+                for idx in range(args.docs)
+            ),
+            batch_size=50,
+        )
+        queries = [rng.choice(_VOCAB[50:1000]) for _ in range(args.queries)]
+        searches = [
+            search_documents(db_path, query, limit=5, snippet_tokens=24) for query in queries
+        ]
+        generations = []
+        for query in queries:
+            passages = search_passages(db_path, query, limit=5)
+            generations.append((generate_response(query, passages), passages))
+        close_pools()
+
+    encoders = {"before": None, "stdlib": _stdlib}
+    if serialization.orjson is not None:
+        encoders["orjson"] = serialization.dumps
+    report = {"docs": args.docs, "doc_words": args.doc_words}
+    for endpoint, payloads, before in (
+        ("search", [(results,) for results in searches], _before_search),
+        ("generate", generations, _before_generate),
+    ):
+        rows = {}
+        for name, encode in encoders.items():
+            if encode is None:
+                rows[name] = _measure(before, payloads, args.repeat)
+            elif endpoint == "search":
+                rows[name] = _measure(
+                    lambda results: encode({"results": results}), payloads, args.repeat
+                )
+            else:
+                rows[name] = _measure(
+                    lambda payload, _: encode(payload), payloads, args.repeat
+                )
+        report[endpoint] = rows
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Measure how ingest and search scale with the number of shard databases.
+
+For each shard count a synthetic corpus is loaded with
+``bulk_ingest_sharded`` (one writer thread per shard), then the same bm25
+queries are answered through ``ShardedBackend`` with the query cache off.
+One shard is the plain single-database layout. The dense index is disabled
+unless ``--dense-dim`` is given, so ingest time is SQLite's own.
+
+Usage: python scripts/bench_shards.py [--docs 100000] [--shards 1,2,4,8]
+"""
+
+import argparse
+import json
+from pathlib import Path
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from rag_system.backends import ShardedBackend, SQLiteBackend  # noqa: E402
+from rag_system.pipeline import bulk_ingest_sharded  # noqa: E402
+from rag_system.storage import (  # noqa: E402
+    DocumentRecord,
+    configure_dense,
+    configure_query_cache,
+    shard_paths,
+)
+
+_VOCABULARY = [f"term{idx}" for idx in range(5000)]
+_WEIGHTS = [1 / (rank + 1) for rank in range(len(_VOCABULARY))]
+
+
+def _records(count: int, words: int, rng: random.Random):
+    for idx in range(count):
+        yield DocumentRecord(
+            f"doc-{idx}", " ".join(rng.choices(_VOCABULARY, _WEIGHTS, k=words)), "bench", {}
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--docs", type=int, default=100_000)
+    parser.add_argument("--words", type=int, default=80)
+    parser.add_argument("--shards", default="1,2,4,8")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--dense-dim", type=int, default=0)
+    args = parser.parse_args()
+
+    configure_dense(args.dense_dim)
+    configure_query_cache(0)
+    rng = random.Random(11)
+    queries = [" ".join(rng.sample(_VOCABULARY[20:400], 2)) for _ in range(args.queries)]
+    report = {"docs": args.docs, "words": args.words, "limit": args.limit, "runs": []}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for shards in (int(value) for value in args.shards.split(",")):
+            db_paths = shard_paths(Path(temp_dir) / f"rag-{shards}.db", shards)
+            stats = bulk_ingest_sharded(
+                db_paths, _records(args.docs, args.words, random.Random(3))
+            )
+            engines = [SQLiteBackend(db_path) for db_path in db_paths]
+            backend = engines[0] if shards == 1 else ShardedBackend(engines)
+
+            samples = []
+            for query in queries:
+                start = time.perf_counter()
+                backend.search(query, args.limit)
+                samples.append((time.perf_counter() - start) * 1000)
+            samples.sort()
+            report["runs"].append(
+                {
+                    "shards": shards,
+                    "ingest_seconds": round(stats.seconds, 2),
+                    "docs_per_minute": round(stats.docs_per_minute),
+                    "search_p50_ms": round(statistics.median(samples), 3),
+                    "search_p99_ms": round(samples[int(len(samples) * 0.99) - 1], 3),
+                }
+            )
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Compare /search payload size and JSON encoding time: full content vs snippets.
+
+Usage: python scripts/bench_snippets.py [--docs 500] [--doc-words 20000]
+"""
+
+import argparse
+import json
+from pathlib import Path
+import random
+import sys
+import tempfile
+import time
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from rag_system.pipeline import bulk_ingest  # noqa: E402
+from rag_system.serialization import dumps  # noqa: E402
+from rag_system.storage import (  # noqa: E402
+    DocumentRecord,
+    close_pools,
+    configure_query_cache,
+    search_documents,
+)
+
+# A few thousand synthetic terms drawn with a skewed distribution, so queries
+# match a realistic fraction of documents and of positions within them.
+_VOCAB = [f"term{idx}" for idx in range(5000)]
+_WEIGHTS = [1 / (rank + 1) for rank in range(len(_VOCAB))]
+
+
+def _measure(db_path: Path, queries: list, **kwargs) -> dict:
+    payload_bytes = 0
+    search_seconds = 0.0
+    encode_seconds = 0.0
+    for query in queries:
+        start = time.perf_counter()
+        results = search_documents(db_path, query, limit=5, **kwargs)
+        search_seconds += time.perf_counter() - start
+        start = time.perf_counter()
+        body = dumps({"results": results})
+        encode_seconds += time.perf_counter() - start
+        payload_bytes += len(body)
+    count = len(queries)
+    return {
+        "avg_response_bytes": payload_bytes // count,
+        "avg_search_ms": round(search_seconds * 1000 / count, 3),
+        "avg_encode_ms": round(encode_seconds * 1000 / count, 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--docs", type=int, default=500)
+    parser.add_argument("--doc-words", type=int, default=20_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--snippet-tokens", type=int, default=24)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    configure_query_cache(0)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = Path(temp_dir) / "rag.db"
+        bulk_ingest(
+            db_path,
+            (
+                DocumentRecord(
+                    doc_id=f"doc-{idx}",
+                    content=" ".join(rng.choices(_VOCAB, _WEIGHTS, k=args.doc_words)),
+                    source="bench",
+                    metadata={},
+                )
+                for idx in range(args.docs)
+            ),
+            batch_size=50,
+        )
+        queries = [rng.choice(_VOCAB[50:1000]) for _ in range(args.queries)]
+        full = _measure(db_path, queries)
+        snippet = _measure(db_path, queries, snippet_tokens=args.snippet_tokens)
+        close_pools()
+
+    print(
+        json.dumps(
+            {
+                "docs": args.docs,
+                "doc_words": args.doc_words,
+                "full": full,
+                "snippet": snippet,
+                "bytes_ratio": round(full["avg_response_bytes"] / snippet["avg_response_bytes"], 1),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Compare per-query search latency with and without pooled connections.
+
+Usage: python scripts/bench_storage.py [--docs N] [--queries N]
+"""
+
+import argparse
+import json
+from pathlib import Path
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from rag_system.storage import (  # noqa: E402
+    DocumentRecord,
+    add_documents,
+    close_pools,
+    configure_query_cache,
+    initialize_database,
+    search_documents,
+)
+
+_WORDS = [
+    "lambda",
+    "bucket",
+    "object",
+    "index",
+    "search",
+    "metric",
+    "policy",
+    "queue",
+    "stream",
+    "function",
+    "deploy",
+    "region",
+]
+
+_QUERY = (
+    "SELECT doc_id, content, source, metadata, bm25(documents) AS score "
+    "FROM documents WHERE documents MATCH ? ORDER BY score LIMIT ?;"
+)
+
+
+def _unpooled_search(db_path: Path, query: str, limit: int) -> list:
+    # Mirrors the original per-call connection setup in rag_system.storage.
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    connection = sqlite3.connect(db_path)
+    connection.row_factory = sqlite3.Row
+    try:
+        connection.execute("PRAGMA journal_mode=WAL;")
+        connection.execute("PRAGMA foreign_keys=ON;")
+        rows = connection.execute(_QUERY, (query, limit)).fetchall()
+    finally:
+        connection.close()
+    return [json.loads(row["metadata"] or "{}") for row in rows]
+
+
+def _measure(func, queries: list) -> dict:
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        func(query)
+        timings.append((time.perf_counter() - start) * 1_000_000)
+    timings.sort()
+    return {
+        "mean_us": round(statistics.fmean(timings), 1),
+        "p50_us": round(timings[len(timings) // 2], 1),
+        "p99_us": round(timings[int(len(timings) * 0.99) - 1], 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--docs", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    # Only a dozen distinct queries are replayed; with the cache on, the pooled
+    # path would measure cache hits rather than connection reuse.
+    configure_query_cache(0)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = Path(temp_dir) / "rag.db"
+        initialize_database(db_path)
+        add_documents(
+            db_path,
+            (
+                DocumentRecord(
+                    doc_id=f"doc-{idx}",
+                    content=" ".join(_WORDS[(idx + step) % len(_WORDS)] for step in range(40)),
+                    source="bench",
+                    metadata={"idx": idx},
+                )
+                for idx in range(args.docs)
+            ),
+        )
+        queries = [_WORDS[idx % len(_WORDS)] for idx in range(args.queries)]
+
+        before = _measure(lambda q: _unpooled_search(db_path, q, 5), queries)
+        after = _measure(lambda q: search_documents(db_path, q, limit=5), queries)
+        close_pools()
+
+    print(
+        json.dumps(
+            {
+                "docs": args.docs,
+                "queries": args.queries,
+                "per_call_connection": before,
+                "pooled_connection": after,
+                "speedup": round(before["mean_us"] / after["mean_us"], 2),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Measure how opening the dense index scales with corpus size.
+
+Each size gets an index of random unit vectors (embedding real text would
+dominate the run time without changing what is measured). A fresh Python
+process then opens the index and answers one search, as a server worker or a
+Lambda cold start would, and reports the time taken and its resident memory
+split into private (anonymous) pages and file-backed pages, which are shared
+with every other process mapping the same files.
+
+Usage: python scripts/bench_vector_load.py [--sizes 10000,100000,1000000]
+"""
+
+import argparse
+from array import array
+import json
+from pathlib import Path
+import subprocess
+import sys
+import tempfile
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from rag_system.vectors import DEFAULT_DIM, VectorIndex, np  # noqa: E402
+
+_CHILD = """
+import json, sys, time
+sys.path.insert(0, sys.argv[1])
+start = time.perf_counter()
+from rag_system.vectors import VectorIndex
+imported = time.perf_counter()
+index = VectorIndex(sys.argv[2])
+size = len(index)
+opened = time.perf_counter()
+index.search("kinesis stream records", limit=10)
+searched = time.perf_counter()
+status = dict(
+    line.split(":", 1) for line in open("/proc/self/status").read().splitlines() if ":" in line
+)
+print(json.dumps({
+    "rows": size,
+    "import_ms": round((imported - start) * 1000, 1),
+    "open_ms": round((opened - imported) * 1000, 1),
+    "first_search_ms": round((searched - opened) * 1000, 1),
+    "rss_anon_mb": round(int(status.get("RssAnon", "0 kB").split()[0]) / 1024, 1),
+    "rss_file_mb": round(int(status.get("RssFile", "0 kB").split()[0]) / 1024, 1),
+}))
+"""
+
+
+def _build(db_path: Path, size: int, dim: int) -> None:
+    rng = np.random.default_rng(5)
+    index = VectorIndex(db_path, dim=dim)
+    for start in range(0, size, 10_000):
+        block = rng.standard_normal((min(10_000, size - start), dim)).astype(np.float32)
+        block /= np.linalg.norm(block, axis=1, keepdims=True)
+        rows = []
+        for offset, row in enumerate(block):
+            vector = array("f")
+            vector.frombytes(row.tobytes())
+            rows.append((f"doc-{start + offset:07d}", vector))
+        index._store(rows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--dim", type=int, default=DEFAULT_DIM)
+    args = parser.parse_args()
+    if np is None:
+        sys.exit("bench_vector_load.py needs NumPy to build the test indexes")
+
+    report = {"dim": args.dim, "sizes": []}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for size in (int(value) for value in args.sizes.split(",")):
+            db_path = Path(temp_dir) / f"rag-{size}.db"
+            _build(db_path, size, args.dim)
+            child = subprocess.run(
+                [sys.executable, "-c", _CHILD, str(ROOT), str(db_path)],
+                check=True,
+                capture_output=True,
+                text=True,
+            )
+            report["sizes"].append({"docs": size, **json.loads(child.stdout)})
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Concurrent load test for the RAG HTTP server.
+
+Each client thread keeps one HTTP/1.1 connection open and replays a mix of
+``/healthz``, ``/search`` and ``/generate`` requests. Without ``--url`` the
+script seeds a temporary database and starts an in-process server using the
+configured ``RAG_SERVER_MODE``/``RAG_WORKERS``.
+
+Usage: python scripts/load_test.py [--url http://host:port] [--concurrency 1,8,32]
+"""
+
+import argparse
+from http.client import HTTPConnection
+import json
+import os
+from pathlib import Path
+import socket
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlparse
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from rag_system.config import load_config  # noqa: E402
+from rag_system.server import create_server  # noqa: E402
+from rag_system.storage import ensure_sample_data  # noqa: E402
+
+_WORKLOAD = [
+    ("GET", "/healthz", None),
+    ("GET", "/search?query=Lambda", None),
+    ("GET", "/search?query=S3%20buckets", None),
+    ("POST", "/generate", {"query": "What does S3 do?"}),
+]
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _client(host: str, port: int, count: int, offset: int, latencies: list, errors: list) -> None:
+    connection = HTTPConnection(host, port, timeout=30)
+    try:
+        for idx in range(count):
+            method, path, payload = _WORKLOAD[(idx + offset) % len(_WORKLOAD)]
+            body = json.dumps(payload).encode("utf-8") if payload is not None else None
+            headers = {"Content-Type": "application/json"} if body else {}
+            start = time.perf_counter()
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                if response.status >= 400:
+                    errors.append(response.status)
+                if response.getheader("Connection") == "close":
+                    connection.close()
+            except OSError as exc:
+                errors.append(str(exc))
+                connection.close()
+            latencies.append(time.perf_counter() - start)
+    finally:
+        connection.close()
+
+
+def _percentile(values: list, pct: float) -> float:
+    index = min(len(values) - 1, max(0, int(round(pct / 100 * len(values))) - 1))
+    return values[index]
+
+
+def run_level(host: str, port: int, concurrency: int, requests: int) -> dict:
+    per_client = max(1, requests // concurrency)
+    latencies: list = []
+    errors: list = []
+    threads = [
+        threading.Thread(
+            target=_client, args=(host, port, per_client, idx, latencies, errors)
+        )
+        for idx in range(concurrency)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", help="Target server; starts a local one if omitted")
+    parser.add_argument("--concurrency", default="1,4,16,32")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per level")
+    args = parser.parse_args()
+    levels = [int(level) for level in args.concurrency.split(",") if level]
+
+    server = None
+    temp_dir = None
+    if args.url:
+        parsed = urlparse(args.url)
+        host, port = parsed.hostname or "127.0.0.1", parsed.port or 80
+    else:
+        temp_dir = tempfile.TemporaryDirectory()
+        os.environ["RAG_DB_PATH"] = str(Path(temp_dir.name) / "rag.db")
+        os.environ["RAG_PORT"] = str(_free_port())
+        config = load_config()
+        ensure_sample_data(config.db_path, ROOT / "examples" / "documents")
+        server = create_server(config)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host, port = config.host, config.port
+
+    try:
+        results = [run_level(host, port, level, args.requests) for level in levels]
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+        if temp_dir is not None:
+            temp_dir.cleanup()
+
+    print(json.dumps({"target": f"{host}:{port}", "levels": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
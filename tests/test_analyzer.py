@@ -1,6 +1,8 @@
 import unittest
+from unittest import mock
 
-from rag_system.analyzer import analyze_text
+from rag_system import analyzer
+from rag_system.analyzer import analyze_many, analyze_text
 
 
 class AnalyzerTests(unittest.TestCase):
@@ -14,6 +16,31 @@ class AnalyzerTests(unittest.TestCase):
         with self.assertRaises(ValueError):
             analyze_text("")
 
+    def test_key_phrases_count_bigrams_across_segments(self):
+        text = "Step Functions coordinate work. Step functions retry, step functions wait."
+        expected = analyze_text(text)
+        self.assertEqual(expected["key_phrases"][0], {"Text": "step functions", "Score": 0.3})
+        self.assertEqual(expected["entities"][0], {"Text": "Step", "Score": 0.2})
+        with mock.patch.object(analyzer, "_SEGMENT_CHARS", 7):
+            self.assertEqual(analyze_text(text), expected)
+
+    def test_analyze_many_keeps_order_and_validates_first(self):
+        texts = ["AWS Lambda runs code", "Amazon S3 stores objects", "AWS Lambda runs code"]
+        analyses = analyze_many(texts)
+        self.assertEqual(analyses, [analyze_text(text) for text in texts])
+        self.assertIs(analyses[0], analyses[2])
+        self.assertEqual(analyze_many([]), [])
+        with self.assertRaisesRegex(ValueError, r"texts\[1\]"):
+            analyze_many(["AWS Lambda", ""])
+        with self.assertRaises(ValueError):
+            analyze_many(texts, workers=0)
+
+    def test_analyze_many_fans_out_over_processes(self):
+        texts = ["Amazon Kinesis streams records", "Amazon SQS queues messages"]
+        with mock.patch.object(analyzer, "POOL_MIN_CHARS", 0):
+            analyses = analyze_many(texts, workers=2)
+        self.assertEqual(analyses, [analyze_text(text) for text in texts])
+
 
 if __name__ == "__main__":
     unittest.main()
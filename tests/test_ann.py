@@ -0,0 +1,60 @@
+import random
+import tempfile
+import unittest
+from pathlib import Path
+
+from rag_system.ann import IVFIndex
+from rag_system.vectors import VectorIndex, np
+
+
+def _corpus(count, seed=3):
+    rng = random.Random(seed)
+    vocab = [f"term{idx}" for idx in range(400)]
+    return [(f"doc-{idx}", " ".join(rng.choices(vocab, k=30))) for idx in range(count)]
+
+
+@unittest.skipIf(np is None, "IVF search needs NumPy")
+class IVFIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = Path(self.temp_dir.name) / "rag.db"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _trained(self, nprobe=2, lists=8):
+        index = IVFIndex(self.db_path, dim=64, lists=lists, nprobe=nprobe)
+        index.upsert(_corpus(400))
+        index.train()
+        return index
+
+    def test_probing_every_list_matches_exact_search(self):
+        self._trained()
+        exact = VectorIndex(self.db_path, dim=64).search("term7 term42 term99", limit=10)
+        probed = IVFIndex(self.db_path, dim=64, lists=8, nprobe=8)
+        self.assertTrue(probed.trained)
+        self.assertEqual(probed.search("term7 term42 term99", limit=10), exact)
+
+    def test_inserts_are_assigned_and_removals_excluded(self):
+        index = self._trained()
+        index.upsert([("fresh", "quasar nebula pulsar")])
+        self.assertEqual(index.search("quasar nebula pulsar", limit=1)[0][0], "fresh")
+
+        index.remove(["fresh"])
+        self.assertNotIn("fresh", [doc_id for doc_id, _ in index.search("quasar", limit=5)])
+
+    def test_rows_added_by_flat_index_are_still_scanned(self):
+        self._trained(nprobe=1)
+        VectorIndex(self.db_path, dim=64).upsert([("late", "quasar nebula pulsar")])
+        reopened = IVFIndex(self.db_path, dim=64, lists=8, nprobe=1)
+        self.assertEqual(reopened.search("quasar pulsar", limit=1)[0][0], "late")
+
+    def test_rebuild_discards_the_quantizer(self):
+        index = self._trained()
+        index.rebuild(_corpus(10))
+        self.assertFalse(index.trained)
+        self.assertEqual(len(index), 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
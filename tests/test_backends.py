@@ -0,0 +1,254 @@
+import tempfile
+import threading
+import unittest
+from dataclasses import replace
+from pathlib import Path
+
+from rag_system.backends import (
+    MemoryBackend,
+    ShardedBackend,
+    SQLiteBackend,
+    close_backends,
+    get_backend,
+)
+from rag_system.config import load_config
+from rag_system.storage import (
+    DocumentRecord,
+    add_document,
+    get_document,
+    initialize_database,
+    list_documents,
+    search_documents,
+    shard_index,
+    shard_paths,
+)
+
+_DOCUMENTS = [
+    DocumentRecord("doc-1", "Amazon S3 stores objects in buckets", "unit", {"tag": "s3"}),
+    DocumentRecord("doc-2", "Lambda functions run code without servers", "unit", {}),
+    DocumentRecord("doc-3", "Kinesis streams carry records between services", "unit", {}),
+    DocumentRecord("doc-4", "S3 buckets can replicate objects across regions", "unit", {}),
+]
+
+
+class BackendContract:
+    """Behaviour every ``StorageBackend`` must share."""
+
+    def make_backend(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = Path(self.temp_dir.name) / "rag.db"
+        self.backend = self.make_backend()
+        self.backend.initialize()
+        self.backend.add_many(_DOCUMENTS)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_get_and_list(self):
+        self.assertEqual(self.backend.get("doc-1").metadata, {"tag": "s3"})
+        self.assertIsNone(self.backend.get("missing"))
+        self.assertEqual(
+            [record.doc_id for record in self.backend.list()],
+            ["doc-1", "doc-2", "doc-3", "doc-4"],
+        )
+
+    def test_list_pages_and_projections(self):
+        page = self.backend.list(after="doc-1", limit=2, fields="metadata")
+        self.assertEqual([record.doc_id for record in page], ["doc-2", "doc-3"])
+        self.assertEqual(page[0].content, "")
+        self.assertEqual(
+            [record.doc_id for record in self.backend.iter_documents(after="doc-3", fields="ids")],
+            ["doc-4"],
+        )
+        with self.assertRaises(ValueError):
+            self.backend.list(limit=0)
+
+    def test_search_requires_every_term(self):
+        results = self.backend.search("S3 objects", limit=5)
+        self.assertEqual({result.doc_id for result in results}, {"doc-1", "doc-4"})
+        self.assertTrue(all(result.score < 0 for result in results))
+        self.assertEqual(self.backend.search("s3 lambda", limit=5), [])
+        with self.assertRaises(ValueError):
+            self.backend.search("the", limit=5)
+
+    def test_replace_and_delete(self):
+        self.backend.add("doc-1", "Glacier archives backups", "unit", {})
+        self.assertEqual(
+            [result.doc_id for result in self.backend.search("buckets", limit=5)], ["doc-4"]
+        )
+        self.assertEqual(self.backend.search("glacier", limit=5)[0].doc_id, "doc-1")
+
+        self.assertEqual(self.backend.delete(["doc-1", "doc-2", "missing"]), 2)
+        self.assertIsNone(self.backend.get("doc-1"))
+        self.assertEqual(self.backend.search("glacier", limit=5), [])
+        self.assertEqual(len(self.backend.list()), 2)
+
+    def test_search_passages(self):
+        results = self.backend.search_passages("kinesis records", limit=3)
+        self.assertEqual(results[0].doc_id, "doc-3")
+        self.assertEqual(results[0].metadata["passage"]["index"], 0)
+
+    def test_snippets_highlight_matches(self):
+        result = self.backend.search(
+            "kinesis", limit=1, snippet_tokens=3, markers=("[", "]")
+        )[0]
+        self.assertIn("[Kinesis]", result.content)
+        self.assertTrue(result.content.endswith("..."))
+
+
+class SQLiteBackendTests(BackendContract, unittest.TestCase):
+    def make_backend(self):
+        return SQLiteBackend(self.db_path)
+
+
+class MemoryBackendTests(BackendContract, unittest.TestCase):
+    def make_backend(self):
+        return MemoryBackend()
+
+    def test_ranking_matches_sqlite(self):
+        # Fillers keep common terms below half the corpus, where FTS5 clamps idf.
+        fillers = [
+            DocumentRecord(f"filler-{idx}", f"Filler text number {idx} on other topics", "unit", {})
+            for idx in range(8)
+        ]
+        self.backend.add_many(fillers)
+        sqlite = SQLiteBackend(self.db_path)
+        sqlite.initialize()
+        sqlite.add_many(_DOCUMENTS + fillers)
+        for query in ("s3 buckets", "objects", "records services", "code"):
+            expected = sqlite.search(query, limit=5)
+            actual = self.backend.search(query, limit=5)
+            self.assertEqual(
+                [result.doc_id for result in actual], [result.doc_id for result in expected]
+            )
+            for mine, theirs in zip(actual, expected):
+                self.assertAlmostEqual(mine.score, theirs.score, places=4)
+
+    def test_only_bm25_is_supported(self):
+        with self.assertRaises(ValueError):
+            self.backend.search("kinesis", limit=5, mode="dense")
+
+    def test_compaction_keeps_live_documents(self):
+        for idx in range(1100):
+            self.backend.add("doc-churn", f"churn revision {idx}", "unit", {})
+        self.assertEqual(self.backend.search("revision", limit=5)[0].content, "churn revision 1099")
+        self.assertEqual(len(self.backend.list()), 5)
+        self.assertEqual(self.backend.get("doc-2"), _DOCUMENTS[1])
+
+
+class ShardedBackendTests(BackendContract, unittest.TestCase):
+    def make_backend(self):
+        return ShardedBackend([SQLiteBackend(path) for path in shard_paths(self.db_path, 3)])
+
+    def test_documents_live_on_their_shard(self):
+        for shard, path in enumerate(shard_paths(self.db_path, 3)):
+            for record in list_documents(path):
+                self.assertEqual(shard_index(record.doc_id, 3), shard)
+
+    def test_scores_use_corpus_wide_statistics(self):
+        fillers = [
+            DocumentRecord(f"filler-{idx}", f"Filler text number {idx} on other topics", "unit", {})
+            for idx in range(20)
+        ]
+        self.backend.add_many(fillers)
+        single = SQLiteBackend(Path(self.temp_dir.name) / "single.db")
+        single.initialize()
+        single.add_many(_DOCUMENTS + fillers)
+        self.assertEqual(
+            self.backend.term_statistics(["buckets", "kinesis"]),
+            single.term_statistics(["buckets", "kinesis"]),
+        )
+        for query in ("buckets", "kinesis", "lambda"):
+            expected = single.search(query, limit=5)
+            actual = self.backend.search(query, limit=5)
+            self.assertEqual(
+                [result.doc_id for result in actual], [result.doc_id for result in expected]
+            )
+            # Length normalisation still uses each shard's average row length.
+            for mine, theirs in zip(actual, expected):
+                self.assertAlmostEqual(mine.score, theirs.score, delta=abs(theirs.score) * 0.05)
+
+    def test_concurrent_hybrid_searches_finish(self):
+        sharded = ShardedBackend(
+            [SQLiteBackend(path) for path in shard_paths(Path(self.temp_dir.name) / "hybrid.db", 2)]
+        )
+        sharded.initialize()
+        sharded.add_many(_DOCUMENTS)
+        finished = []
+
+        def search(idx):
+            # Distinct queries, so no search is answered by the query cache.
+            sharded.search(f"objects buckets {idx}", limit=2, mode="hybrid")
+            finished.append(idx)
+
+        threads = [
+            threading.Thread(target=search, args=(idx,), daemon=True) for idx in range(16)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=30)
+        self.assertEqual(len(finished), 16)
+
+    def test_shards_of_memory_backends(self):
+        sharded = ShardedBackend([MemoryBackend(), MemoryBackend()])
+        sharded.add_many(_DOCUMENTS)
+        self.assertEqual(sharded.search_modes, ("bm25",))
+        self.assertEqual(sharded.search("kinesis", limit=1)[0].doc_id, "doc-3")
+
+
+class GetBackendTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = Path(self.temp_dir.name) / "rag.db"
+        initialize_database(self.db_path)
+        add_document(self.db_path, "doc-1", "Kinesis streams carry records", "unit", {})
+
+    def tearDown(self):
+        close_backends()
+        self.temp_dir.cleanup()
+
+    def _config(self, backend, shards=1):
+        return replace(
+            load_config(), db_path=self.db_path, storage_backend=backend, shards=shards
+        )
+
+    def test_backends_are_chosen_by_config(self):
+        sqlite = get_backend(self._config("sqlite"))
+        self.assertIsInstance(sqlite, SQLiteBackend)
+        self.assertIs(get_backend(self._config("sqlite")), sqlite)
+        with self.assertRaises(ValueError):
+            get_backend(self._config("postgres"))
+
+    def test_memory_backend_loads_the_database(self):
+        memory = get_backend(self._config("memory"))
+        self.assertIsInstance(memory, MemoryBackend)
+        self.assertEqual(memory.search("kinesis", limit=1)[0].doc_id, "doc-1")
+
+    def test_memory_backend_writes_through_to_sqlite(self):
+        memory = get_backend(self._config("memory"))
+        memory.add("doc-new", "Glacier archives backups", "unit", {"tier": "cold"})
+        self.assertEqual(get_document(self.db_path, "doc-new").metadata, {"tier": "cold"})
+        self.assertEqual(
+            [result.doc_id for result in search_documents(self.db_path, "glacier")], ["doc-new"]
+        )
+        self.assertEqual(memory.delete(["doc-1", "doc-missing"]), 1)
+        self.assertIsNone(get_document(self.db_path, "doc-1"))
+        self.assertEqual(memory.search("kinesis", limit=1), [])
+
+    def test_shard_count_wraps_backends(self):
+        sharded = get_backend(self._config("sqlite", shards=4))
+        self.assertIsInstance(sharded, ShardedBackend)
+        self.assertEqual(
+            [shard.db_path for shard in sharded.shards], shard_paths(self.db_path, 4)
+        )
+        self.assertEqual(shard_paths(self.db_path, 1), [self.db_path])
+        with self.assertRaises(ValueError):
+            get_backend(self._config("sqlite", shards=0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+from rag_system.backends import MemoryBackend, SQLiteBackend
+from rag_system.batch import generate_many, search_many
+from rag_system.storage import DocumentRecord, get_pool
+
+_DOCUMENTS = [
+    DocumentRecord("doc-1", "Amazon S3 stores objects in buckets", "unit", {}),
+    DocumentRecord("doc-2", "Lambda functions run code without servers", "unit", {}),
+    DocumentRecord("doc-3", "Kinesis streams carry records between services", "unit", {}),
+]
+
+
+class CountingBackend(MemoryBackend):
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+        self._calls_lock = threading.Lock()
+
+    def search(self, query, *args, **kwargs):
+        with self._calls_lock:
+            self.calls.append(query)
+        return super().search(query, *args, **kwargs)
+
+
+class BatchTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.backend = SQLiteBackend(Path(self.temp_dir.name) / "rag.db")
+        self.backend.initialize()
+        self.backend.add_many(_DOCUMENTS)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_results_follow_query_order(self):
+        queries = ["kinesis", "buckets", "lambda servers", "kinesis"]
+        for workers in (1, 3):
+            batches = search_many(self.backend, queries, limit=2, workers=workers)
+            self.assertEqual(
+                [[result.doc_id for result in results] for results in batches],
+                [["doc-3"], ["doc-1"], ["doc-2"], ["doc-3"]],
+            )
+            self.assertEqual(batches, [self.backend.search(query, 2) for query in queries])
+
+    def test_identical_queries_run_once(self):
+        backend = CountingBackend()
+        backend.add_many(_DOCUMENTS)
+        batches = search_many(backend, ["kinesis", "buckets", "kinesis"], workers=2)
+        self.assertEqual(sorted(backend.calls), ["buckets", "kinesis"])
+        self.assertIs(batches[0], batches[2])
+
+    def test_batch_reuses_one_reader(self):
+        pool = get_pool(self.backend.db_path)
+        seen = []
+        original = pool._checkout_reader
+
+        def checkout():
+            connection = original()
+            seen.append(connection)
+            return connection
+
+        pool._checkout_reader = checkout
+        try:
+            search_many(self.backend, ["kinesis", "buckets", "lambda"], mode="hybrid")
+        finally:
+            del pool._checkout_reader
+        self.assertEqual(len(seen), 1)
+
+    def test_invalid_query_fails_the_batch(self):
+        with self.assertRaisesRegex(ValueError, r"queries\[1\]"):
+            search_many(self.backend, ["kinesis", "the"])
+        with self.assertRaises(ValueError):
+            search_many(self.backend, ["kinesis"], unit="passage", mode="dense")
+        self.assertEqual(search_many(self.backend, []), [])
+
+    def test_generate_many(self):
+        responses = generate_many(self.backend, ["kinesis records", "buckets"], workers=2)
+        self.assertIn("Query: kinesis records", responses[0]["answer"])
+        self.assertIn("[doc-1]", responses[1]["context"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+import argparse
+from collections import Counter
+import unittest
+
+from benchmarks import startup, workloads
+from benchmarks.compare import compare
+from benchmarks.run import SUITES, run
+from rag_system.analyzer import analyze_text
+
+
+def _results(**values):
+    better = {"rps": "higher", "p50_ms": "lower", "p99_ms": "lower"}
+    units = {"rps": "req/s", "p50_ms": "ms", "p99_ms": "ms"}
+    return {
+        "metrics": {
+            name: {"value": value, "unit": units[name], "better": better[name]}
+            for name, value in values.items()
+        }
+    }
+
+
+def _args(**overrides):
+    params = dict(
+        suites=",".join(SUITES),
+        docs=40,
+        words=30,
+        vocabulary=500,
+        queries=20,
+        distinct_queries=10,
+        analyzer_mb=0.01,
+        runs=2,
+        repeat=1,
+        concurrency=2,
+        seed=7,
+        output=None,
+    )
+    params.update(overrides)
+    return argparse.Namespace(**params)
+
+
+class WorkloadTests(unittest.TestCase):
+    def test_workloads_are_seeded(self):
+        words = workloads.vocabulary(500, seed=3)
+        self.assertEqual(len(set(words)), 500)
+        self.assertEqual(words, workloads.vocabulary(500, seed=3))
+        first = list(workloads.corpus(5, 20, seed=1, words_list=words))
+        self.assertEqual(first, list(workloads.corpus(5, 20, seed=1, words_list=words)))
+        self.assertEqual(len(first[0].content.split()), 20)
+        self.assertEqual(
+            workloads.queries(50, 10, seed=2, words_list=words * 5),
+            workloads.queries(50, 10, seed=2, words_list=words * 5),
+        )
+
+    def test_query_popularity_is_skewed(self):
+        counts = Counter(workloads.queries(2000, 100, seed=4)).most_common()
+        self.assertGreater(counts[0][1], 10 * counts[-1][1])
+
+
+class CompareTests(unittest.TestCase):
+    def test_regressions_follow_the_better_direction(self):
+        changes = {
+            change.metric: change
+            for change in compare(
+                _results(rps=1000, p50_ms=2.0), _results(rps=850, p50_ms=1.5)
+            )
+        }
+        self.assertAlmostEqual(changes["rps"].change, -0.15)
+        self.assertTrue(changes["rps"].regressed(0.1))
+        self.assertFalse(changes["rps"].regressed(0.2))
+        self.assertFalse(changes["p50_ms"].regressed(0.1))
+
+    def test_small_latency_changes_are_ignored(self):
+        (change,) = compare(_results(p50_ms=0.02), _results(p50_ms=0.04))
+        self.assertGreater(change.regression, 0.9)
+        self.assertFalse(change.regressed(0.1))
+        self.assertTrue(change.regressed(0.1, min_delta_ms=0.01))
+
+    def test_tail_percentiles_get_the_tail_threshold(self):
+        (change,) = compare(_results(p99_ms=10.0), _results(p99_ms=12.0))
+        self.assertFalse(change.regressed(0.1))
+        self.assertTrue(change.regressed(0.1, tail_threshold=0.15))
+
+    def test_overlapping_runs_are_noise(self):
+        baseline = _results(rps=1000)
+        candidate = _results(rps=850)
+        baseline["metrics"]["rps"]["runs"] = [900, 1000, 1100]
+        candidate["metrics"]["rps"]["runs"] = [800, 850, 950]
+        (change,) = compare(baseline, candidate)
+        self.assertFalse(change.regressed(0.1))
+        candidate["metrics"]["rps"]["runs"] = [800, 850, 880]
+        (change,) = compare(baseline, candidate)
+        self.assertTrue(change.regressed(0.1))
+
+
+class StartupTests(unittest.TestCase):
+    def test_parse_importtime_sums_top_level_imports(self):
+        stderr = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       100 |        100 |   _io\n"
+            "import time:       200 |        300 | io\n"
+            "import time:      1500 |       1500 | sqlite3\n"
+            "Error: ignored\n"
+        )
+        import_ms, modules = startup.parse_importtime(stderr)
+        self.assertAlmostEqual(import_ms, 1.8)
+        self.assertEqual(modules, {"_io", "io", "sqlite3"})
+
+    def test_analyze_command_skips_storage(self):
+        (target,) = [target for target in startup.TARGETS if target.name == "cli_analyze"]
+        result = startup.measure(target._replace(budget_ms=float("inf")), runs=1)
+        self.assertIn("rag_system.analyzer", result.loaded)
+        self.assertEqual(result.failures(), [])
+
+    def test_package_exports_resolve_on_access(self):
+        import rag_system
+
+        self.assertIs(rag_system.analyze_text, analyze_text)
+        self.assertIn("SearchResult", dir(rag_system))
+        with self.assertRaises(AttributeError):
+            rag_system.missing_name
+
+    def test_budget_failures_are_reported(self):
+        target = startup.Target("t", (), 1.0, ("numpy",))
+        result = startup.Measurement(target, 2.5, ("numpy", "re"))
+        self.assertEqual(
+            result.failures(), ["t loads numpy", "t imports take 2.5 ms, over its 1 ms budget"]
+        )
+
+
+class RunTests(unittest.TestCase):
+    def test_small_run_reports_every_suite(self):
+        results = run(_args())
+        self.assertEqual(results["params"]["docs"], 40)
+        for metric in (
+            "ingest.docs_per_second",
+            "search.p99_ms",
+            "generate.p50_ms",
+            "analyzer.mb_per_second",
+            "server.requests_per_second",
+            "startup.cli_analyze_ms",
+        ):
+            self.assertGreater(results["metrics"][metric]["value"], 0)
+        self.assertEqual(len(results["metrics"]["search.p99_ms"]["runs"]), 2)
+
+    def test_identical_runs_compare_clean(self):
+        args = _args(suites="search,generate", docs=200, queries=100, distinct_queries=50, runs=5)
+        changes = compare(run(args), run(args))
+        self.assertTrue(changes)
+        self.assertEqual([change.metric for change in changes if change.regressed(0.1)], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+
+from rag_system.cache import LRUCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class LRUCacheTests(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(max_entries=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        cache.put("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_entries_expire_after_ttl(self):
+        clock = FakeClock()
+        cache = LRUCache(max_entries=4, ttl=10, clock=clock)
+        cache.put("a", 1)
+        clock.now = 9
+        self.assertEqual(cache.get("a"), 1)
+        clock.now = 11
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["expirations"], 1)
+
+    def test_byte_budget_evicts_and_skips_oversized(self):
+        cache = LRUCache(max_entries=10, max_bytes=100)
+        cache.put("a", 1, size=60)
+        cache.put("b", 2, size=60)
+        self.assertIsNone(cache.get("a"))
+        cache.put("huge", 3, size=500)
+        self.assertIsNone(cache.get("huge"))
+        self.assertEqual(cache.stats()["bytes"], 60)
+
+    def test_zero_entries_disables_cache(self):
+        cache = LRUCache(max_entries=0)
+        cache.put("a", 1)
+        self.assertIsNone(cache.get("a"))
+        self.assertFalse(cache.enabled)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,31 @@
+import unittest
+
+from rag_system.chunking import chunk_text
+
+
+class ChunkingTests(unittest.TestCase):
+    def test_windows_overlap(self):
+        text = " ".join(f"w{idx}" for idx in range(10))
+        passages = chunk_text(text, size=4, overlap=1)
+        self.assertEqual(
+            [passage.text for passage in passages],
+            ["w0 w1 w2 w3", "w3 w4 w5 w6", "w6 w7 w8 w9"],
+        )
+        self.assertEqual([passage.index for passage in passages], [0, 1, 2])
+
+    def test_offsets_point_into_source(self):
+        text = "alpha  beta\ngamma delta"
+        for passage in chunk_text(text, size=2, overlap=0):
+            self.assertEqual(text[passage.start : passage.end], passage.text)
+
+    def test_short_and_empty_text(self):
+        self.assertEqual(len(chunk_text("one two", size=5, overlap=2)), 1)
+        self.assertEqual(chunk_text("   "), [])
+
+    def test_invalid_overlap(self):
+        with self.assertRaises(ValueError):
+            chunk_text("text", size=3, overlap=3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,7 +3,12 @@ from pathlib import Path
 import tempfile
 import unittest
 
-from rag_system.config import load_config
+from rag_system.config import (
+    clear_config_cache,
+    get_config,
+    load_config,
+    reload_config_if_changed,
+)
 
 
 class ConfigTests(unittest.TestCase):
@@ -20,12 +25,15 @@ class ConfigTests(unittest.TestCase):
         self.assertEqual(config.host, "127.0.0.1")
         self.assertEqual(config.port, 8000)
         self.assertEqual(config.top_k, 5)
+        self.assertIsNone(config.stop_words)
+        self.assertEqual(config.profile_sample_rate, 0.0)
 
     def test_load_config_from_env_file(self):
         with tempfile.TemporaryDirectory() as temp_dir:
             env_path = Path(temp_dir) / ".env"
             env_path.write_text(
-                "RAG_PORT=9000\nRAG_TOP_K=3\nRAG_DATA_DIR=.data\n",
+                "RAG_PORT=9000\nRAG_TOP_K=3\nRAG_DATA_DIR=.data\n"
+                "RAG_STOP_WORDS=The, of\nRAG_PROFILE_SAMPLE_RATE=0.25\n",
                 encoding="utf-8",
             )
             cwd = Path.cwd()
@@ -38,6 +46,39 @@ class ConfigTests(unittest.TestCase):
         self.assertEqual(config.port, 9000)
         self.assertEqual(config.top_k, 3)
         self.assertTrue(str(config.data_dir).endswith(".data"))
+        self.assertEqual(config.stop_words, ("the", "of"))
+        self.assertEqual(config.profile_sample_rate, 0.25)
+
+
+class CachedConfigTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.env_path = Path(self.temp_dir.name) / ".env"
+        self.env_path.write_text("RAG_TOP_K=3\n", encoding="utf-8")
+        clear_config_cache()
+
+    def tearDown(self):
+        clear_config_cache()
+        self.temp_dir.cleanup()
+
+    def test_get_config_is_cached(self):
+        first = get_config(self.env_path)
+        self.env_path.write_text("RAG_TOP_K=7\n", encoding="utf-8")
+        self.assertIs(get_config(self.env_path), first)
+        self.assertEqual(first.top_k, 3)
+
+    def test_reload_if_changed(self):
+        first = get_config(self.env_path)
+        self.assertIsNone(reload_config_if_changed(self.env_path))
+
+        self.env_path.write_text("RAG_TOP_K=7\n", encoding="utf-8")
+        mtime = self.env_path.stat().st_mtime + 5
+        os.utime(self.env_path, (mtime, mtime))
+
+        updated = reload_config_if_changed(self.env_path)
+        self.assertIsNotNone(updated)
+        self.assertEqual(updated.top_k, 7)
+        self.assertIsNot(get_config(self.env_path), first)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,39 @@
+import unittest
+
+from rag_system import fusion
+from rag_system.fusion import reciprocal_rank_fusion
+
+
+class ReciprocalRankFusionTests(unittest.TestCase):
+    def test_items_ranked_by_both_lists_win(self):
+        fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "d", "a"]], k=60)
+        self.assertEqual([item for item, _ in fused], ["a", "c", "b", "d"])
+        self.assertAlmostEqual(fused[0][1], 1 / 61 + 1 / 63)
+
+    def test_weights_scale_each_list(self):
+        fused = reciprocal_rank_fusion([["a"], ["b"]], weights=[1.0, 2.0])
+        self.assertEqual([item for item, _ in fused], ["b", "a"])
+
+    def test_empty_and_invalid_input(self):
+        self.assertEqual(reciprocal_rank_fusion([[], []]), [])
+        with self.assertRaises(ValueError):
+            reciprocal_rank_fusion([["a"]], weights=[1.0, 1.0])
+        with self.assertRaises(ValueError):
+            reciprocal_rank_fusion([["a"]], k=0)
+
+    def test_pure_python_fallback_matches(self):
+        rankings = [["a", "b", "c", "d"], ["d", "e", "a"], ["b"]]
+        expected = reciprocal_rank_fusion(rankings, weights=[1.0, 0.5, 2.0])
+        saved = fusion.np
+        fusion.np = None
+        try:
+            fallback = reciprocal_rank_fusion(rankings, weights=[1.0, 0.5, 2.0])
+        finally:
+            fusion.np = saved
+        self.assertEqual([item for item, _ in fallback], [item for item, _ in expected])
+        for (_, score), (_, expected_score) in zip(fallback, expected):
+            self.assertAlmostEqual(score, expected_score)
+
+
+if __name__ == "__main__":
+    unittest.main()
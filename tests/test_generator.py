@@ -1,6 +1,6 @@
 import unittest
 
-from rag_system.generator import generate_response
+from rag_system.generator import generate_response, response_cache
 from rag_system.storage import SearchResult
 
 
@@ -19,10 +19,52 @@ class GeneratorTests(unittest.TestCase):
         self.assertIn("What is Lambda?", response["answer"])
         self.assertIn("doc-1", response["context"])
 
+    def test_results_reference_sources_without_their_content(self):
+        result = SearchResult(
+            doc_id="doc-ref",
+            content="Glacier archives data for long-term retention.",
+            source="seed",
+            score=0.3,
+            metadata={"passage": 0},
+        )
+        response = generate_response("How long is data retained?", [result])
+        self.assertIn("Glacier archives data", response["context"])
+        self.assertEqual(
+            response["results"], [SearchResult("doc-ref", "", "seed", 0.3, {"passage": 0})]
+        )
+        self.assertEqual(result.content, "Glacier archives data for long-term retention.")
+
     def test_generate_response_requires_query(self):
         with self.assertRaises(ValueError):
             generate_response("", [])
 
+    def test_repeated_generation_is_memoized(self):
+        results = [
+            SearchResult(
+                doc_id="doc-memo",
+                content="Amazon S3 stores objects in buckets.",
+                source="seed",
+                score=0.2,
+                metadata={},
+            )
+        ]
+        first = generate_response("Where does S3 store objects?", results)
+        hits = response_cache.stats()["hits"]
+        second = generate_response("Where does S3 store objects?", results)
+        self.assertEqual(response_cache.stats()["hits"], hits + 1)
+        self.assertEqual(first, second)
+
+    def test_changed_content_is_not_served_from_cache(self):
+        def result(content):
+            return SearchResult(
+                doc_id="doc-versioned", content=content, source="seed", score=0.1, metadata={}
+            )
+
+        old = generate_response("What changed?", [result("Version one text.")])
+        new = generate_response("What changed?", [result("Version two text.")])
+        self.assertIn("Version one", old["context"])
+        self.assertIn("Version two", new["context"])
+
 
 if __name__ == "__main__":
     unittest.main()
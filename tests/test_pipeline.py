@@ -0,0 +1,219 @@
+import os
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from rag_system import pipeline
+from rag_system.pipeline import (
+    bulk_ingest,
+    bulk_ingest_sharded,
+    ingest_files,
+    ingest_files_sharded,
+    iter_file_records,
+)
+from rag_system.storage import (
+    DocumentRecord,
+    get_pool,
+    list_documents,
+    search_documents,
+    shard_index,
+    shard_paths,
+)
+
+
+class PipelineTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = Path(self.temp_dir.name) / "rag.db"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_bulk_ingest_writes_in_batches(self):
+        records = (
+            DocumentRecord(f"doc-{idx}", f"lambda event number {idx}", "bench", {"idx": idx})
+            for idx in range(25)
+        )
+        stats = bulk_ingest(self.db_path, records, batch_size=10, optimize=True)
+        self.assertEqual(stats.inserted, 25)
+        self.assertEqual(stats.updated, 0)
+        self.assertEqual(stats.batches, 3)
+        self.assertEqual(len(list_documents(self.db_path)), 25)
+
+    def test_optimize_merges_both_indexes(self):
+        records = [
+            DocumentRecord(f"doc-{idx}", f"lambda event {idx}", "bench", {}) for idx in range(30)
+        ]
+        bulk_ingest(self.db_path, records[:20], batch_size=10)
+        with get_pool(self.db_path).reader() as connection:
+            for table in ("documents", "passages"):
+                segments = connection.execute(f"SELECT COUNT(DISTINCT segid) FROM {table}_idx;")
+                self.assertGreater(segments.fetchone()[0], 1, table)
+
+        bulk_ingest(self.db_path, records[20:], batch_size=10, optimize=True)
+        with get_pool(self.db_path).reader() as connection:
+            for table in ("documents", "passages"):
+                segments = connection.execute(f"SELECT COUNT(DISTINCT segid) FROM {table}_idx;")
+                self.assertEqual(segments.fetchone()[0], 1, table)
+
+    def test_bulk_ingest_replaces_existing_documents(self):
+        bulk_ingest(self.db_path, [DocumentRecord("doc-1", "old bucket text", "seed", {})])
+        bulk_ingest(
+            self.db_path,
+            [
+                DocumentRecord("doc-1", "stale duplicate", "seed", {}),
+                DocumentRecord("doc-1", "new queue text", "seed", {}),
+            ],
+        )
+        listed = list_documents(self.db_path)
+        self.assertEqual([doc.content for doc in listed], ["new queue text"])
+        self.assertEqual(search_documents(self.db_path, "bucket"), [])
+
+    def test_bulk_ingest_restores_pragmas(self):
+        bulk_ingest(self.db_path, [DocumentRecord("doc-1", "text", "seed", {})])
+        with get_pool(self.db_path).writer() as connection:
+            synchronous = connection.execute("PRAGMA synchronous;").fetchone()[0]
+        self.assertEqual(synchronous, 2)
+
+    def test_iter_file_records_skips_empty_files(self):
+        folder = Path(self.temp_dir.name)
+        (folder / "a.txt").write_text("  alpha  ", encoding="utf-8")
+        (folder / "b.txt").write_text("   ", encoding="utf-8")
+        records = list(iter_file_records(sorted(folder.glob("*.txt")), strip=True))
+        self.assertEqual([(r.doc_id, r.content) for r in records], [("a", "alpha")])
+
+    def test_parallel_reads_preserve_input_order(self):
+        folder = Path(self.temp_dir.name)
+        paths = []
+        for idx in range(40):
+            path = folder / f"doc-{idx:02d}.txt"
+            path.write_text(f"document {idx} " * (idx + 1), encoding="utf-8")
+            paths.append(path)
+        serial = list(iter_file_records(paths))
+        parallel = list(iter_file_records(paths, workers=4))
+        self.assertEqual(serial, parallel)
+
+    def test_invalid_worker_count(self):
+        with self.assertRaises(ValueError):
+            list(iter_file_records([], workers=0))
+
+    def test_ingest_files_skips_unchanged_files(self):
+        folder = Path(self.temp_dir.name) / "docs"
+        folder.mkdir()
+        paths = []
+        for name in ("a", "b", "c"):
+            path = folder / f"{name}.txt"
+            path.write_text(f"{name} bucket notes", encoding="utf-8")
+            paths.append(path)
+
+        first = ingest_files(self.db_path, paths)
+        self.assertEqual((first.inserted, first.updated, first.skipped), (3, 0, 0))
+
+        second = ingest_files(self.db_path, paths)
+        self.assertEqual((second.inserted, second.updated, second.skipped), (0, 0, 3))
+
+        # Touching a file changes its mtime but not its hash; editing one does both.
+        stat = paths[0].stat()
+        os.utime(paths[0], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        paths[1].write_text("b queue notes, revised", encoding="utf-8")
+        third = ingest_files(self.db_path, paths)
+        self.assertEqual((third.inserted, third.updated, third.skipped), (0, 1, 2))
+        self.assertEqual(search_documents(self.db_path, "queue")[0].doc_id, "b")
+
+        forced = ingest_files(self.db_path, paths, force=True)
+        self.assertEqual(forced.updated, 3)
+
+    def test_ingest_files_rejects_paths_that_share_a_stem(self):
+        paths = []
+        for folder in ("2023", "2024"):
+            path = Path(self.temp_dir.name) / folder / "report.txt"
+            path.parent.mkdir()
+            path.write_text(f"{folder} bucket report", encoding="utf-8")
+            paths.append(path)
+
+        # Split across batches, the second path fails after the first is written.
+        with self.assertRaisesRegex(ValueError, "report"):
+            ingest_files(self.db_path, paths, batch_size=1)
+        self.assertEqual([record.doc_id for record in list_documents(self.db_path)], ["report"])
+
+        # The sharded entry point checks every path before writing any.
+        other_db = Path(self.temp_dir.name) / "other.db"
+        for shards in (1, 2):
+            with self.subTest(shards=shards), self.assertRaisesRegex(ValueError, "report"):
+                ingest_files_sharded(shard_paths(other_db, shards), paths)
+            for db_path in shard_paths(other_db, shards):
+                self.assertFalse(db_path.exists())
+
+    def test_bulk_ingest_skip_unchanged_uses_content_hash(self):
+        record = DocumentRecord("doc-1", "stream text", "seed", {"v": 1})
+        bulk_ingest(self.db_path, [record])
+        again = bulk_ingest(self.db_path, [record], skip_unchanged=True)
+        self.assertEqual(again.skipped, 1)
+        changed = bulk_ingest(
+            self.db_path,
+            [DocumentRecord("doc-1", "stream text", "seed", {"v": 2})],
+            skip_unchanged=True,
+        )
+        self.assertEqual(changed.updated, 1)
+
+    def test_bulk_ingest_sharded_routes_by_doc_id(self):
+        db_paths = shard_paths(self.db_path, 3)
+        records = (
+            DocumentRecord(f"doc-{idx}", f"stream shard record {idx}", "bench", {})
+            for idx in range(600)
+        )
+        stats = bulk_ingest_sharded(db_paths, records, batch_size=50)
+        self.assertEqual(stats.inserted, 600)
+        stored = [list_documents(db_path) for db_path in db_paths]
+        self.assertEqual(sum(len(documents) for documents in stored), 600)
+        for shard, documents in enumerate(stored):
+            self.assertTrue(documents)
+            self.assertTrue(all(shard_index(doc.doc_id, 3) == shard for doc in documents))
+
+    def test_bulk_ingest_sharded_raises_when_a_shard_fails(self):
+        db_paths = shard_paths(self.db_path, 3)
+        real_write_batch = pipeline.write_batch
+
+        def write_batch(connection, records, **kwargs):
+            path = connection.execute("PRAGMA database_list").fetchone()[2]
+            if Path(path) == db_paths[0]:
+                raise RuntimeError("shard 0 is broken")
+            return real_write_batch(connection, records, **kwargs)
+
+        records = (
+            DocumentRecord(f"doc-{idx}", f"failing shard record {idx}", "bench", {})
+            for idx in range(50_000)
+        )
+        errors = []
+
+        def ingest():
+            try:
+                bulk_ingest_sharded(db_paths, records, batch_size=50)
+            except RuntimeError as exc:
+                errors.append(exc)
+
+        with mock.patch.object(pipeline, "write_batch", write_batch):
+            thread = threading.Thread(target=ingest, daemon=True)
+            thread.start()
+            thread.join(timeout=60)
+        self.assertFalse(thread.is_alive(), "bulk_ingest_sharded hung")
+        self.assertEqual([str(error) for error in errors], ["shard 0 is broken"])
+
+    def test_ingest_files_sharded_skips_unchanged_files(self):
+        folder = Path(self.temp_dir.name) / "docs"
+        folder.mkdir()
+        for idx in range(12):
+            (folder / f"note-{idx}.txt").write_text(f"note number {idx}", encoding="utf-8")
+        db_paths = shard_paths(self.db_path, 2)
+        paths = sorted(folder.glob("*.txt"))
+        first = ingest_files_sharded(db_paths, paths, workers=2)
+        self.assertEqual(first.inserted, 12)
+        second = ingest_files_sharded(db_paths, paths)
+        self.assertEqual((second.inserted, second.skipped), (0, 12))
+        self.assertEqual(sum(len(list_documents(db_path)) for db_path in db_paths), 12)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,148 @@
+import contextlib
+import io
+import marshal
+from pathlib import Path
+import pstats
+import tempfile
+import threading
+import time
+import unittest
+
+from rag_system import cli
+from rag_system.profiling import (
+    ProfileAggregate,
+    capture,
+    collapsed_stacks,
+    configure_profiling,
+    flush_profile,
+    profiled,
+    request_profile,
+)
+
+
+def _leaf() -> int:
+    return sum(range(20000))
+
+
+def _branch() -> int:
+    return _leaf() + _leaf()
+
+
+def _work() -> int:
+    return _branch() + _leaf()
+
+
+class ProfileAggregateTests(unittest.TestCase):
+    def test_runs_are_summed_and_written(self):
+        aggregate = ProfileAggregate()
+        self.assertEqual(aggregate.collapsed(), "")
+        for _ in range(2):
+            with profiled(aggregate):
+                _work()
+        self.assertEqual(aggregate.runs, 2)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            stats_path, collapsed_path = aggregate.write(Path(temp_dir) / "out" / "run")
+            stats = pstats.Stats(str(stats_path))
+            collapsed = collapsed_path.read_text(encoding="utf-8")
+        calls = {name: entry[1] for (_, _, name), entry in stats.stats.items()}
+        self.assertEqual(calls["_leaf"], 6)
+        self.assertEqual(calls["_work"], 2)
+        self.assertEqual(collapsed, aggregate.collapsed())
+        self.assertEqual(marshal.loads(aggregate.dumps()).keys(), stats.stats.keys())
+        self.assertIn("_leaf", aggregate.summary(5))
+
+    def test_collapsed_stacks_keep_call_paths(self):
+        aggregate = ProfileAggregate()
+        with profiled(aggregate):
+            _work()
+        paths = {}
+        for line in aggregate.collapsed().splitlines():
+            path, microseconds = line.rsplit(" ", 1)
+            paths[tuple(frame.split("(")[-1] for frame in path.split(";"))] = int(microseconds)
+        direct = ("_work)", "_leaf)", "<built-in method builtins.sum>")
+        nested = ("_work)", "_branch)", "_leaf)", "<built-in method builtins.sum>")
+        self.assertIn(direct, paths)
+        self.assertIn(nested, paths)
+        # _branch calls _leaf twice as often as _work does.
+        self.assertGreater(paths[nested], paths[direct])
+
+    def test_recursion_is_folded(self):
+        def countdown(n: int) -> int:
+            return 0 if n == 0 else countdown(n - 1) + sum(range(2000))
+
+        aggregate = ProfileAggregate()
+        with profiled(aggregate):
+            countdown(50)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            stats_path, _ = aggregate.write(Path(temp_dir) / "run")
+            collapsed = collapsed_stacks(pstats.Stats(str(stats_path)))
+        self.assertIn("(countdown)", collapsed)
+        for line in collapsed.splitlines():
+            self.assertLessEqual(line.count("(countdown)"), 1)
+
+
+class RequestProfileTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.prefix = Path(self.temp_dir.name) / "server"
+
+    def tearDown(self):
+        configure_profiling(0.0)
+        self.temp_dir.cleanup()
+
+    def test_unsampled_requests_are_not_profiled(self):
+        configure_profiling(0.0, self.prefix)
+        self.assertIs(request_profile(), request_profile())
+        with request_profile():
+            _work()
+        self.assertIsNone(flush_profile(force=True))
+
+    def test_sampled_requests_are_flushed(self):
+        configure_profiling(1.0, self.prefix)
+        with request_profile():
+            _work()
+        stats_path, collapsed_path = flush_profile(force=True)
+        self.assertIn("_leaf", collapsed_path.read_text(encoding="utf-8"))
+        self.assertTrue(stats_path.exists())
+        # Nothing new to write.
+        self.assertIsNone(flush_profile(force=True))
+
+    def test_capture_profiles_requests_in_the_window(self):
+        configure_profiling(0.0)
+        result = []
+        window = threading.Thread(target=lambda: result.append(capture(0.5)))
+        window.start()
+        time.sleep(0.1)
+        with request_profile():
+            _work()
+        window.join()
+        self.assertEqual(result[0].runs, 1)
+        self.assertIn("_branch", result[0].collapsed())
+        with self.assertRaises(ValueError):
+            capture(0)
+
+    def test_sample_rate_is_validated(self):
+        with self.assertRaises(ValueError):
+            configure_profiling(1.5)
+
+
+class CliProfileTests(unittest.TestCase):
+    def test_profile_flag_writes_files(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            prefix = Path(temp_dir) / "analyze"
+            stdout, stderr = io.StringIO(), io.StringIO()
+            with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+                code = cli.main(
+                    ["analyze", "Glacier stores archives", "--profile"]
+                    + ["--profile-output", str(prefix)]
+                )
+            self.assertEqual(code, 0)
+            self.assertIn("entities", stdout.getvalue())
+            self.assertIn("cumulative", stderr.getvalue())
+            self.assertIn("cmd_analyze", Path(f"{prefix}.collapsed").read_text(encoding="utf-8"))
+            self.assertTrue(Path(f"{prefix}.pstats").exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import sqlite3
+import unittest
+
+from rag_system.query import (
+    DEFAULT_STOP_WORDS,
+    _parse,
+    configure_stop_words,
+    parse_query,
+)
+
+
+class ParseQueryTests(unittest.TestCase):
+    def tearDown(self):
+        configure_stop_words(None)
+
+    def test_words_are_quoted_and_stop_words_dropped(self):
+        parsed = parse_query("What does Step Functions do?")
+        self.assertEqual(parsed.match, '"Step" "Functions"')
+        self.assertEqual(parsed.words, ("Step", "Functions"))
+        self.assertEqual(parsed.text, "Step Functions")
+
+    def test_prefix_phrase_and_near(self):
+        self.assertEqual(parse_query("lamb*").match, '"lamb" *')
+        self.assertEqual(
+            parse_query('"the state of" machines').match, '"the state of" "machines"'
+        )
+        self.assertEqual(
+            parse_query("lamb* NEAR/3 cold").match, 'NEAR("lamb" * "cold", 3)'
+        )
+        self.assertEqual(
+            parse_query("s3 NEAR buckets NEAR/2 regions").phrases,
+            ('"s3"', '"buckets"', '"regions"'),
+        )
+        self.assertEqual(
+            parse_query("s3 NEAR buckets NEAR/2 regions").match,
+            'NEAR("s3" "buckets" "regions", 10)',
+        )
+
+    def test_operators_and_punctuation_are_plain_text(self):
+        connection = sqlite3.connect(":memory:")
+        connection.execute("CREATE VIRTUAL TABLE docs USING fts5(content)")
+        connection.execute(
+            "INSERT INTO docs VALUES (?)",
+            ("don't panic: S3 OR Glacier (NOT both), content in an unterminated phrase",),
+        )
+        for query in (
+            "don't",
+            "S3 OR",
+            "NOT glacier",
+            "content:panic",
+            "(both",
+            'unterminated "phrase',
+            "NEAR s3",
+            "s3 NEAR",
+            "^glacier + -both",
+        ):
+            match = parse_query(query).match
+            rows = connection.execute(
+                "SELECT count(*) FROM docs WHERE docs MATCH ?", (match,)
+            ).fetchone()
+            self.assertEqual(rows[0], 1, (query, match))
+        self.assertEqual(parse_query("don't").match, "\"don't\"")
+
+    def test_queries_without_terms_are_rejected(self):
+        for query in ("", "the of", "?!", "NEAR/3"):
+            with self.assertRaises(ValueError):
+                parse_query(query)
+
+    def test_stop_words_are_configurable(self):
+        with self.assertRaises(ValueError):
+            parse_query("what is it")
+        configure_stop_words(())
+        self.assertEqual(parse_query("what is it").match, '"what" "is" "it"')
+        configure_stop_words(["Lambda"])
+        self.assertEqual(parse_query("the lambda runtime").match, '"the" "runtime"')
+        configure_stop_words(None)
+        self.assertIn("the", DEFAULT_STOP_WORDS)
+
+    def test_parsed_queries_are_cached(self):
+        _parse.cache_clear()
+        first = parse_query("kinesis streams")
+        self.assertIs(parse_query("kinesis streams"), first)
+        self.assertEqual(_parse.cache_info().hits, 1)
+        configure_stop_words(["kinesis"])
+        self.assertEqual(parse_query("kinesis streams").match, '"streams"')
+
+
+if __name__ == "__main__":
+    unittest.main()
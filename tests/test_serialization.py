@@ -0,0 +1,55 @@
+import json
+import unittest
+
+from rag_system import serialization
+from rag_system.serialization import dumps, to_json
+from rag_system.storage import DocumentRecord, SearchResult
+
+
+def _stdlib_dumps(obj):
+    orjson, serialization.orjson = serialization.orjson, None
+    try:
+        return dumps(obj)
+    finally:
+        serialization.orjson = orjson
+
+
+class SerializationTests(unittest.TestCase):
+    def setUp(self):
+        self.result = SearchResult(
+            doc_id="doc-1",
+            content="S3 stores objects",
+            source="seed",
+            score=0.5,
+            metadata={"passage": 2, "tags": ["storage"]},
+            lexical_score=1.25,
+        )
+        self.record = DocumentRecord(
+            doc_id="doc-2", content="Glacier archives data", source="upload", metadata={}
+        )
+
+    def test_dataclasses_encode_as_their_fields(self):
+        payload = {"results": [self.result], "document": self.record}
+        expected = {
+            "results": [dict(self.result.__dict__)],
+            "document": dict(self.record.__dict__),
+        }
+        for encode in (dumps, _stdlib_dumps):
+            with self.subTest(encode=encode.__name__):
+                self.assertEqual(json.loads(encode(payload)), expected)
+
+    def test_output_is_compact_utf8(self):
+        body = _stdlib_dumps({"results": [], "query": "café"})
+        self.assertIsInstance(body, bytes)
+        self.assertEqual(body, b'{"results":[],"query":"caf\\u00e9"}')
+
+    def test_unknown_objects_are_rejected(self):
+        with self.assertRaises(TypeError):
+            to_json(object())
+        for encode in (dumps, _stdlib_dumps):
+            with self.subTest(encode=encode.__name__), self.assertRaises(TypeError):
+                encode({"value": object()})
+
+    @unittest.skipIf(serialization.orjson is None, "orjson is not installed")
+    def test_orjson_falls_back_for_values_it_rejects(self):
+        self.assertEqual(json.loads(dumps({"big": 2**70})), {"big": 2**70})
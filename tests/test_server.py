@@ -1,3 +1,4 @@
+from http.client import HTTPConnection
 import json
 import os
 from pathlib import Path
@@ -7,10 +8,15 @@ import threading
 import time
 import unittest
 from http.server import HTTPServer
+from urllib.error import HTTPError
 from urllib.request import Request, urlopen
 
-from rag_system.server import RagRequestHandler
-from rag_system.storage import initialize_database
+from rag_system.config import load_config
+from rag_system.profiling import configure_profiling
+from rag_system.runtime import configure_process
+from rag_system.server import RagHTTPServer, RagRequestHandler, WorkerPoolHTTPServer
+from rag_system.storage import initialize_database, query_cache
+from rag_system.tracing import configure_tracing, tracing_enabled
 
 
 def _free_port() -> int:
@@ -62,6 +68,324 @@ class ServerTests(unittest.TestCase):
             search_payload = json.loads(response.read().decode("utf-8"))
         self.assertEqual(len(search_payload["results"]), 1)
 
+        with urlopen(
+            f"http://127.0.0.1:{self.port}/search?query=S3&full=1"
+        ) as response:
+            full_payload = json.loads(response.read().decode("utf-8"))
+        self.assertEqual(full_payload["results"][0]["content"], "S3 stores objects")
+
+        with urlopen(
+            f"http://127.0.0.1:{self.port}/search?query=S3&highlight=1"
+        ) as response:
+            highlight_payload = json.loads(response.read().decode("utf-8"))
+        self.assertIn("<mark>S3</mark>", highlight_payload["results"][0]["content"])
+
+        with urlopen(
+            f"http://127.0.0.1:{self.port}/search?query=S3&unit=passage"
+        ) as response:
+            passage_payload = json.loads(response.read().decode("utf-8"))
+        self.assertEqual(passage_payload["results"][0]["doc_id"], "doc-1")
+        self.assertIn("passage", passage_payload["results"][0]["metadata"])
+
+        with urlopen(
+            f"http://127.0.0.1:{self.port}/search?query=objects&mode=dense&full=1"
+        ) as response:
+            dense_payload = json.loads(response.read().decode("utf-8"))
+        self.assertEqual(dense_payload["results"][0]["doc_id"], "doc-1")
+        self.assertGreater(dense_payload["results"][0]["score"], 0)
+
+        with urlopen(
+            f"http://127.0.0.1:{self.port}/search?query=S3%20objects&mode=hybrid"
+        ) as response:
+            hybrid_result = json.loads(response.read().decode("utf-8"))["results"][0]
+        self.assertEqual(hybrid_result["doc_id"], "doc-1")
+        self.assertIsNotNone(hybrid_result["lexical_score"])
+        self.assertIsNotNone(hybrid_result["dense_score"])
+
+        with self.assertRaises(HTTPError) as raised:
+            urlopen(f"http://127.0.0.1:{self.port}/search?query=S3&mode=fuzzy")
+        self.assertEqual(raised.exception.code, 400)
+
+        # Queries the parser rejects: only stop words, or only syntax.
+        for query in ("the", "%22", "NEAR"):
+            with self.assertRaises(HTTPError) as raised:
+                urlopen(f"http://127.0.0.1:{self.port}/search?query={query}")
+            self.assertEqual(raised.exception.code, 400)
+
+        delete = Request(f"http://127.0.0.1:{self.port}/documents/doc-1", method="DELETE")
+        with urlopen(delete) as response:
+            self.assertEqual(json.loads(response.read().decode("utf-8")), {"deleted": "doc-1"})
+        with urlopen(f"http://127.0.0.1:{self.port}/documents") as response:
+            self.assertEqual(json.loads(response.read().decode("utf-8"))["documents"], [])
+        with self.assertRaises(HTTPError) as raised:
+            urlopen(delete)
+        self.assertEqual(raised.exception.code, 404)
+
+    def test_documents_are_paged_and_chunked(self):
+        from rag_system.storage import add_document
+
+        for idx in range(5):
+            add_document(self.db_path, f"doc-{idx}", f"text {idx}", "unit", {"idx": idx})
+        connection = HTTPConnection("127.0.0.1", self.port)
+        connection.request("GET", "/documents?limit=2&after=doc-0&fields=metadata")
+        response = connection.getresponse()
+        self.assertEqual(response.getheader("Transfer-Encoding"), "chunked")
+        payload = json.loads(response.read().decode("utf-8"))
+        connection.close()
+        self.assertEqual(
+            payload["documents"],
+            [
+                {"doc_id": "doc-1", "source": "unit", "metadata": {"idx": 1}},
+                {"doc_id": "doc-2", "source": "unit", "metadata": {"idx": 2}},
+            ],
+        )
+        self.assertEqual(payload["next_after"], "doc-2")
+
+        url = f"http://127.0.0.1:{self.port}/documents?fields=ids&after=doc-2"
+        with urlopen(url) as response:
+            payload = json.loads(response.read().decode("utf-8"))
+        self.assertEqual(payload["documents"], [{"doc_id": "doc-3"}, {"doc_id": "doc-4"}])
+        self.assertIsNone(payload["next_after"])
+
+        for query in ("limit=0", "limit=x", "fields=everything"):
+            with self.assertRaises(HTTPError) as raised:
+                urlopen(f"http://127.0.0.1:{self.port}/documents?{query}")
+            self.assertEqual(raised.exception.code, 400)
+
+    def _post(self, path, payload):
+        request = Request(
+            f"http://127.0.0.1:{self.port}{path}",
+            data=json.dumps(payload).encode("utf-8"),
+            method="POST",
+            headers={"Content-Type": "application/json"},
+        )
+        with urlopen(request) as response:
+            return json.loads(response.read().decode("utf-8"))
+
+    def test_batch_endpoints(self):
+        from rag_system.storage import add_document
+
+        add_document(self.db_path, "doc-1", "S3 stores objects", "unit", {})
+        add_document(self.db_path, "doc-2", "Lambda runs functions", "unit", {})
+        payload = self._post(
+            "/search/batch", {"queries": ["lambda", "objects", "lambda"], "full": True}
+        )
+        self.assertEqual(
+            [[result["doc_id"] for result in results] for results in payload["results"]],
+            [["doc-2"], ["doc-1"], ["doc-2"]],
+        )
+        self.assertEqual(payload["results"][1][0]["content"], "S3 stores objects")
+
+        payload = self._post("/generate/batch", {"queries": ["S3 objects", "lambda"]})
+        self.assertEqual(len(payload["responses"]), 2)
+        self.assertIn("[doc-2]", payload["responses"][1]["context"])
+        # The text is in the context once, not repeated in the results.
+        self.assertEqual(payload["responses"][1]["results"][0]["doc_id"], "doc-2")
+        self.assertEqual(payload["responses"][1]["results"][0]["content"], "")
+
+        for path in ("/search/batch", "/generate/batch"):
+            for body in (
+                {"queries": []},
+                {"queries": ["lambda", "the"]},
+                {"queries": [3]},
+                {"queries": [["lambda"]]},
+            ):
+                with self.subTest(path=path, body=body), self.assertRaises(HTTPError) as raised:
+                    self._post(path, body)
+                self.assertEqual(raised.exception.code, 400)
+
+    def test_generate_rejects_queries_that_are_not_strings(self):
+        for query in (["lambda"], 3, {"text": "lambda"}, "the"):
+            with self.subTest(query=query), self.assertRaises(HTTPError) as raised:
+                self._post("/generate", {"query": query})
+            self.assertEqual(raised.exception.code, 400)
+
+    def test_metrics_reports_query_cache(self):
+        with urlopen(f"http://127.0.0.1:{self.port}/metrics") as response:
+            payload = json.loads(response.read().decode("utf-8"))
+        self.assertIn("hits", payload["query_cache"])
+        self.assertIn("evictions", payload["query_cache"])
+        self.assertIn("stages", payload)
+
+    def test_tracing_adds_server_timing_and_prometheus_histograms(self):
+        configure_tracing(True)
+        self.addCleanup(configure_tracing, False)
+        body = json.dumps({"id": "doc-1", "content": "Glacier archives data"}).encode("utf-8")
+        urlopen(Request(f"http://127.0.0.1:{self.port}/documents", data=body, method="POST"))
+        request = Request(
+            f"http://127.0.0.1:{self.port}/generate",
+            data=json.dumps({"query": "Glacier archives"}).encode("utf-8"),
+            method="POST",
+        )
+        with urlopen(request) as response:
+            timing = response.headers["Server-Timing"]
+        stages = [entry.split(";")[0] for entry in timing.split(", ")]
+        for stage in ("json_decode", "parse", "fts5", "decode", "analyze", "render", "json_encode"):
+            self.assertIn(stage, stages)
+        self.assertEqual(stages[-1], "request")
+
+        with urlopen(f"http://127.0.0.1:{self.port}/metrics?format=prometheus") as response:
+            self.assertTrue(response.headers["Content-Type"].startswith("text/plain"))
+            text = response.read().decode("utf-8")
+        self.assertIn('rag_stage_duration_seconds_count{stage="fts5"} 1', text)
+        self.assertIn('rag_stage_duration_seconds_count{stage="request"} 2', text)
+        self.assertIn('rag_cache_misses_total{cache="response"}', text)
+
+    def test_server_timing_is_omitted_when_tracing_is_off(self):
+        with urlopen(f"http://127.0.0.1:{self.port}/healthz") as response:
+            self.assertIsNone(response.headers["Server-Timing"])
+
+    def test_debug_profile_needs_concurrent_workers(self):
+        # The test server handles one request at a time.
+        with self.assertRaises(HTTPError) as ctx:
+            urlopen(f"http://127.0.0.1:{self.port}/debug/profile?seconds=1")
+        self.assertEqual(ctx.exception.code, 409)
+
+
+class RagHTTPServerTests(unittest.TestCase):
+    def test_config_loaded_once_and_reloaded_on_request(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            os.environ["RAG_DB_PATH"] = str(Path(temp_dir) / "rag.db")
+            httpd = RagHTTPServer(("127.0.0.1", 0), RagRequestHandler)
+            try:
+                config = httpd.config
+                httpd.service_actions()
+                self.assertIs(httpd.config, config)
+
+                os.environ["RAG_DB_PATH"] = str(Path(temp_dir) / "other.db")
+                httpd.request_reload()
+                httpd.service_actions()
+                self.assertEqual(httpd.config.db_path, load_config().db_path)
+                self.assertNotEqual(httpd.config.db_path, config.db_path)
+            finally:
+                httpd.server_close()
+
+    def test_reload_applies_the_new_settings(self):
+        names = ("RAG_CACHE_ENTRIES", "RAG_TRACING", "RAG_DATA_DIR")
+        saved = {name: os.environ.get(name) for name in names}
+
+        def restore():
+            for name, value in saved.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+            configure_process(load_config())
+            configure_profiling(0)
+
+        self.addCleanup(restore)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            os.environ["RAG_DB_PATH"] = str(Path(temp_dir) / "rag.db")
+            os.environ["RAG_DATA_DIR"] = temp_dir
+            httpd = RagHTTPServer(("127.0.0.1", 0), RagRequestHandler)
+            try:
+                os.environ["RAG_CACHE_ENTRIES"] = "7"
+                os.environ["RAG_TRACING"] = "1"
+                httpd.request_reload()
+                httpd.service_actions()
+                self.assertEqual(query_cache.max_entries, 7)
+                self.assertTrue(tracing_enabled())
+            finally:
+                httpd.server_close()
+
+
+class WorkerPoolServerTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = Path(self.temp_dir.name) / "rag.db"
+        initialize_database(self.db_path)
+        os.environ["RAG_DB_PATH"] = str(self.db_path)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _start(self, workers: int, queue_size: int) -> int:
+        port = _free_port()
+        httpd = WorkerPoolHTTPServer(
+            ("127.0.0.1", port), RagRequestHandler, workers=workers, queue_size=queue_size
+        )
+        thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+        thread.start()
+
+        def stop():
+            httpd.shutdown()
+            thread.join()
+            httpd.server_close()
+
+        self.addCleanup(stop)
+        return port
+
+    def test_keep_alive_reuses_connection(self):
+        port = self._start(workers=2, queue_size=4)
+        connection = HTTPConnection("127.0.0.1", port, timeout=5)
+        try:
+            for _ in range(3):
+                connection.request("GET", "/healthz")
+                response = connection.getresponse()
+                payload = json.loads(response.read().decode("utf-8"))
+                self.assertEqual(payload["status"], "ok")
+                self.assertNotEqual(response.getheader("Connection"), "close")
+        finally:
+            connection.close()
+
+    def test_busy_worker_does_not_block_other_requests(self):
+        port = self._start(workers=2, queue_size=4)
+        idle = socket.create_connection(("127.0.0.1", port))
+        try:
+            with urlopen(f"http://127.0.0.1:{port}/healthz", timeout=2) as response:
+                payload = json.loads(response.read().decode("utf-8"))
+        finally:
+            idle.close()
+        self.assertEqual(payload["status"], "ok")
+
+    def test_debug_profile_rejects_invalid_windows(self):
+        port = self._start(workers=2, queue_size=4)
+        for seconds in ("0", "600", "soon"):
+            with self.assertRaises(HTTPError) as ctx:
+                urlopen(f"http://127.0.0.1:{port}/debug/profile?seconds={seconds}")
+            self.assertEqual(ctx.exception.code, 400)
+
+    def test_debug_profile_needs_more_than_one_worker(self):
+        port = self._start(workers=1, queue_size=4)
+        with self.assertRaises(HTTPError) as ctx:
+            urlopen(f"http://127.0.0.1:{port}/debug/profile?seconds=1", timeout=5)
+        self.assertEqual(ctx.exception.code, 409)
+
+    def test_debug_profile_captures_concurrent_requests(self):
+        port = self._start(workers=2, queue_size=4)
+        captured = []
+
+        def profile():
+            url = f"http://127.0.0.1:{port}/debug/profile?seconds=0.5"
+            with urlopen(url, timeout=5) as response:
+                captured.append(response.read().decode("utf-8"))
+
+        window = threading.Thread(target=profile)
+        window.start()
+        time.sleep(0.2)
+        with urlopen(f"http://127.0.0.1:{port}/search?query=glacier", timeout=2):
+            pass
+        window.join()
+        self.assertIn("server.py", captured[0])
+        self.assertIn("(do_GET)", captured[0])
+
+    def test_full_queue_returns_503(self):
+        port = self._start(workers=1, queue_size=1)
+        held = []
+        try:
+            # The first connection occupies the only worker, the second fills
+            # the queue; pause between them so the worker picks up the first.
+            for _ in range(2):
+                held.append(socket.create_connection(("127.0.0.1", port)))
+                time.sleep(0.2)
+            with socket.create_connection(("127.0.0.1", port)) as rejected:
+                rejected.settimeout(2)
+                status_line = rejected.recv(64).split(b"\r\n", 1)[0]
+        finally:
+            for sock in held:
+                sock.close()
+        self.assertIn(b"503", status_line)
+
 
 if __name__ == "__main__":
     unittest.main()
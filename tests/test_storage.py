@@ -1,16 +1,33 @@
+import os
+import sqlite3
+import subprocess
+import sys
 import tempfile
+import threading
 import unittest
 from pathlib import Path
+from unittest import mock
 
 from rag_system.storage import (
+    ConnectionPool,
     DocumentRecord,
     add_document,
     add_documents,
+    build_vector_index,
+    configure_dense,
+    delete_documents,
     get_document,
+    get_pool,
     initialize_database,
+    iter_documents,
     list_documents,
+    query_cache,
     search_documents,
+    search_passages,
 )
+from rag_system import storage
+from rag_system.ann import DEFAULT_NPROBE
+from rag_system.vectors import DEFAULT_DIM, np
 
 
 class StorageTests(unittest.TestCase):
@@ -38,6 +55,29 @@ class StorageTests(unittest.TestCase):
         self.assertEqual(len(listed), 2)
         self.assertEqual(listed[1].metadata["team"], "ops")
 
+    def test_list_documents_pages_by_doc_id(self):
+        from unittest import mock
+
+        add_documents(
+            self.db_path,
+            [
+                DocumentRecord(f"doc-{idx:02d}", f"text {idx}", "seed", {"n": idx})
+                for idx in range(7)
+            ],
+        )
+        with mock.patch("rag_system.storage.LIST_PAGE_SIZE", 3):
+            walked = [record.doc_id for record in iter_documents(self.db_path)]
+            page = list_documents(self.db_path, after="doc-02", limit=4, fields="metadata")
+        self.assertEqual(walked, [f"doc-{idx:02d}" for idx in range(7)])
+        self.assertEqual(
+            [record.doc_id for record in page], ["doc-03", "doc-04", "doc-05", "doc-06"]
+        )
+        self.assertEqual((page[0].content, page[0].metadata), ("", {"n": 3}))
+        ids = list_documents(self.db_path, after="doc-05", fields="ids")
+        self.assertEqual(ids, [DocumentRecord("doc-06", "", "", {})])
+        with self.assertRaises(ValueError):
+            list_documents(self.db_path, fields="content")
+
     def test_search_documents(self):
         add_document(self.db_path, "doc-1", "AWS Lambda scales automatically", "seed")
         add_document(self.db_path, "doc-2", "Amazon S3 stores objects", "seed")
@@ -51,6 +91,293 @@ class StorageTests(unittest.TestCase):
         self.assertEqual(len(results), 1)
         self.assertEqual(results[0].doc_id, "doc-3")
 
+    def test_search_documents_quotes_operators_and_supports_prefix_and_phrase(self):
+        add_document(self.db_path, "doc-1", "Don't store secrets in S3 OR Glacier", "seed")
+        add_document(self.db_path, "doc-2", "Lambda functions scale out automatically", "seed")
+        for query in ("don't", "S3 OR", "glacier:secrets", "(secrets^"):
+            self.assertEqual(
+                [result.doc_id for result in search_documents(self.db_path, query)], ["doc-1"]
+            )
+        self.assertEqual(search_documents(self.db_path, "lamb*")[0].doc_id, "doc-2")
+        self.assertEqual(search_documents(self.db_path, '"scale out"')[0].doc_id, "doc-2")
+        self.assertEqual(search_documents(self.db_path, '"out scale"'), [])
+        self.assertEqual(search_documents(self.db_path, "lambda NEAR/1 automatically"), [])
+        self.assertEqual(
+            search_documents(self.db_path, "lambda NEAR/3 automatically")[0].doc_id, "doc-2"
+        )
+
+    def test_search_documents_snippets(self):
+        filler = " ".join(f"filler{idx}" for idx in range(300))
+        add_document(self.db_path, "doc-1", f"{filler} Glacier archives data {filler}", "seed")
+        results = search_documents(
+            self.db_path, "Glacier", limit=5, snippet_tokens=8, markers=("<b>", "</b>")
+        )
+        self.assertIn("<b>Glacier</b>", results[0].content)
+        self.assertLess(len(results[0].content), 200)
+        full = search_documents(self.db_path, "Glacier", limit=5)
+        self.assertGreater(len(full[0].content), 2000)
+        with self.assertRaises(ValueError):
+            search_documents(self.db_path, "Glacier", snippet_tokens=65)
+
+    def test_search_documents_dense_mode(self):
+        add_document(self.db_path, "doc-1", "S3 buckets store objects", "seed")
+        add_document(self.db_path, "doc-2", "Lambda functions run code", "seed", {"t": 1})
+        results = search_documents(self.db_path, "what is a bucket", mode="dense")
+        self.assertEqual([result.doc_id for result in results], ["doc-1"])
+        self.assertGreater(results[0].score, 0)
+
+        add_document(self.db_path, "doc-1", "Glacier archives backups", "seed")
+        results = search_documents(self.db_path, "lambda function", mode="dense", snippet_tokens=2)
+        self.assertEqual([result.doc_id for result in results], ["doc-2"])
+        self.assertEqual(results[0].content, "Lambda functions...")
+        self.assertEqual(results[0].metadata, {"t": 1})
+        self.assertEqual(search_documents(self.db_path, "bucket", mode="dense"), [])
+
+    def test_vectors_are_removed_before_the_writer_lock_is_released(self):
+        add_document(self.db_path, "doc-1", "S3 buckets store objects", "seed")
+        pool = get_pool(self.db_path)
+        vectors = storage.get_vector_index(self.db_path)
+        held = []
+        remove = vectors.remove
+
+        def checked_remove(doc_ids):
+            held.append(pool._writer_lock.locked())
+            remove(doc_ids)
+
+        with mock.patch.object(vectors, "remove", side_effect=checked_remove):
+            self.assertEqual(delete_documents(self.db_path, ["doc-1"]), 1)
+        self.assertEqual(held, [True])
+        self.assertEqual(search_documents(self.db_path, "bucket", mode="dense"), [])
+
+    def test_search_documents_hybrid_mode_fuses_both_rankings(self):
+        add_document(self.db_path, "doc-1", "Lambda functions run code on demand", "seed")
+        add_document(self.db_path, "doc-2", "Serverless compute runs your code", "seed")
+        add_document(self.db_path, "doc-3", "S3 buckets store objects", "seed")
+
+        lexical = search_documents(self.db_path, "Lambda code", mode="bm25")
+        self.assertEqual([result.doc_id for result in lexical], ["doc-1"])
+
+        results = search_documents(self.db_path, "Lambda code", mode="hybrid")
+        self.assertEqual([result.doc_id for result in results], ["doc-1", "doc-2"])
+        self.assertIsNotNone(results[0].lexical_score)
+        self.assertIsNotNone(results[0].dense_score)
+        self.assertIsNone(results[1].lexical_score)
+        self.assertGreater(results[1].dense_score, 0)
+        self.assertGreater(results[0].score, results[1].score)
+
+    def test_dense_index_is_rebuilt_when_dim_changes(self):
+        add_document(self.db_path, "doc-1", "S3 buckets store objects", "seed")
+        configure_dense(64)
+        try:
+            results = search_documents(self.db_path, "bucket", mode="dense")
+        finally:
+            configure_dense(DEFAULT_DIM)
+        self.assertEqual([result.doc_id for result in results], ["doc-1"])
+
+    @unittest.skipIf(np is None, "IVF training needs NumPy")
+    def test_search_documents_dense_mode_with_ivf_index(self):
+        add_document(self.db_path, "doc-1", "S3 buckets store objects", "seed")
+        add_document(self.db_path, "doc-2", "Lambda functions run code", "seed")
+        configure_dense(DEFAULT_DIM, index="ivf", nprobe=1)
+        try:
+            index = build_vector_index(self.db_path)
+            add_document(self.db_path, "doc-3", "Glacier archives backups", "seed")
+            results = search_documents(self.db_path, "archived backups", mode="dense")
+        finally:
+            configure_dense(DEFAULT_DIM)
+        self.assertTrue(index.trained)
+        self.assertEqual(results[0].doc_id, "doc-3")
+
+    def test_dense_defaults_match_the_index_modules(self):
+        # storage repeats them so it can be imported without NumPy.
+        self.assertEqual(storage._DEFAULT_DENSE_DIM, DEFAULT_DIM)
+        self.assertEqual(storage._DEFAULT_NPROBE, DEFAULT_NPROBE)
+
+    def test_search_documents_rejects_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            search_documents(self.db_path, "Lambda", mode="semantic")
+
+    def test_search_passages_returns_best_passage_per_document(self):
+        filler = " ".join(f"filler{idx}" for idx in range(200))
+        add_document(
+            self.db_path,
+            "doc-long",
+            f"{filler} CloudWatch alarms notify operators. {filler}",
+            "seed",
+            {"team": "ops"},
+        )
+        add_document(self.db_path, "doc-short", "CloudWatch collects metrics", "seed")
+        results = search_passages(self.db_path, "CloudWatch alarms", limit=5)
+        self.assertEqual([result.doc_id for result in results], ["doc-long"])
+        passage = results[0]
+        self.assertIn("CloudWatch alarms", passage.content)
+        self.assertLess(len(passage.content), 600)
+        self.assertEqual(passage.metadata["team"], "ops")
+        self.assertIn("start", passage.metadata["passage"])
+
+        add_document(self.db_path, "doc-long", "Replaced text about buckets", "seed")
+        self.assertEqual(search_passages(self.db_path, "alarms", limit=5), [])
+
+    def test_initialize_database_backfills_passages(self):
+        legacy_path = Path(self.temp_dir.name) / "legacy-fts.db"
+        connection = sqlite3.connect(legacy_path)
+        connection.execute(
+            "CREATE VIRTUAL TABLE documents USING fts5("
+            "doc_id, content, source, metadata, tokenize='porter');"
+        )
+        connection.execute(
+            "CREATE TABLE document_meta (doc_id TEXT PRIMARY KEY, created_at TEXT NOT NULL);"
+        )
+        connection.execute(
+            "INSERT INTO documents VALUES ('doc-1', 'Kinesis streams records', 'old', '{}');"
+        )
+        connection.execute("INSERT INTO document_meta VALUES ('doc-1', datetime('now'));")
+        connection.commit()
+        connection.close()
+
+        initialize_database(legacy_path)
+        results = search_passages(legacy_path, "Kinesis", limit=5)
+        self.assertEqual([(r.doc_id, r.source) for r in results], [("doc-1", "old")])
+
+    def test_initialize_database_aligns_rowids_of_legacy_documents(self):
+        legacy_path = Path(self.temp_dir.name) / "legacy-rowids.db"
+        connection = sqlite3.connect(legacy_path)
+        connection.execute(
+            "CREATE VIRTUAL TABLE documents USING fts5("
+            "doc_id, content, source, metadata, tokenize='porter');"
+        )
+        connection.execute(
+            "CREATE TABLE document_meta (doc_id TEXT PRIMARY KEY, created_at TEXT NOT NULL);"
+        )
+        connection.executemany(
+            "INSERT INTO documents VALUES (?, ?, 'old', '{}');",
+            [("doc-1", "Kinesis streams records"), ("doc-2", "Glacier archives backups")],
+        )
+        connection.executemany(
+            "INSERT INTO document_meta VALUES (?, datetime('now'));", [("doc-2",), ("doc-1",)]
+        )
+        connection.commit()
+        connection.close()
+
+        initialize_database(legacy_path)
+        self.assertEqual(get_document(legacy_path, "doc-1").content, "Kinesis streams records")
+        results = search_documents(legacy_path, "archived backup", mode="dense")
+        self.assertEqual(results[0].doc_id, "doc-2")
+
+    def test_initialize_database_migrates_document_meta(self):
+        legacy_path = Path(self.temp_dir.name) / "legacy.db"
+        connection = sqlite3.connect(legacy_path)
+        connection.execute(
+            "CREATE TABLE document_meta (doc_id TEXT PRIMARY KEY, created_at TEXT NOT NULL);"
+        )
+        connection.close()
+
+        initialize_database(legacy_path)
+        add_document(legacy_path, "doc-1", "hello world", "unit")
+        with get_pool(legacy_path).reader() as reader:
+            row = reader.execute(
+                "SELECT content_hash, mtime_ns, size FROM document_meta;"
+            ).fetchone()
+        self.assertEqual(len(row["content_hash"]), 64)
+        self.assertIsNone(row["mtime_ns"])
+
+    def test_search_results_are_cached_until_next_write(self):
+        add_document(self.db_path, "doc-1", "AWS Lambda scales automatically", "seed")
+        search_documents(self.db_path, "Lambda", limit=5)
+        hits = query_cache.stats()["hits"]
+        cached = search_documents(self.db_path, "Lambda", limit=5)
+        self.assertEqual(query_cache.stats()["hits"], hits + 1)
+        self.assertEqual([result.doc_id for result in cached], ["doc-1"])
+
+        add_document(self.db_path, "doc-2", "Lambda functions respond to events", "seed")
+        refreshed = search_documents(self.db_path, "Lambda", limit=5)
+        self.assertEqual(len(refreshed), 2)
+
+    def test_cached_results_see_writes_from_other_processes(self):
+        add_document(self.db_path, "doc-1", "AWS Lambda scales automatically", "seed")
+        self.assertEqual(len(search_documents(self.db_path, "Lambda", limit=5)), 1)
+        subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import sys; from rag_system.storage import add_document; "
+                "add_document(sys.argv[1], 'doc-2', 'Lambda responds to events', 'seed')",
+                str(self.db_path),
+            ],
+            cwd=Path(__file__).resolve().parents[1],
+            check=True,
+        )
+        self.assertEqual(len(search_documents(self.db_path, "Lambda", limit=5)), 2)
+
+    def test_spellings_of_one_path_share_a_pool(self):
+        relative = Path(os.path.relpath(self.db_path))
+        self.assertIs(get_pool(relative), get_pool(self.db_path))
+        self.assertIs(get_pool(self.db_path.parent / "." / "rag.db"), get_pool(self.db_path))
+
+
+class ConnectionPoolTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.pool = ConnectionPool(Path(self.temp_dir.name) / "nested" / "rag.db", size=2)
+
+    def tearDown(self):
+        self.pool.close()
+        self.temp_dir.cleanup()
+
+    def test_reader_connections_are_reused(self):
+        with self.pool.reader() as first:
+            pass
+        with self.pool.reader() as second:
+            pass
+        self.assertIs(first, second)
+
+    def test_readers_see_committed_writes(self):
+        with self.pool.writer() as connection:
+            connection.execute("CREATE TABLE items (name TEXT);")
+            connection.execute("INSERT INTO items VALUES ('a');")
+        with self.pool.reader() as connection:
+            rows = connection.execute("SELECT name FROM items;").fetchall()
+        self.assertEqual([row["name"] for row in rows], ["a"])
+
+    def test_pool_size_bounds_open_readers(self):
+        seen = set()
+        barrier = threading.Barrier(4)
+
+        def worker():
+            barrier.wait()
+            for _ in range(20):
+                with self.pool.reader() as connection:
+                    seen.add(id(connection))
+                    connection.execute("SELECT 1;").fetchall()
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertLessEqual(len(seen), 2)
+
+    def test_pinned_reader_is_reused_on_its_thread(self):
+        other = []
+
+        def read_elsewhere():
+            with self.pool.reader() as connection:
+                other.append(connection)
+
+        with self.pool.pinned_reader() as pinned:
+            with self.pool.reader() as connection:
+                self.assertIs(connection, pinned)
+            thread = threading.Thread(target=read_elsewhere)
+            thread.start()
+            thread.join()
+        self.assertIsNot(other[0], pinned)
+        with self.pool.reader() as connection:
+            self.assertIn(connection, (pinned, other[0]))
+
+    def test_invalid_size_rejected(self):
+        with self.assertRaises(ValueError):
+            ConnectionPool(Path(self.temp_dir.name) / "other.db", size=0)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,74 @@
+import threading
+import unittest
+
+from rag_system.tracing import (
+    BUCKETS,
+    configure_tracing,
+    record,
+    render_prometheus,
+    request_trace,
+    server_timing,
+    span,
+    stage_stats,
+)
+
+
+class TracingTests(unittest.TestCase):
+    def setUp(self):
+        configure_tracing(True)
+
+    def tearDown(self):
+        configure_tracing(False)
+
+    def test_disabled_spans_record_nothing(self):
+        configure_tracing(False)
+        with request_trace():
+            with span("fts5"):
+                pass
+            self.assertIsNone(server_timing())
+        self.assertIs(span("fts5"), span("decode"))
+        configure_tracing(True)
+        self.assertEqual(stage_stats(), {})
+
+    def test_spans_feed_histograms_and_the_request_trace(self):
+        with request_trace():
+            with span("fts5"):
+                pass
+            record("decode", 0.002)
+            record("decode", 0.001)
+            timing = server_timing()
+        self.assertRegex(
+            timing, r"^fts5;dur=\d+\.\d{3}, decode;dur=3\.000, request;dur=\d+\.\d{3}$"
+        )
+        self.assertIsNone(server_timing())
+        stats = stage_stats()
+        self.assertEqual(stats["decode"], {"count": 2, "seconds": 0.003})
+        self.assertEqual(stats["request"]["count"], 1)
+
+    def test_traces_are_per_thread(self):
+        with request_trace():
+            worker = threading.Thread(target=record, args=("dense_scan", 0.01))
+            worker.start()
+            worker.join()
+            self.assertNotIn("dense_scan", server_timing())
+        self.assertEqual(stage_stats()["dense_scan"]["count"], 1)
+
+    def test_prometheus_histograms_are_cumulative(self):
+        record("fts5", 0.0002)
+        record("fts5", 0.003)
+        record("fts5", 60.0)
+        stats = {"hits": 4, "misses": 1, "evictions": 0, "expirations": 0, "entries": 1, "bytes": 90}
+        text = render_prometheus({"query": stats})
+        self.assertIn("# TYPE rag_stage_duration_seconds histogram", text)
+        self.assertIn('rag_stage_duration_seconds_bucket{stage="fts5",le="0.0001"} 0', text)
+        self.assertIn('rag_stage_duration_seconds_bucket{stage="fts5",le="0.00025"} 1', text)
+        self.assertIn('rag_stage_duration_seconds_bucket{stage="fts5",le="10"} 2', text)
+        self.assertIn('rag_stage_duration_seconds_bucket{stage="fts5",le="+Inf"} 3', text)
+        self.assertIn('rag_stage_duration_seconds_count{stage="fts5"} 3', text)
+        self.assertIn('rag_cache_hits_total{cache="query"} 4', text)
+        self.assertIn('rag_cache_bytes{cache="query"} 90', text)
+        self.assertEqual(len(BUCKETS) + 3, text.count('stage="fts5"'))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from rag_system import vectors
+from rag_system.vectors import VectorIndex, embed_text
+
+
+class EmbedTextTests(unittest.TestCase):
+    def test_embeddings_are_deterministic_and_normalized(self):
+        first = embed_text("S3 buckets store objects", dim=64)
+        second = embed_text("S3 buckets store objects", dim=64)
+        self.assertEqual(first, second)
+        self.assertEqual(len(first), 64)
+        self.assertAlmostEqual(sum(value * value for value in first), 1.0, places=5)
+
+    def test_inflections_share_features(self):
+        self.assertEqual(embed_text("bucket"), embed_text("Buckets"))
+        self.assertEqual(embed_text("archive"), embed_text("archived"))
+        self.assertNotEqual(embed_text("class"), embed_text("cla"))
+
+    def test_empty_text_embeds_to_zero_vector(self):
+        self.assertFalse(any(embed_text("?!", dim=8)))
+
+
+class VectorIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = Path(self.temp_dir.name) / "rag.db"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _populate(self, index):
+        index.upsert(
+            [
+                ("doc-1", "S3 buckets store objects"),
+                ("doc-2", "Lambda functions run code"),
+                ("doc-3", "Kinesis streams carry records"),
+            ]
+        )
+
+    def test_search_ranks_by_similarity(self):
+        index = VectorIndex(self.db_path)
+        self._populate(index)
+        hits = index.search("lambda function code", limit=2)
+        self.assertEqual(hits[0][0], "doc-2")
+        self.assertEqual(len(index), 3)
+
+    def test_upsert_replaces_rows_and_remove_drops_them(self):
+        index = VectorIndex(self.db_path)
+        self._populate(index)
+        index.upsert([("doc-1", "Glacier archives backups")])
+        self.assertEqual([doc_id for doc_id, _ in index.search("archive", limit=5)], ["doc-1"])
+        self.assertEqual(index.search("bucket", limit=5), [])
+
+        index.remove(["doc-1"])
+        self.assertEqual(index.search("archive", limit=5), [])
+        self.assertEqual(len(index), 2)
+
+    def test_index_persists_and_reloads_external_changes(self):
+        writer = VectorIndex(self.db_path)
+        self._populate(writer)
+        reader = VectorIndex(self.db_path)
+        self.assertEqual(reader.search("kinesis", limit=1)[0][0], "doc-3")
+
+        writer.upsert([("doc-4", "Kinesis firehose delivery")])
+        self.assertEqual(len(reader), 4)
+        with self.assertRaises(ValueError):
+            len(VectorIndex(self.db_path, dim=32))
+
+    def test_readers_map_files_without_parsing_ids(self):
+        self._populate(VectorIndex(self.db_path))
+        reader = VectorIndex(self.db_path)
+        self.assertEqual(reader.search("kinesis records", limit=1)[0][0], "doc-3")
+        self.assertEqual(len(reader), 3)
+        self.assertIsNone(reader._rows)
+        if vectors.np is not None:
+            self.assertIsInstance(reader._matrix, vectors.np.memmap)
+
+    def test_index_without_offsets_is_upgraded(self):
+        # The layout before the offset table: removed rows have a null id.
+        index = VectorIndex(self.db_path)
+        index.vectors_path.write_bytes(
+            b"".join(
+                embed_text(text).tobytes()
+                for text in ("S3 buckets", "Lambda functions", "Kinesis streams")
+            )
+        )
+        index.ids_path.write_text('rag-vectors 1 dim=256\n"doc-1"\nnull\n"doc-3"\n')
+        self.assertEqual(len(index), 2)
+        self.assertTrue(index.offsets_path.exists())
+        self.assertEqual(index.search("kinesis", limit=5)[0][0], "doc-3")
+        self.assertEqual(index.search("lambda", limit=5), [])
+
+        index.upsert([("doc-4", "Lambda functions")])
+        self.assertEqual(VectorIndex(self.db_path).search("lambda", limit=5)[0][0], "doc-4")
+
+    def test_pure_python_scan_matches_numpy(self):
+        index = VectorIndex(self.db_path)
+        self._populate(index)
+        expected = index.search("streams of records", limit=3)
+        saved = vectors.np
+        vectors.np = None
+        try:
+            fallback = VectorIndex(self.db_path).search("streams of records", limit=3)
+        finally:
+            vectors.np = saved
+        self.assertEqual([doc_id for doc_id, _ in fallback], [doc_id for doc_id, _ in expected])
+        for (_, score), (_, expected_score) in zip(fallback, expected):
+            self.assertAlmostEqual(score, expected_score, places=5)
+
+
+if __name__ == "__main__":
+    unittest.main()